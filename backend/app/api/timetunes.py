@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
@@ -15,6 +15,9 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Response header carrying the cursor of the next page of time entries
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 # Time Entries endpoints
 @router.post("/time-entries/", response_model=schemas.TimeEntryResponse)
 def create_time_entry(
@@ -27,24 +30,38 @@ def create_time_entry(
 
 @router.get("/time-entries/", response_model=List[schemas.TimeEntryResponse])
 def get_time_entries(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     project_id: Optional[str] = None,
     tag_id: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; replaces skip"),
     db: Session = Depends(get_db),
 ):
-    """Get all time entries with optional filtering"""
-    return crud.get_time_entries(
-        db=db,
-        skip=skip,
-        limit=limit,
-        start_date=start_date,
-        end_date=end_date,
-        project_id=project_id,
-        tag_id=tag_id,
-    )
+    """
+    Get all time entries with optional filtering, newest first
+
+    When the page is full, the X-Next-Cursor response header holds the cursor of the next page.
+    """
+    try:
+        time_entries = crud.get_time_entries(
+            db=db,
+            skip=skip,
+            limit=limit,
+            start_date=start_date,
+            end_date=end_date,
+            project_id=project_id,
+            tag_id=tag_id,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if time_entries and len(time_entries) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = crud.encode_cursor(time_entries[-1])
+    return time_entries
 
 
 @router.get("/time-entries/{time_entry_id}", response_model=schemas.TimeEntryResponse)
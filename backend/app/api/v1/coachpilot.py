@@ -1,36 +1,81 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 import os
 import json
-import sys
 import time
+import asyncio
 from enum import Enum
 
-# Add KnowledgeBaseParsing directory to path for importing modules
+# KnowledgeBaseParsing directory, which holds the vector databases
 KBP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))), "KnowledgeBaseParsing")
-sys.path.append(KBP_DIR)
 
-# Import RAG utilities
-from query_chunked import get_embedding, rag_query
-
-# Import OpenAI
-import openai
 from dotenv import load_dotenv
 import hashlib
 from functools import lru_cache
 
+# Shared, connection-pooled async OpenAI client
+from app.core.openai_client import get_async_openai_client
+from app.core.retry import RetryPolicy, acall_with_retry, openai_breaker
+from app.core.cache import create_response_cache
+from app.core.semantic_cache import SemanticCache
+from app.core.embeddings import aembed_texts
+from app.core.embedding_cache import get_embedding_cache
+from app.core.vectorstore import asearch_book_chunks, vector_stores
+from app.utils.json_stream import IncrementalObjectParser
+from app.core.config import (
+    COACHPILOT_CACHE_BACKEND,
+    COACHPILOT_CACHE_PATH,
+    COACHPILOT_CACHE_MAX_ENTRIES,
+    COACHPILOT_CACHE_MAX_BYTES,
+    COACHPILOT_CACHE_TTL_SECONDS,
+    COACHPILOT_SEMANTIC_CACHE_ENABLED,
+    COACHPILOT_SEMANTIC_CACHE_THRESHOLD,
+    COACHPILOT_SEMANTIC_CACHE_MAX_ENTRIES,
+    COACHPILOT_EMBEDDING_MODEL,
+    COACHPILOT_EMBEDDING_DIMENSIONS,
+    COACHPILOT_MAX_CONCURRENT_LLM_CALLS,
+    COACHPILOT_VECTOR_BACKEND,
+)
+
 # Load environment variables
 load_dotenv()
 
-# Set your API key
-openai.api_key = os.environ.get("OPENAI_API_KEY")
+# Caps the OpenAI calls in flight from this worker, so a burst of users queues here instead of tripping rate limits
+llm_semaphore = asyncio.Semaphore(COACHPILOT_MAX_CONCURRENT_LLM_CALLS)
+
+LLM_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=1.0, budget_seconds=90.0)
 
-# Simple cache for query results
-query_cache = {}
+# Cache of generated responses (LRU + TTL, size-capped, optionally shared between workers)
+query_cache = create_response_cache(
+    COACHPILOT_CACHE_BACKEND,
+    max_entries=COACHPILOT_CACHE_MAX_ENTRIES,
+    max_bytes=COACHPILOT_CACHE_MAX_BYTES,
+    ttl_seconds=COACHPILOT_CACHE_TTL_SECONDS,
+    path=COACHPILOT_CACHE_PATH,
+    namespace="coachpilot",
+)
+
+# Responses for earlier queries that mean the same thing, matched by embedding similarity
+semantic_cache = SemanticCache(
+    dimensions=COACHPILOT_EMBEDDING_DIMENSIONS,
+    max_entries=COACHPILOT_SEMANTIC_CACHE_MAX_ENTRIES,
+    threshold=COACHPILOT_SEMANTIC_CACHE_THRESHOLD,
+    ttl_seconds=COACHPILOT_CACHE_TTL_SECONDS,
+) if COACHPILOT_SEMANTIC_CACHE_ENABLED else None
 
 # Set the correct path to the database - use the one in KnowledgeBaseParsing directory
-DEFAULT_DB_PATH = os.path.join(KBP_DIR, "fast_embed_db")
+if COACHPILOT_VECTOR_BACKEND == "flat":
+    # The flat index memory-maps the embedding store, or parses the JSON written by genembed_chunked
+    DEFAULT_DB_PATH = os.path.join(KBP_DIR, "chunked_summaries", "embedding_store")
+    DB_PATH_FALLBACKS = (DEFAULT_DB_PATH, os.path.join(KBP_DIR, "chunked_summaries", "chunks_with_embeddings.json"))
+else:
+    DEFAULT_DB_PATH = os.path.join(KBP_DIR, "fast_embed_db")
+    # Databases tried, in order, when a request's db_path does not exist
+    DB_PATH_FALLBACKS = (DEFAULT_DB_PATH, os.path.join(KBP_DIR, "chunked_vector_db"))
+# A request's db_path is only opened inside these directories; anything else gets the default
+VECTOR_DB_ROOTS = (KBP_DIR,)
 
 router = APIRouter(prefix="/coachpilot", tags=["coachpilot"])
 
@@ -83,110 +128,35 @@ async def generate_coach_content(request: CoachRequest = Body(...)):
     start_time = time.time()
     
     try:
-        # Create a cache key based on the request parameters
-        cache_key = f"{request.query}_{','.join(sorted([f.value for f in request.formats]))}"
-        cache_key += f"_{request.top_k}_{request.include_sources}_{request.detailed_response}"
-        cache_key = hashlib.md5(cache_key.encode()).hexdigest()
-        
-        # Check if we have a cached response
-        if cache_key in query_cache:
-            print("Using cached response")
-            cached_response = query_cache[cache_key]
-            # Update execution time for the cached response
-            cached_response.execution_time = time.time() - start_time
+        cache_scope, cache_key = get_cache_keys(request)
+        cached_response, query_embedding = await find_cached_response(request, cache_scope, cache_key, start_time)
+        if cached_response is not None:
             return cached_response
         
-        # Print the database path for debugging
-        print(f"Using database path: {request.db_path}")
-        
-        # Check if the database exists
-        if not os.path.exists(request.db_path):
-            # If not, try to use the default path
-            if request.db_path != DEFAULT_DB_PATH and os.path.exists(DEFAULT_DB_PATH):
-                print(f"Specified database path {request.db_path} not found, using default path instead: {DEFAULT_DB_PATH}")
-                request.db_path = DEFAULT_DB_PATH
-            else:
-                available_paths = []
-                # Check if the database exists in KnowledgeBaseParsing directory
-                kbp_path = os.path.join(KBP_DIR, "fast_embed_db")
-                if os.path.exists(kbp_path):
-                    available_paths.append(kbp_path)
-                
-                # Check if there's a database in the chunked_vector_db path
-                chunked_path = os.path.join(KBP_DIR, "chunked_vector_db")
-                if os.path.exists(chunked_path):
-                    available_paths.append(chunked_path)
-                
-                if available_paths:
-                    request.db_path = available_paths[0]
-                    print(f"Using alternative database path: {request.db_path}")
-                else:
-                    raise ValueError(f"No vector database found at {request.db_path} or any alternative locations")
-        
-        # 1. Retrieve relevant book chunks using RAG
-        rag_results = rag_query(
-            query=request.query,
-            top_k=request.top_k,
-            model="gpt-4o",
-            db_path=request.db_path,
-            embedding_model="text-embedding-3-small",
-            return_raw_results=True  # Get raw results instead of formatted output
-        )
-        
-        # 2. Extract book sources and content
-        book_sources = []
-        context_text = ""
-        
-        for book_title, chunks in rag_results["sources"].items():
-            # Only use the most relevant content from each book to reduce token usage
-            # Sort chunks by relevance and limit to most relevant ones
-            sorted_chunks = sorted(chunks, key=lambda x: x["relevance"], reverse=True)
-            # Use at most 3 chunks per book to limit token usage
-            limited_chunks = sorted_chunks[:3]
-            
-            source = {
-                "title": book_title,
-                "relevance": max(chunk["relevance"] for chunk in chunks),
-                "chunks_used": len(limited_chunks),
-                "content": "\n".join([chunk["content"] for chunk in limited_chunks])
-            }
-            
-            context_text += f"Book: {book_title}\n{source['content']}\n\n"
-            
-            # Add to book sources if requested
-            if request.include_sources:
-                book_sources.append({
-                    "title": book_title,
-                    "relevance": source["relevance"],
-                    "chunks_used": source["chunks_used"],
-                    "key_insights": []  # Will be populated later
-                })
+        # 1-2. Retrieve relevant book chunks and build the context from them
+        book_sources, context_text = await retrieve_book_context(request, query_embedding)
         
         # 3. Generate structured content using GPT-4o
-        sections = []
         system_prompt = create_system_prompt(request.formats, request.detailed_response, request.include_sources)
         
         # 4. Make a single API call for both content and insights
-        combined_prompt = f"Context from books:\n{context_text}\n\n"
-        combined_prompt += f"User query: {request.query}\n\n"
-        combined_prompt += f"Generate structured content in JSON format for the formats: {', '.join([f.value for f in request.formats])}.\n\n"
-        
-        if request.include_sources:
-            combined_prompt += f"Additionally, for each book source, extract 3-5 key insights that are most relevant to the query.\n"
-            combined_prompt += f"Include these insights in a 'book_insights' object where each key is the book title and the value is an array of insight strings.\n\n"
-        
-        combined_prompt += "Your response must be valid JSON."
+        combined_prompt = create_user_prompt(request, context_text)
         
         # Single API call
-        main_response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": combined_prompt}
-            ],
-            max_tokens=request.max_tokens,
-            response_format={"type": "json_object"}
-        )
+        async with llm_semaphore:
+            main_response = await acall_with_retry(
+                get_async_openai_client().chat.completions.create,
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": combined_prompt}
+                ],
+                max_tokens=request.max_tokens,
+                response_format={"type": "json_object"},
+                policy=LLM_RETRY_POLICY,
+                breaker=openai_breaker,
+                description="generating coach content",
+            )
         
         # 5. Parse the response
         structured_content = json.loads(main_response.choices[0].message.content)
@@ -195,33 +165,15 @@ async def generate_coach_content(request: CoachRequest = Body(...)):
         summary = structured_content.get("summary", "No summary generated.")
         
         # Process each section
-        for format_type in request.formats:
-            format_key = format_type.value
-            if format_key in structured_content:
-                sections.append(
-                    ContentSection(
-                        format=format_type,
-                        title=structured_content[format_key].get("title", f"{format_key.title()} Plan"),
-                        content=structured_content[format_key].get("content", {}),
-                        description=structured_content[format_key].get("description", None)
-                    )
-                )
+        sections = [
+            create_section(format_type, structured_content[format_type.value])
+            for format_type in request.formats
+            if format_type.value in structured_content
+        ]
         
         # Process book insights if included
         if request.include_sources and book_sources and "book_insights" in structured_content:
-            insights = structured_content["book_insights"]
-            
-            # Match insights to book sources
-            for book_source in book_sources:
-                book_title = book_source["title"]
-                if book_title in insights:
-                    book_source["key_insights"] = insights[book_title]
-                else:
-                    # Try to find a close match
-                    for insight_key in insights:
-                        if book_title.lower() in insight_key.lower() or insight_key.lower() in book_title.lower():
-                            book_source["key_insights"] = insights[insight_key]
-                            break
+            match_book_insights(book_sources, structured_content["book_insights"])
         
         execution_time = time.time() - start_time
         
@@ -234,14 +186,7 @@ async def generate_coach_content(request: CoachRequest = Body(...)):
             execution_time=execution_time
         )
         
-        # Cache the response
-        query_cache[cache_key] = response
-        
-        # Limit cache size to prevent memory issues
-        if len(query_cache) > 100:  # Limit cache to 100 entries
-            # Remove the oldest entry
-            oldest_key = next(iter(query_cache))
-            del query_cache[oldest_key]
+        await store_response(cache_scope, cache_key, query_embedding, response)
             
         return response
     
@@ -249,6 +194,278 @@ async def generate_coach_content(request: CoachRequest = Body(...)):
         print(f"Error in generate_coach_content: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating coach content: {str(e)}")
 
+@router.post("/generate/stream")
+async def stream_coach_content(request: CoachRequest = Body(...)):
+    """
+    Generate the same content as /generate, streamed as server-sent events.
+
+    Events arrive in this order: "summary", one "section" per format as soon as its JSON
+    is complete, "book_insights" with the sources, then "done" with the full CoachResponse.
+    Failures are reported as an "error" event.
+    """
+    return StreamingResponse(
+        generate_coach_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def generate_coach_events(request: CoachRequest):
+    """Yield server-sent events for a coach request while the LLM is still generating"""
+    start_time = time.time()
+    
+    try:
+        cache_scope, cache_key = get_cache_keys(request)
+        cached_response, query_embedding = await find_cached_response(request, cache_scope, cache_key, start_time)
+        if cached_response is not None:
+            yield format_sse("summary", {"summary": cached_response.summary})
+            for section in cached_response.sections:
+                yield format_sse("section", section.model_dump(mode="json"))
+            if cached_response.sources is not None:
+                yield format_sse("book_insights", {"sources": [s.model_dump(mode="json") for s in cached_response.sources]})
+            yield format_sse("done", cached_response.model_dump(mode="json"))
+            return
+        
+        book_sources, context_text = await retrieve_book_context(request, query_embedding)
+        system_prompt = create_system_prompt(request.formats, request.detailed_response, request.include_sources)
+        combined_prompt = create_user_prompt(request, context_text)
+        
+        requested_formats = {format_type.value: format_type for format_type in request.formats}
+        parser = IncrementalObjectParser()
+        summary = None
+        sections = []
+        pending_sections = []  # Sections completed before the summary, held back so the summary goes first
+        book_insights = None
+        
+        # The semaphore only covers reading from OpenAI; a slow client does not hold a slot
+        deltas: asyncio.Queue = asyncio.Queue()
+        reader = asyncio.create_task(read_llm_stream(deltas, system_prompt, combined_prompt, request.max_tokens))
+        try:
+            while (delta := await deltas.get()) is not None:
+                if isinstance(delta, Exception):
+                    raise delta
+
+                for key, value in parser.feed(delta):
+                    if key == "summary" and summary is None:
+                        summary = value
+                        yield format_sse("summary", {"summary": summary})
+                        for section in pending_sections:
+                            yield format_sse("section", section.model_dump(mode="json"))
+                        pending_sections = []
+                    elif key in requested_formats and isinstance(value, dict):
+                        section = create_section(requested_formats[key], value)
+                        sections.append(section)
+                        if summary is None:
+                            pending_sections.append(section)
+                        else:
+                            yield format_sse("section", section.model_dump(mode="json"))
+                    elif key == "book_insights":
+                        book_insights = value
+        finally:
+            reader.cancel()
+        
+        if summary is None:
+            summary = "No summary generated."
+            yield format_sse("summary", {"summary": summary})
+            for section in pending_sections:
+                yield format_sse("section", section.model_dump(mode="json"))
+        
+        # Keep the section order of the request, like /generate does
+        sections.sort(key=lambda section: request.formats.index(section.format))
+        
+        if request.include_sources:
+            if book_sources and isinstance(book_insights, dict):
+                match_book_insights(book_sources, book_insights)
+            yield format_sse("book_insights", {"sources": book_sources})
+        
+        response = CoachResponse(
+            query=request.query,
+            summary=summary,
+            sections=sections,
+            sources=book_sources if request.include_sources else None,
+            execution_time=time.time() - start_time
+        )
+        await store_response(cache_scope, cache_key, query_embedding, response)
+        yield format_sse("done", response.model_dump(mode="json"))
+    
+    except Exception as e:
+        print(f"Error in stream_coach_content: {str(e)}")
+        yield format_sse("error", {"detail": f"Error generating coach content: {str(e)}"})
+
+async def read_llm_stream(deltas: asyncio.Queue, system_prompt: str, combined_prompt: str, max_tokens: int):
+    """
+    Read the streamed coach completion into deltas while holding an LLM slot
+
+    Puts each content delta, then None at the end; a failure is put as the exception.
+    """
+    try:
+        async with llm_semaphore:
+            # Retries cover opening the stream; once tokens flow a failure ends the stream with an error event
+            stream = await acall_with_retry(
+                get_async_openai_client().chat.completions.create,
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": combined_prompt}
+                ],
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"},
+                stream=True,
+                policy=LLM_RETRY_POLICY,
+                breaker=openai_breaker,
+                description="streaming coach content",
+            )
+            
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    deltas.put_nowait(chunk.choices[0].delta.content)
+    except Exception as e:
+        deltas.put_nowait(e)
+    deltas.put_nowait(None)
+
+def get_cache_keys(request: CoachRequest):
+    """Return (scope, key) for the response caches; the scope is everything except the query text"""
+    cache_scope = f"{','.join(sorted([f.value for f in request.formats]))}"
+    cache_scope += f"_{request.top_k}_{request.include_sources}_{request.detailed_response}"
+    cache_key = hashlib.md5(f"{request.query}_{cache_scope}".encode()).hexdigest()
+    return cache_scope, cache_key
+
+async def find_cached_response(request: CoachRequest, cache_scope: str, cache_key: str, start_time: float):
+    """
+    Look the request up in the exact and semantic caches
+
+    Returns:
+        (cached CoachResponse or None, query embedding or None if the exact cache answered)
+    """
+    # Check if we have a cached response
+    # The cache may be a SQLite file, so its I/O runs off the event loop
+    cached_response = await asyncio.to_thread(query_cache.get, cache_key)
+    if cached_response is not None:
+        print("Using cached response")
+        # The cache hands out a fresh copy, so the execution time can be set per request
+        cached_response["execution_time"] = time.time() - start_time
+        return CoachResponse(**cached_response), None
+    
+    # Embed the query once; the embedding serves both the semantic cache and the vector search
+    query_embedding = await embed_query(request.query)
+    
+    # Check for a cached response to a differently worded but equivalent query
+    if semantic_cache is not None:
+        semantic_hit = semantic_cache.get(cache_scope, query_embedding)
+        if semantic_hit is not None:
+            cached_response, similarity = semantic_hit
+            print(f"Using semantically cached response (similarity {similarity:.3f})")
+            cached_response["query"] = request.query
+            cached_response["execution_time"] = time.time() - start_time
+            return CoachResponse(**cached_response), query_embedding
+    
+    return None, query_embedding
+
+async def store_response(cache_scope: str, cache_key: str, query_embedding: List[float], response: CoachResponse):
+    """Cache a response; the caches evict expired and least recently used entries themselves"""
+    await asyncio.to_thread(query_cache.set, cache_key, response.model_dump(mode="json"))
+    if semantic_cache is not None:
+        semantic_cache.set(cache_scope, query_embedding, response.model_dump(mode="json"))
+
+async def retrieve_book_context(request: CoachRequest, query_embedding: List[float]):
+    """
+    Find the book chunks most relevant to the query
+
+    Returns:
+        (book sources for the response, context text for the prompt)
+    """
+    # Validated once per path by the registry, with the KnowledgeBaseParsing databases as fallbacks
+    request.db_path = vector_stores.resolve_path(request.db_path, DB_PATH_FALLBACKS, roots=VECTOR_DB_ROOTS)
+    
+    # 1. Retrieve relevant book chunks using RAG, reusing the query embedding
+    rag_results = await asearch_book_chunks(
+        query=request.query,
+        query_embedding=query_embedding,
+        top_k=request.top_k,
+        db_path=request.db_path,
+    )
+    
+    # 2. Extract book sources and content
+    book_sources = []
+    context_text = ""
+    
+    for book_title, chunks in rag_results["sources"].items():
+        # Only use the most relevant content from each book to reduce token usage
+        # Sort chunks by relevance and limit to most relevant ones
+        sorted_chunks = sorted(chunks, key=lambda x: x["relevance"], reverse=True)
+        # Use at most 3 chunks per book to limit token usage
+        limited_chunks = sorted_chunks[:3]
+        
+        source = {
+            "title": book_title,
+            "relevance": max(chunk["relevance"] for chunk in chunks),
+            "chunks_used": len(limited_chunks),
+            "content": "\n".join([chunk["content"] for chunk in limited_chunks])
+        }
+        
+        context_text += f"Book: {book_title}\n{source['content']}\n\n"
+        
+        # Add to book sources if requested
+        if request.include_sources:
+            book_sources.append({
+                "title": book_title,
+                "relevance": source["relevance"],
+                "chunks_used": source["chunks_used"],
+                "key_insights": []  # Will be populated later
+            })
+    
+    return book_sources, context_text
+
+def create_user_prompt(request: CoachRequest, context_text: str) -> str:
+    """Create the user prompt holding the retrieved context and the query"""
+    combined_prompt = f"Context from books:\n{context_text}\n\n"
+    combined_prompt += f"User query: {request.query}\n\n"
+    combined_prompt += f"Generate structured content in JSON format for the formats: {', '.join([f.value for f in request.formats])}.\n\n"
+    
+    if request.include_sources:
+        combined_prompt += f"Additionally, for each book source, extract 3-5 key insights that are most relevant to the query.\n"
+        combined_prompt += f"Include these insights in a 'book_insights' object where each key is the book title and the value is an array of insight strings.\n\n"
+    
+    # A fixed key order lets the streaming endpoint deliver the summary and each section as soon as they are written
+    combined_prompt += "Write the JSON keys in this order: summary, then each format in the order listed above, then book_insights.\n"
+    combined_prompt += "Your response must be valid JSON."
+    
+    return combined_prompt
+
+def create_section(format_type: ContentFormat, payload: Dict[str, Any]) -> ContentSection:
+    """Turn the generated JSON for one format into a ContentSection"""
+    format_key = format_type.value
+    return ContentSection(
+        format=format_type,
+        title=payload.get("title", f"{format_key.title()} Plan"),
+        content=payload.get("content", {}),
+        description=payload.get("description", None)
+    )
+
+def match_book_insights(book_sources: List[Dict[str, Any]], insights: Dict[str, List[str]]):
+    """Attach generated key insights to the book sources they belong to"""
+    # Match insights to book sources
+    for book_source in book_sources:
+        book_title = book_source["title"]
+        if book_title in insights:
+            book_source["key_insights"] = insights[book_title]
+        else:
+            # Try to find a close match
+            for insight_key in insights:
+                if book_title.lower() in insight_key.lower() or insight_key.lower() in book_title.lower():
+                    book_source["key_insights"] = insights[insight_key]
+                    break
+
+async def embed_query(query: str) -> List[float]:
+    """Embed a query with the model the book database was built with, via the shared embedding cache"""
+    embeddings = await aembed_texts(
+        [query], model=COACHPILOT_EMBEDDING_MODEL, limiter=llm_semaphore, policy=LLM_RETRY_POLICY
+    )
+    return embeddings[0]
+
 def create_system_prompt(formats, detailed_response, include_sources):
     """Create a system prompt based on requested formats"""
     base_prompt = """You are CoachPilot, an advanced AI coaching assistant with deep knowledge from books on personal development, psychology, business, and more.
@@ -405,6 +622,15 @@ Base all your recommendations directly on the book knowledge provided, citing sp
     
     return base_prompt
 
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit, miss and eviction counters of the response caches"""
+    stats = await asyncio.to_thread(query_cache.stats)
+    stats["semantic"] = semantic_cache.stats() if semantic_cache is not None else None
+    embedding_cache = get_embedding_cache()
+    stats["embeddings"] = await asyncio.to_thread(embedding_cache.stats) if embedding_cache is not None else None
+    return stats
+
 # Add a simple GET endpoint for testing
 @router.get("/test")
 async def test_coachpilot():
@@ -1,7 +1,9 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends, Response
 from pydantic import BaseModel, HttpUrl
 from typing import Dict, Any, Optional
-from app.core.coursitoagent import CoursitoAgent
+from app.schemas.coursitoagent import JobSubmitRequest, JobResponse
+from app.services.coursitoagent import job_manager
 
 router = APIRouter(
     prefix="/coursito",
@@ -10,7 +12,7 @@ router = APIRouter(
 
 class YoutubeUrlRequest(BaseModel):
     url: HttpUrl
-    
+
 class ProcessResponse(BaseModel):
     transcript: str
     notes: list
@@ -27,10 +29,34 @@ async def options_process_youtube():
 async def process_youtube_video(request: YoutubeUrlRequest):
     """
     Process a YouTube video URL to generate transcript, notes, and flashcards.
+
+    The work runs on the job worker pool; this handler only awaits the result,
+    so other routes stay responsive while the video is processed.
     """
     try:
-        agent = CoursitoAgent()
-        result = agent.process_youtube_url(str(request.url))
+        job = job_manager.submit(str(request.url))
+        result = await asyncio.wrap_future(job_manager.future(job["id"]))
         return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(request: JobSubmitRequest):
+    """
+    Queue a YouTube video for processing and return the job immediately.
+
+    Poll GET /coursito/jobs/{job_id} for progress, or pass a callback_url
+    to receive the finished job as a POST request.
+    """
+    callback_url = str(request.callback_url) if request.callback_url else None
+    return job_manager.submit(str(request.url), callback_url=callback_url)
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    Get the status, per-stage progress and (once completed) the result of a job.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,365 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+STAT_NAMES = ("hits", "misses", "sets", "evictions", "expirations")
+
+# The SQLite cache buffers access times and counters from lookups and writes them at most this often
+SQLITE_FLUSH_SECONDS = 5.0
+SQLITE_FLUSH_MAX_PENDING = 100
+
+
+class ResponseCache(ABC):
+    """
+    Bounded cache of JSON-serialisable values with LRU and TTL eviction
+
+    Values are stored serialised, so callers always get a fresh copy back and can never
+    mutate a cached entry. Entries expire after ttl_seconds; once either max_entries or
+    max_bytes is exceeded the least recently used entries are evicted. Hit, miss and
+    eviction counters are kept alongside the entries and reported by stats().
+    """
+
+    backend = "abstract"
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or if the entry has expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any):
+        """Store value under key, evicting expired and least recently used entries as needed"""
+
+    @abstractmethod
+    def clear(self):
+        """Drop every entry and reset the counters"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus current size, for monitoring"""
+
+    def _encode(self, key: str, value: Any) -> Optional[str]:
+        payload = json.dumps(value)
+        if len(payload.encode("utf-8")) > self.max_bytes:
+            logger.warning(f"Value for cache key {key} is larger than the cache ({len(payload)} bytes), not caching")
+            return None
+        return payload
+
+    def _summary(self, counters: Dict[str, int], entries: int, size_bytes: int) -> Dict[str, Any]:
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "backend": self.backend,
+            **counters,
+            "hit_rate": counters["hits"] / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-process ResponseCache; fast, but every worker process warms its own copy"""
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        super().__init__(max_entries, max_bytes, ttl_seconds)
+        # key -> (payload, size_bytes, created_at), ordered from least to most recently used
+        self._entries: OrderedDict = OrderedDict()
+        self._size_bytes = 0
+        self._counters = dict.fromkeys(STAT_NAMES, 0)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+
+            payload, size_bytes, created_at = entry
+            if time.time() - created_at > self.ttl_seconds:
+                self._remove(key)
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+
+        return json.loads(payload)
+
+    def set(self, key: str, value: Any):
+        payload = self._encode(key, value)
+        if payload is None:
+            return
+
+        now = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            size_bytes = len(payload.encode("utf-8"))
+            self._entries[key] = (payload, size_bytes, now)
+            self._size_bytes += size_bytes
+            self._counters["sets"] += 1
+            self._evict(now)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size_bytes = 0
+            self._counters = dict.fromkeys(STAT_NAMES, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._summary(dict(self._counters), len(self._entries), self._size_bytes)
+
+    def _remove(self, key: str):
+        _, size_bytes, _ = self._entries.pop(key)
+        self._size_bytes -= size_bytes
+
+    def _evict(self, now: float):
+        for key in [key for key, (_, _, created_at) in self._entries.items() if now - created_at > self.ttl_seconds]:
+            self._remove(key)
+            self._counters["expirations"] += 1
+
+        while len(self._entries) > self.max_entries or self._size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self._counters["evictions"] += 1
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    ResponseCache in a SQLite file, shared by every worker process pointing at the same path
+
+    Counters live in the same file, so stats() reports hits across all workers. A lookup only
+    reads the file: its access time and counters are buffered and written in one transaction
+    by the next set(), stats() or flush(), or once flush_seconds or flush_max_pending is reached.
+    """
+
+    backend = "sqlite"
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int,
+        max_bytes: int,
+        ttl_seconds: float,
+        namespace: str = "default",
+        flush_seconds: float = SQLITE_FLUSH_SECONDS,
+        flush_max_pending: int = SQLITE_FLUSH_MAX_PENDING,
+    ):
+        super().__init__(max_entries, max_bytes, ttl_seconds)
+        self.path = path
+        self.namespace = namespace
+        self.flush_seconds = flush_seconds
+        self.flush_max_pending = flush_max_pending
+
+        # Lookups not yet written to the file: key -> last access time, and counter increments
+        self._pending_access: Dict[str, float] = {}
+        self._pending_counts = dict.fromkeys(STAT_NAMES, 0)
+        self._pending_lookups = 0
+        self._last_flush = time.monotonic()
+        self._pending_lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_last_accessed ON cache_entries (namespace, last_accessed)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_stats (
+                    namespace TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    value INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (namespace, name)
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Short-lived connection per call, which keeps the cache safe to use from any thread or process"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, conn: sqlite3.Connection, name: str, amount: int = 1):
+        if amount:
+            conn.execute(
+                "INSERT INTO cache_stats (namespace, name, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (namespace, name) DO UPDATE SET value = value + excluded.value",
+                (self.namespace, name, amount),
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+            expired = row is not None and now - row[1] > self.ttl_seconds
+            if expired:
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+        with self._pending_lock:
+            if row is None or expired:
+                self._pending_counts["misses"] += 1
+                if expired:
+                    self._pending_counts["expirations"] += 1
+                self._pending_access.pop(key, None)
+            else:
+                self._pending_counts["hits"] += 1
+                self._pending_access[key] = now
+            self._pending_lookups += 1
+            due = (
+                self._pending_lookups >= self.flush_max_pending
+                or time.monotonic() - self._last_flush >= self.flush_seconds
+            )
+        if due:
+            self.flush()
+
+        return None if row is None or expired else json.loads(row[0])
+
+    def flush(self):
+        """Write the buffered access times and counters of lookups to the file"""
+        with self._connect() as conn:
+            self._write_pending(conn)
+
+    def _write_pending(self, conn: sqlite3.Connection):
+        with self._pending_lock:
+            access, counts = self._pending_access, self._pending_counts
+            self._pending_access, self._pending_counts = {}, dict.fromkeys(STAT_NAMES, 0)
+            self._pending_lookups = 0
+            self._last_flush = time.monotonic()
+
+        conn.executemany(
+            "UPDATE cache_entries SET last_accessed = MAX(last_accessed, ?) WHERE namespace = ? AND key = ?",
+            [(accessed, self.namespace, key) for key, accessed in access.items()],
+        )
+        for name, amount in counts.items():
+            self._count(conn, name, amount)
+
+    def set(self, key: str, value: Any):
+        payload = self._encode(key, value)
+        if payload is None:
+            return
+
+        now = time.time()
+        with self._connect() as conn:
+            # Recent lookups decide which entries are least recently used
+            self._write_pending(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size_bytes, created_at, last_accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, payload, len(payload.encode("utf-8")), now, now),
+            )
+            self._count(conn, "sets")
+            self._evict(conn, now)
+
+    def clear(self):
+        with self._pending_lock:
+            self._pending_access, self._pending_counts = {}, dict.fromkeys(STAT_NAMES, 0)
+            self._pending_lookups = 0
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+            conn.execute("DELETE FROM cache_stats WHERE namespace = ?", (self.namespace,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            self._write_pending(conn)
+            counters = dict.fromkeys(STAT_NAMES, 0)
+            counters.update(conn.execute(
+                "SELECT name, value FROM cache_stats WHERE namespace = ?", (self.namespace,)
+            ).fetchall())
+            entries, size_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+        return self._summary(counters, entries, size_bytes)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        expired = conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND created_at < ?", (self.namespace, now - self.ttl_seconds)
+        ).rowcount
+        self._count(conn, "expirations", expired)
+
+        entries, total_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        if entries <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+
+        # Walk entries from least to most recently used until both limits are met
+        evicted = []
+        for key, size_bytes in conn.execute(
+            "SELECT key, size_bytes FROM cache_entries WHERE namespace = ? ORDER BY last_accessed", (self.namespace,)
+        ).fetchall():
+            if entries <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            evicted.append((self.namespace, key))
+            entries -= 1
+            total_bytes -= size_bytes
+
+        conn.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", evicted)
+        self._count(conn, "evictions", len(evicted))
+
+
+def create_response_cache(
+    backend: str,
+    max_entries: int,
+    max_bytes: int,
+    ttl_seconds: float,
+    path: Optional[str] = None,
+    namespace: str = "default",
+) -> ResponseCache:
+    """
+    Build a ResponseCache for the configured backend
+
+    Args:
+        backend: "memory" for a per-process cache, or "sqlite" for one shared through the file at path
+        max_entries: Maximum number of entries kept
+        max_bytes: Maximum total size of the serialised values
+        ttl_seconds: Entries older than this are treated as misses
+        path: SQLite file, required for the "sqlite" backend
+        namespace: Keeps several caches apart inside one SQLite file
+    """
+    if backend == "memory":
+        return MemoryResponseCache(max_entries, max_bytes, ttl_seconds)
+    if backend == "sqlite":
+        if not path:
+            raise ValueError("The sqlite cache backend needs a path")
+        return SQLiteResponseCache(path, max_entries, max_bytes, ttl_seconds, namespace=namespace)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -1,2 +1,47 @@
 # Core configuration settings
+import os
+
 SQLALCHEMY_DATABASE_URL = "sqlite:///./database/app.db"
+
+# Coursito result cache (SQLite file keyed by YouTube video id)
+COURSITO_CACHE_PATH = os.environ.get("COURSITO_CACHE_PATH", "./database/coursito_cache.db")
+COURSITO_CACHE_TTL_SECONDS = int(os.environ.get("COURSITO_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+COURSITO_CACHE_MAX_BYTES = int(os.environ.get("COURSITO_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# CoachPilot response cache; the sqlite backend is shared by every uvicorn worker using the same file
+COACHPILOT_CACHE_BACKEND = os.environ.get("COACHPILOT_CACHE_BACKEND", "sqlite")
+COACHPILOT_CACHE_PATH = os.environ.get("COACHPILOT_CACHE_PATH", "./database/coachpilot_cache.db")
+COACHPILOT_CACHE_MAX_ENTRIES = int(os.environ.get("COACHPILOT_CACHE_MAX_ENTRIES", "1000"))
+COACHPILOT_CACHE_MAX_BYTES = int(os.environ.get("COACHPILOT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+COACHPILOT_CACHE_TTL_SECONDS = int(os.environ.get("COACHPILOT_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# CoachPilot semantic cache: reuse a response when a new query's embedding is this similar to a cached one
+COACHPILOT_SEMANTIC_CACHE_ENABLED = os.environ.get("COACHPILOT_SEMANTIC_CACHE_ENABLED", "1") == "1"
+COACHPILOT_SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("COACHPILOT_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+COACHPILOT_SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("COACHPILOT_SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+COACHPILOT_EMBEDDING_MODEL = os.environ.get("COACHPILOT_EMBEDDING_MODEL", "text-embedding-3-small")
+COACHPILOT_EMBEDDING_DIMENSIONS = int(os.environ.get("COACHPILOT_EMBEDDING_DIMENSIONS", "1536"))
+
+# CoachPilot concurrency: OpenAI calls in flight per worker, and threads running blocking vector searches
+COACHPILOT_MAX_CONCURRENT_LLM_CALLS = int(os.environ.get("COACHPILOT_MAX_CONCURRENT_LLM_CALLS", "16"))
+COACHPILOT_SEARCH_WORKERS = int(os.environ.get("COACHPILOT_SEARCH_WORKERS", "4"))
+
+# CoachPilot retrieval backend: "chroma" databases, or "flat" for an in-memory NumPy index of the chunk embeddings
+COACHPILOT_VECTOR_BACKEND = os.environ.get("COACHPILOT_VECTOR_BACKEND", "chroma")
+# Storage precision of the flat index matrix; float16 halves its memory
+COACHPILOT_FLAT_INDEX_DTYPE = os.environ.get("COACHPILOT_FLAT_INDEX_DTYPE", "float32")
+# Request-selected vector databases kept open besides the pinned default; the least recently searched is dropped beyond this
+COACHPILOT_MAX_OPEN_VECTOR_STORES = int(os.environ.get("COACHPILOT_MAX_OPEN_VECTOR_STORES", "8"))
+
+# Embedding cache shared by CoachPilot queries and knowledge base indexing
+EMBEDDING_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE_ENABLED", "1") == "1"
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", "./database/embedding_cache.db")
+# Embeddings kept; the least recently used are evicted beyond this (100k 1536-d vectors are about 600 MB)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+
+# Embedding rate limits for indexing; set to the account's tier limits for the embedding model
+EMBEDDING_TPM_LIMIT = int(os.environ.get("EMBEDDING_TPM_LIMIT", "1000000"))
+EMBEDDING_RPM_LIMIT = int(os.environ.get("EMBEDDING_RPM_LIMIT", "3000"))
+EMBEDDING_MAX_CONCURRENCY = int(os.environ.get("EMBEDDING_MAX_CONCURRENCY", "8"))
+# Tokens packed into one request; the API allows 300k, this leaves room for token estimates running low
+EMBEDDING_MAX_TOKENS_PER_REQUEST = int(os.environ.get("EMBEDDING_MAX_TOKENS_PER_REQUEST", "250000"))
@@ -1,20 +1,60 @@
 import os
 import json
 import tempfile
+import shutil
+import threading
 import subprocess
 import time
-from typing import Dict, Any, List, Optional, Tuple
-import openai
+from typing import Dict, Any, List, Optional, Tuple, Callable, Iterable, Iterator, Union
 import logging
-from dotenv import load_dotenv
-from pathlib import Path
+from contextlib import contextmanager
 import math
-from pydub import AudioSegment
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from app.core.openai_client import get_openai_client, load_api_key
+from app.core.retry import RetryPolicy, call_with_retry, openai_breaker
+from app.db.coursitoagent import CoursitoCache
+from app.utils.coursitoagent import (
+    iter_mp3_chunks,
+    extract_video_id,
+    canonical_video_url,
+    split_transcript,
+    merge_notes_and_flashcards,
+    merge_question_banks,
+)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Called as progress_callback(stage, status, progress) while a URL is processed
+ProgressCallback = Callable[[str, str, float], None]
+
+# Pipeline stages reported through the progress callback, in execution order
+PIPELINE_STAGES = ["download", "transcribe", "notes", "questions"]
+
+# Maximum number of audio chunks being transcribed at the same time
+DEFAULT_TRANSCRIBE_CONCURRENCY = int(os.environ.get("COURSITO_TRANSCRIBE_CONCURRENCY", "4"))
+
+# Transcripts longer than this are split into segments for notes and question generation
+DEFAULT_SEGMENT_MAX_CHARS = int(os.environ.get("COURSITO_SEGMENT_MAX_CHARS", "60000"))
+
+# Maximum number of segments sent to the model at the same time
+DEFAULT_GENERATION_CONCURRENCY = int(os.environ.get("COURSITO_GENERATION_CONCURRENCY", "4"))
+
+# Retry settings for the OpenAI calls; the engine adds jitter, honours Retry-After and caps total time
+TRANSCRIBE_RETRY_POLICY = RetryPolicy(max_attempts=5, base_delay=1.0, budget_seconds=600)
+GENERATION_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=2.0, budget_seconds=600)
+
+# Pipe the download straight into the chunker so transcription starts before the download finishes
+DEFAULT_STREAMING_DOWNLOAD = os.environ.get("COURSITO_STREAMING_DOWNLOAD", "1") == "1"
+
+# Average bitrate of the streamed MP3 (ffmpeg -q:a 0 is VBR at about 245 kbps), for estimating its size
+STREAMED_MP3_BYTES_PER_SECOND = 245_000 // 8
+
+# How long to wait for yt-dlp to report a video's duration before streaming without an estimate
+DURATION_PROBE_TIMEOUT_SECONDS = 30
+
 class CoursitoAgent:
     """
     CoursitoAgent handles YouTube video processing:
@@ -23,33 +63,32 @@ class CoursitoAgent:
     - Generates notes and flashcards from the transcript
     """
     
-    def __init__(self):
-        """Initialize the CoursitoAgent with API key from environment variables or .env file"""
-        # Try to load API key from environment first
-        self.api_key = os.environ.get("OPENAI_API_KEY")
-        
-        # If not found in environment, try to load from .env file
-        if not self.api_key:
-            logger.info("OpenAI API key not found in environment variables, checking .env file")
-            # Try different possible locations for the .env file
-            env_paths = [
-                Path(__file__).parent.parent.parent.parent / ".env",  # /backend/app/core -> /backend/.env
-                Path(__file__).parent.parent.parent.parent.parent / ".env",  # /backend/app/core -> /.env
-            ]
-            
-            for env_path in env_paths:
-                if env_path.exists():
-                    logger.info(f"Found .env file at {env_path}")
-                    load_dotenv(dotenv_path=env_path)
-                    self.api_key = os.environ.get("OPENAI_API_KEY")
-                    if self.api_key:
-                        logger.info("Successfully loaded OpenAI API key from .env file")
-                        break
-        
-        if not self.api_key:
-            logger.warning("OpenAI API key not found in environment variables or .env file")
-        else:
-            openai.api_key = self.api_key
+    def __init__(
+        self,
+        transcribe_concurrency: int = DEFAULT_TRANSCRIBE_CONCURRENCY,
+        streaming_download: bool = DEFAULT_STREAMING_DOWNLOAD,
+        cache: Optional[CoursitoCache] = None,
+        segment_max_chars: int = DEFAULT_SEGMENT_MAX_CHARS,
+        generation_concurrency: int = DEFAULT_GENERATION_CONCURRENCY,
+    ):
+        """
+        Initialize the CoursitoAgent with the shared OpenAI API key and client
+        
+        Args:
+            transcribe_concurrency: Maximum number of audio chunks transcribed in parallel
+            streaming_download: Transcribe audio chunks while the download is still in progress
+            cache: Optional result cache keyed by YouTube video id
+            segment_max_chars: Transcripts longer than this are processed in segments
+            generation_concurrency: Maximum number of segments processed in parallel
+        """
+        self.transcribe_concurrency = max(1, transcribe_concurrency)
+        self.streaming_download = streaming_download
+        self.cache = cache
+        self.segment_max_chars = segment_max_chars
+        self.generation_concurrency = max(1, generation_concurrency)
+        
+        # The API key and OpenAI client are shared process-wide
+        self.api_key = load_api_key()
             
     def download_audio(self, url: str) -> str:
         """
@@ -86,7 +125,116 @@ class CoursitoAgent:
         except subprocess.CalledProcessError as e:
             logger.error(f"Error downloading audio: {e.stderr}")
             raise RuntimeError(f"Failed to download audio: {e.stderr}")
+    
+    def stream_audio_chunks(self, url: str, output_dir: str, max_size_mb: int = 24) -> Iterator[str]:
+        """
+        Download audio from a YouTube URL and cut it into MP3 chunks while it downloads
+        
+        yt-dlp writes the best audio stream to stdout, ffmpeg converts it to MP3 on the fly,
+        and each chunk is yielded as soon as it is complete.
+        
+        Args:
+            url: YouTube URL
+            output_dir: Directory to write the chunks to
+            max_size_mb: Maximum size of each chunk in MB
+            
+        Yields:
+            Paths to the audio chunks, in playback order
+        """
+        logger.info(f"Streaming audio from URL: {url}")
+        
+        download_command = [
+            "yt-dlp",
+            "-f", "bestaudio",         # Audio-only stream, no post-processing needed
+            "--no-playlist",           # Don't download playlists if URL is part of one
+            "--quiet", "--no-progress",
+            "-o", "-",                 # Write the stream to stdout
+            url                        # URL to download from
+        ]
+        convert_command = [
+            "ffmpeg",
+            "-loglevel", "error",
+            "-i", "pipe:0",            # Read the downloaded stream from stdin
+            "-vn",
+            "-f", "mp3",
+            "-q:a", "0",               # Best VBR quality, as in download_audio
+            "pipe:1"                   # Write MP3 frames to stdout
+        ]
+        
+        # stderr goes to temporary files so a chatty process can never block on a full pipe
+        with tempfile.TemporaryFile() as download_errors, tempfile.TemporaryFile() as convert_errors:
+            downloader = converter = None
+            try:
+                downloader = subprocess.Popen(download_command, stdout=subprocess.PIPE, stderr=download_errors)
+                converter = subprocess.Popen(convert_command, stdin=downloader.stdout, stdout=subprocess.PIPE, stderr=convert_errors)
+                # Let yt-dlp receive SIGPIPE if ffmpeg exits early
+                downloader.stdout.close()
+                
+                yield from iter_mp3_chunks(converter.stdout, output_dir, max_chunk_bytes=max_size_mb * 1024 * 1024)
+            except BaseException:
+                # ffmpeg could not be started, transcription failed or the consumer stopped early;
+                # stop whichever processes are running
+                for process in (downloader, converter):
+                    if process is not None:
+                        process.kill()
+                raise
+            finally:
+                if converter is not None:
+                    converter.stdout.close()
+                for process in (converter, downloader):
+                    if process is not None:
+                        process.wait()
+            
+            for process, errors in ((downloader, download_errors), (converter, convert_errors)):
+                if process.wait() != 0:
+                    errors.seek(0)
+                    message = errors.read().decode("utf-8", errors="replace")
+                    logger.error(f"Error streaming audio: {message}")
+                    raise RuntimeError(f"Failed to download audio: {message}")
+        
+        logger.info(f"Download complete: {url}")
+            
+    def estimate_chunk_count(self, url: str, max_size_mb: int = 24) -> Optional[int]:
+        """
+        Estimate how many chunks stream_audio_chunks will produce, from the video's duration
+        
+        Args:
+            url: YouTube URL
+            max_size_mb: Maximum size of each chunk in MB
+            
+        Returns:
+            Estimated number of chunks, or None if yt-dlp could not report the duration
+        """
+        command = ["yt-dlp", "--no-playlist", "--print", "duration", url]
+        try:
+            result = subprocess.run(
+                command, capture_output=True, text=True, check=True, timeout=DURATION_PROBE_TIMEOUT_SECONDS
+            )
+            duration = float(result.stdout.strip())
+        except (OSError, subprocess.SubprocessError, ValueError) as e:
+            logger.warning(f"Could not get the duration of {url}, transcription progress will be approximate: {str(e)}")
+            return None
+        
+        return max(1, math.ceil(duration * STREAMED_MP3_BYTES_PER_SECOND / (max_size_mb * 1024 * 1024)))
+    
+    def iter_audio_chunks(self, audio_file_path: str, output_dir: str, max_size_mb: int = 24) -> Iterator[str]:
+        """
+        Lazily split an MP3 into frame-aligned chunks, yielding each one as soon as it is written
+        
+        Chunks are cut on MP3 frame boundaries and copied byte for byte, so nothing is decoded
+        or re-encoded and memory use stays constant regardless of the input length.
+        
+        Args:
+            audio_file_path: Path to the audio file
+            output_dir: Directory to write the chunks to
+            max_size_mb: Maximum size of each chunk in MB (default: 24MB to stay under the 25MB limit)
             
+        Yields:
+            Paths to the audio chunks, in playback order
+        """
+        logger.info(f"Splitting audio file: {audio_file_path}")
+        return iter_mp3_chunks(audio_file_path, output_dir, max_chunk_bytes=max_size_mb * 1024 * 1024)
+    
     def split_audio_file(self, audio_file_path: str, max_size_mb: int = 24) -> List[str]:
         """
         Split an audio file into smaller chunks to avoid payload size limits
@@ -98,8 +246,6 @@ class CoursitoAgent:
         Returns:
             List of paths to the audio chunks
         """
-        logger.info(f"Splitting audio file: {audio_file_path}")
-        
         # Get file size
         file_size = os.path.getsize(audio_file_path)
         file_size_mb = file_size / (1024 * 1024)
@@ -109,44 +255,16 @@ class CoursitoAgent:
             logger.info("Audio file is small enough, no splitting needed")
             return [audio_file_path]
         
-        # Calculate number of chunks needed
-        num_chunks = math.ceil(file_size_mb / max_size_mb)
-        logger.info(f"Splitting audio into {num_chunks} chunks (file size: {file_size_mb:.2f} MB)")
-        
-        # Load the audio file
-        audio = AudioSegment.from_mp3(audio_file_path)
-        
-        # Calculate duration of each chunk
-        total_duration_ms = len(audio)
-        chunk_duration_ms = total_duration_ms // num_chunks
-        
-        # Create chunks
-        chunk_files = []
         temp_dir = os.path.dirname(audio_file_path)
-        
-        for i in range(num_chunks):
-            start_time = i * chunk_duration_ms
-            end_time = (i + 1) * chunk_duration_ms if i < num_chunks - 1 else total_duration_ms
-            
-            # Extract chunk
-            chunk = audio[start_time:end_time]
-            
-            # Save chunk to file
-            chunk_path = os.path.join(temp_dir, f"audio_chunk_{i+1}.mp3")
-            chunk.export(chunk_path, format="mp3")
-            chunk_files.append(chunk_path)
-            
-            chunk_size_mb = os.path.getsize(chunk_path) / (1024 * 1024)
-            logger.info(f"Created chunk {i+1}/{num_chunks}, size: {chunk_size_mb:.2f} MB")
-        
-        return chunk_files
+        return list(self.iter_audio_chunks(audio_file_path, temp_dir, max_size_mb))
     
-    def transcribe_audio(self, audio_file_path: str) -> str:
+    def transcribe_audio(self, audio_file_path: str, progress_callback: Optional[ProgressCallback] = None) -> str:
         """
         Transcribe audio file using OpenAI Whisper model with retry mechanism
         
         Args:
             audio_file_path: Path to the audio file
+            progress_callback: Optional callback notified after each transcribed chunk
             
         Returns:
             Transcription text
@@ -160,27 +278,81 @@ class CoursitoAgent:
         # OpenAI's limit is 25MB
         if file_size_mb > 24:
             logger.info(f"Audio file is too large ({file_size_mb:.2f} MB), splitting into chunks")
-            audio_chunks = self.split_audio_file(audio_file_path)
-            
-            # Transcribe each chunk and combine
-            full_transcript = ""
-            for i, chunk_path in enumerate(audio_chunks):
-                logger.info(f"Transcribing chunk {i+1}/{len(audio_chunks)}")
-                chunk_transcript = self._transcribe_single_file(chunk_path)
-                full_transcript += chunk_transcript + " "
-                
-                # Clean up chunk file if it's not the original
-                if chunk_path != audio_file_path:
-                    try:
-                        os.remove(chunk_path)
-                    except Exception as e:
-                        logger.warning(f"Error cleaning up chunk file: {str(e)}")
+            chunk_dir = tempfile.mkdtemp(dir=os.path.dirname(audio_file_path))
             
-            return full_transcript.strip()
+            try:
+                # Chunks are transcribed while the remaining ones are still being cut
+                audio_chunks = self.iter_audio_chunks(audio_file_path, chunk_dir)
+                transcripts = self.transcribe_chunks(
+                    audio_chunks, progress_callback, expected_chunks=math.ceil(file_size_mb / 24)
+                )
+            finally:
+                # Clean up the chunk files
+                shutil.rmtree(chunk_dir, ignore_errors=True)
+            
+            return " ".join(transcripts).strip()
         else:
             # For smaller files, just transcribe directly
             return self._transcribe_single_file(audio_file_path)
     
+    def transcribe_chunks(
+        self,
+        chunk_paths: Iterable[str],
+        progress_callback: Optional[ProgressCallback] = None,
+        expected_chunks: Union[int, "Future[Optional[int]]", None] = None,
+    ) -> List[str]:
+        """
+        Transcribe audio chunks concurrently, keeping at most transcribe_concurrency requests in flight
+        
+        Chunks are submitted as soon as chunk_paths yields them, and each chunk is retried on
+        its own, so a transient failure does not restart the batch.
+        
+        Args:
+            chunk_paths: Paths to the audio chunks, in playback order (may be a lazy iterator)
+            progress_callback: Optional callback notified after each transcribed chunk
+            expected_chunks: Estimated number of chunks, used for progress while chunks are still being
+                produced; may be a Future, which is used once it has resolved
+            
+        Returns:
+            Chunk transcripts in the same order as chunk_paths
+        """
+        with ThreadPoolExecutor(max_workers=self.transcribe_concurrency, thread_name_prefix="coursito-transcribe") as executor:
+            futures = []
+            completed = 0
+            lock = threading.Lock()
+            
+            def estimate() -> int:
+                if not isinstance(expected_chunks, Future):
+                    return expected_chunks or 0
+                if not expected_chunks.done() or expected_chunks.exception() is not None:
+                    return 0
+                return expected_chunks.result() or 0
+            
+            def on_done(future):
+                nonlocal completed
+                if future.cancelled() or future.exception() is not None:
+                    return
+                with lock:
+                    completed += 1
+                    total = max(len(futures), estimate(), completed)
+                self._report(progress_callback, "transcribe", "running", min(completed / total, 1.0))
+            
+            try:
+                for i, chunk_path in enumerate(chunk_paths):
+                    logger.info(f"Queueing chunk {i+1} for transcription")
+                    future = executor.submit(self._transcribe_single_file, chunk_path)
+                    with lock:
+                        futures.append(future)
+                    future.add_done_callback(on_done)
+                
+                # Results are collected in submission order, which is playback order
+                return [future.result() for future in futures]
+            except Exception:
+                # Splitting failed or a chunk exhausted its retries; don't start the ones still queued
+                for future in futures:
+                    future.cancel()
+                raise
+    
     def _transcribe_single_file(self, audio_file_path: str) -> str:
         """
         Helper method to transcribe a single audio file with retries
@@ -191,66 +363,73 @@ class CoursitoAgent:
         Returns:
             Transcription text
         """
-        max_retries = 5
-        retry_delay = 1  # Start with 1 second delay
+        def attempt():
+            with open(audio_file_path, "rb") as audio_file:
+                # Call OpenAI API for transcription
+                client = get_openai_client()
+                return client.audio.transcriptions.create(
+                    model="gpt-4o-transcribe",  # Using Whisper model for transcription
+                    file=audio_file,
+                    response_format="text"
+                )
         
-        for attempt in range(max_retries):
-            try:
-                with open(audio_file_path, "rb") as audio_file:
-                    # Call OpenAI API for transcription
-                    client = openai.OpenAI()
-                    transcript = client.audio.transcriptions.create(
-                        model="gpt-4o-transcribe",  # Using Whisper model for transcription
-                        file=audio_file,
-                        response_format="text"
-                    )
-                
-                logger.info(f"Transcription complete for file: {os.path.basename(audio_file_path)}")
-                return transcript
-            
-            except Exception as e:
-                logger.error(f"Error transcribing audio (attempt {attempt+1}/{max_retries}): {str(e)}")
-                
-                # Check if we should retry
-                if attempt < max_retries - 1:
-                    # Exponential backoff
-                    sleep_time = retry_delay * (2 ** attempt)
-                    logger.info(f"Retrying in {sleep_time:.2f} seconds...")
-                    time.sleep(sleep_time)
-                    
-                    # Need to reopen the file for the next attempt
-                    if not os.path.exists(audio_file_path):
-                        logger.error("Audio file no longer exists, cannot retry.")
-                        raise RuntimeError("Audio file no longer exists, cannot retry transcription.")
-                else:
-                    # Max retries reached, give up
-                    logger.error("Max retries reached for transcription.")
-                    raise RuntimeError(f"Failed to transcribe audio after {max_retries} attempts: {str(e)}")
+        try:
+            transcript = call_with_retry(attempt, policy=TRANSCRIBE_RETRY_POLICY, breaker=openai_breaker, description="transcribing audio")
+        except Exception as e:
+            raise RuntimeError(f"Failed to transcribe audio: {str(e)}")
+        
+        logger.info(f"Transcription complete for file: {os.path.basename(audio_file_path)}")
+        return transcript
+    
+    def _map_segments(self, func: Callable[[str], Any], transcript: str) -> List[Any]:
+        """Run func on each transcript segment in parallel, returning results in transcript order"""
+        segments = split_transcript(transcript, self.segment_max_chars)
+        logger.info(f"Transcript is {len(transcript)} characters, processing {len(segments)} segments in parallel")
+        
+        max_workers = min(self.generation_concurrency, len(segments))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="coursito-segment") as executor:
+            return list(executor.map(func, segments))
     
     def generate_notes_and_flashcards(self, transcript: str) -> Dict[str, Any]:
         """
         Generate formatted notes and flashcards from the transcript using GPT-4o
         
+        Transcripts longer than segment_max_chars are processed segment by segment in
+        parallel and the per-segment results merged, so no call exceeds the model context.
+        
         Args:
             transcript: Transcription text
             
         Returns:
             Dictionary containing notes and flashcards
         """
-        logger.info("Generating notes and flashcards")
+        if len(transcript) <= self.segment_max_chars:
+            return self._generate_notes_and_flashcards_single(transcript)
         
-        max_retries = 3
-        retry_delay = 2  # Start with 2 second delay
+        result = merge_notes_and_flashcards(self._map_segments(self._generate_notes_and_flashcards_single, transcript))
+        logger.info(f"Merged notes into {len(result['notes'])} sections and {len(result['flashcards'])} flashcards")
+        return result
+    
+    def _generate_notes_and_flashcards_single(self, transcript: str) -> Dict[str, Any]:
+        """
+        Generate notes and flashcards for a transcript (or transcript segment) with a single call
         
-        for attempt in range(max_retries):
-            try:
-                # Call GPT-4o to generate notes and flashcards
-                client = openai.OpenAI()
-                response = client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": "You are an expert educator. Your task is to convert a lecture transcript into professionally formatted notes and flashcards."},
-                        {"role": "user", "content": f"""Here is a transcript of a lecture or educational content:
+        Args:
+            transcript: Transcription text
+            
+        Returns:
+            Dictionary containing notes and flashcards
+        """
+        logger.info("Generating notes and flashcards")
+        
+        def attempt():
+            # Call GPT-4o to generate notes and flashcards
+            client = get_openai_client()
+            response = client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": "You are an expert educator. Your task is to convert a lecture transcript into professionally formatted notes and flashcards."},
+                    {"role": "user", "content": f"""Here is a transcript of a lecture or educational content:
                         
 {transcript}
 
@@ -273,70 +452,76 @@ Format your response as a JSON with the following structure:
     }}
   ]
 }}"""}
-                    ]
-                )
-                
-                content = response.choices[0].message.content
-                
-                # Extract JSON from the response
-                try:
-                    # Try to parse the entire response as JSON
-                    result = json.loads(content)
-                except json.JSONDecodeError:
-                    # If that fails, try to extract JSON from the text
-                    import re
-                    json_match = re.search(r'```json\n(.*?)\n```', content, re.DOTALL)
+                ]
+            )
+            
+            content = response.choices[0].message.content
+            
+            # Extract JSON from the response
+            try:
+                # Try to parse the entire response as JSON
+                result = json.loads(content)
+            except json.JSONDecodeError:
+                # If that fails, try to extract JSON from the text
+                import re
+                json_match = re.search(r'```json\n(.*?)\n```', content, re.DOTALL)
+                if json_match:
+                    result = json.loads(json_match.group(1))
+                else:
+                    # If no JSON pattern is found, try to extract it differently
+                    json_match = re.search(r'\{[\s\S]*\}', content)
                     if json_match:
-                        result = json.loads(json_match.group(1))
+                        result = json.loads(json_match.group(0))
                     else:
-                        # If no JSON pattern is found, try to extract it differently
-                        json_match = re.search(r'\{[\s\S]*\}', content)
-                        if json_match:
-                            result = json.loads(json_match.group(0))
-                        else:
-                            raise ValueError("Could not extract JSON from the response")
-                
-                logger.info("Generated notes and flashcards successfully")
-                return result
+                        raise ValueError("Could not extract JSON from the response")
             
-            except Exception as e:
-                logger.error(f"Error generating notes and flashcards (attempt {attempt+1}/{max_retries}): {str(e)}")
-                
-                # Check if we should retry
-                if attempt < max_retries - 1:
-                    # Exponential backoff
-                    sleep_time = retry_delay * (2 ** attempt)
-                    logger.info(f"Retrying in {sleep_time:.2f} seconds...")
-                    time.sleep(sleep_time)
-                else:
-                    # Max retries reached, give up
-                    logger.error("Max retries reached for generating notes and flashcards.")
-                    raise RuntimeError(f"Failed to generate notes and flashcards after {max_retries} attempts: {str(e)}")
+            logger.info("Generated notes and flashcards successfully")
+            return result
+        
+        try:
+            return call_with_retry(attempt, policy=GENERATION_RETRY_POLICY, breaker=openai_breaker, description="generating notes and flashcards")
+        except Exception as e:
+            raise RuntimeError(f"Failed to generate notes and flashcards: {str(e)}")
     
     def generate_question_bank(self, transcript: str) -> List[Dict[str, Any]]:
         """
         Generate a question bank from the transcript using GPT-4o
         
+        Long transcripts are handled segment by segment, like generate_notes_and_flashcards.
+        
         Args:
             transcript: Transcription text
             
         Returns:
             List of questions with options and answers
         """
-        logger.info("Generating question bank")
+        if len(transcript) <= self.segment_max_chars:
+            return self._generate_question_bank_single(transcript)
         
-        max_retries = 3
-        retry_delay = 2  # Start with 2 second delay
+        questions = merge_question_banks(self._map_segments(self._generate_question_bank_single, transcript))
+        logger.info(f"Merged question bank with {len(questions)} questions")
+        return questions
+    
+    def _generate_question_bank_single(self, transcript: str) -> List[Dict[str, Any]]:
+        """
+        Generate a question bank for a transcript (or transcript segment) with a single call
         
-        for attempt in range(max_retries):
-            try:
-                # Call GPT-4o to generate questions
-                client = openai.OpenAI()
-                response = client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": "You are an expert educator designing assessment questions. Create diverse question types including multiple choice, true/false, and short answer questions."},
-                        {"role": "user", "content": f"""Here is a transcript of educational content:
+        Args:
+            transcript: Transcription text
+            
+        Returns:
+            List of questions with options and answers
+        """
+        logger.info("Generating question bank")
+        
+        def attempt():
+            # Call GPT-4o to generate questions
+            client = get_openai_client()
+            response = client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": "You are an expert educator designing assessment questions. Create diverse question types including multiple choice, true/false, and short answer questions."},
+                    {"role": "user", "content": f"""Here is a transcript of educational content:
                         
 {transcript}
 
@@ -357,82 +542,174 @@ Format your response as a JSON array with the following structure:
     "explanation": "Explanation why this is the correct answer"
   }}
 ]"""}
-                    ]
-                )
-                
-                content = response.choices[0].message.content
-                
-                # Extract JSON from the response
-                try:
-                    # Try to parse the entire response as JSON
-                    result = json.loads(content)
-                except json.JSONDecodeError:
-                    # If that fails, try to extract JSON from the text
-                    import re
-                    json_match = re.search(r'```json\n(.*?)\n```', content, re.DOTALL)
+                ]
+            )
+            
+            content = response.choices[0].message.content
+            
+            # Extract JSON from the response
+            try:
+                # Try to parse the entire response as JSON
+                result = json.loads(content)
+            except json.JSONDecodeError:
+                # If that fails, try to extract JSON from the text
+                import re
+                json_match = re.search(r'```json\n(.*?)\n```', content, re.DOTALL)
+                if json_match:
+                    result = json.loads(json_match.group(1))
+                else:
+                    # If no JSON pattern is found, try to extract it differently
+                    json_match = re.search(r'\[[\s\S]*\]', content)
                     if json_match:
-                        result = json.loads(json_match.group(1))
+                        result = json.loads(json_match.group(0))
                     else:
-                        # If no JSON pattern is found, try to extract it differently
-                        json_match = re.search(r'\[[\s\S]*\]', content)
-                        if json_match:
-                            result = json.loads(json_match.group(0))
-                        else:
-                            raise ValueError("Could not extract JSON from the response")
-                
-                logger.info(f"Generated question bank with {len(result)} questions successfully")
-                return result
+                        raise ValueError("Could not extract JSON from the response")
             
-            except Exception as e:
-                logger.error(f"Error generating question bank (attempt {attempt+1}/{max_retries}): {str(e)}")
-                
-                # Check if we should retry
-                if attempt < max_retries - 1:
-                    # Exponential backoff
-                    sleep_time = retry_delay * (2 ** attempt)
-                    logger.info(f"Retrying in {sleep_time:.2f} seconds...")
-                    time.sleep(sleep_time)
-                else:
-                    # Max retries reached, give up
-                    logger.error("Max retries reached for generating question bank.")
-                    raise RuntimeError(f"Failed to generate question bank after {max_retries} attempts: {str(e)}")
+            logger.info(f"Generated question bank with {len(result)} questions successfully")
+            return result
+        
+        try:
+            return call_with_retry(attempt, policy=GENERATION_RETRY_POLICY, breaker=openai_breaker, description="generating question bank")
+        except Exception as e:
+            raise RuntimeError(f"Failed to generate question bank: {str(e)}")
+    
+    @staticmethod
+    def _report(progress_callback: Optional[ProgressCallback], stage: str, status: str, progress: float = 0.0):
+        """Forward a stage update to the progress callback, never letting it break the pipeline"""
+        if progress_callback is None:
+            return
+        try:
+            progress_callback(stage, status, progress)
+        except Exception as e:
+            logger.warning(f"Progress callback failed for stage {stage}: {str(e)}")
+    
+    @contextmanager
+    def _stage(self, progress_callback: Optional[ProgressCallback], timings: Dict[str, float], stage: str):
+        """Report a pipeline stage's start, completion or failure and record how long it took"""
+        self._report(progress_callback, stage, "running")
+        start_time = time.time()
+        try:
+            yield
+        except BaseException:
+            self._report(progress_callback, stage, "failed")
+            raise
+        finally:
+            timings[stage] = round(time.time() - start_time, 3)
+        self._report(progress_callback, stage, "completed", 1.0)
     
-    def process_youtube_url(self, url: str) -> Dict[str, Any]:
+    def _run_stage(self, progress_callback: Optional[ProgressCallback], timings: Dict[str, float], stage: str, func: Callable, *args, **kwargs):
+        """Run one pipeline stage as a single call"""
+        with self._stage(progress_callback, timings, stage):
+            return func(*args, **kwargs)
+    
+    def _timed_chunks(self, chunks: Iterator[str], progress_callback: Optional[ProgressCallback], timings: Dict[str, float]) -> Iterator[str]:
+        """Track the download stage across a lazily produced stream of chunks"""
+        with self._stage(progress_callback, timings, "download"):
+            yield from chunks
+    
+    def _download_and_transcribe(self, url: str, progress_callback: Optional[ProgressCallback], timings: Dict[str, float]) -> str:
+        """Transcribe audio chunks as they are downloaded, overlapping the two stages"""
+        chunk_dir = tempfile.mkdtemp()
+        # The duration probe is a separate yt-dlp call; run it alongside the download instead of before it
+        probe = ThreadPoolExecutor(max_workers=1, thread_name_prefix="coursito-probe")
+        expected_chunks = probe.submit(self.estimate_chunk_count, url)
+        probe.shutdown(wait=False)
+        try:
+            chunks = self._timed_chunks(self.stream_audio_chunks(url, chunk_dir), progress_callback, timings)
+            with self._stage(progress_callback, timings, "transcribe"):
+                transcripts = self.transcribe_chunks(chunks, progress_callback, expected_chunks=expected_chunks)
+            return " ".join(transcripts).strip()
+        finally:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+    
+    def _get_cached_result(self, video_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Look up a video in the result cache; cache errors are treated as misses"""
+        if self.cache is None or video_id is None:
+            return None
+        try:
+            return self.cache.get(video_id)
+        except Exception as e:
+            logger.warning(f"Error reading the Coursito cache: {str(e)}")
+            return None
+    
+    def _cache_result(self, video_id: Optional[str], result: Dict[str, Any]):
+        """Store a processing result in the cache; failing to cache never fails the request"""
+        if self.cache is None or video_id is None:
+            return
+        try:
+            self.cache.put(video_id, result)
+        except Exception as e:
+            logger.warning(f"Error writing the Coursito cache: {str(e)}")
+    
+    def process_youtube_url(self, url: str, progress_callback: Optional[ProgressCallback] = None) -> Dict[str, Any]:
         """
         Process a YouTube URL to generate transcript, notes, flashcards, and question bank
         
         Args:
             url: YouTube URL
+            progress_callback: Optional callback receiving (stage, status, progress) updates
             
         Returns:
-            Dictionary containing transcript, notes, flashcards, and question bank
+            Dictionary containing transcript, notes, flashcards, question bank and per-stage timings in seconds
         """
         try:
-            # Strip any playlist parameters from the URL
-            clean_url = url.split("&list=")[0] if "&list=" in url else url
+            start_time = time.time()
+            timings: Dict[str, float] = {}
             
-            # Download audio
-            audio_path = self.download_audio(clean_url)
+            # Normalise the URL to the canonical watch URL, dropping playlist and other parameters
+            video_id = extract_video_id(url)
+            if video_id:
+                clean_url = canonical_video_url(video_id)
+            else:
+                clean_url = url.split("&list=")[0] if "&list=" in url else url
             
-            # Transcribe audio
-            transcript = self.transcribe_audio(audio_path)
+            # Repeat lectures are served straight from the cache
+            cached = self._get_cached_result(video_id)
+            if cached is not None:
+                for stage in PIPELINE_STAGES:
+                    self._report(progress_callback, stage, "completed", 1.0)
+                cached["timings"] = {"total": round(time.time() - start_time, 3)}
+                logger.info(f"Served {clean_url} from the cache")
+                return cached
             
-            # Generate notes and flashcards
-            result = self.generate_notes_and_flashcards(transcript)
+            if self.streaming_download:
+                # Download and transcribe concurrently
+                transcript = self._download_and_transcribe(clean_url, progress_callback, timings)
+            else:
+                # Download audio
+                audio_path = self._run_stage(progress_callback, timings, "download", self.download_audio, clean_url)
+                
+                # Transcribe audio
+                try:
+                    transcript = self._run_stage(progress_callback, timings, "transcribe", self.transcribe_audio, audio_path, progress_callback)
+                finally:
+                    # Clean up the temporary audio file
+                    try:
+                        os.remove(audio_path)
+                        os.rmdir(os.path.dirname(audio_path))
+                    except Exception as e:
+                        logger.warning(f"Error cleaning up temporary files: {str(e)}")
             
-            # Generate question bank
-            questions = self.generate_question_bank(transcript)
+            # Notes/flashcards and the question bank are independent calls on the same transcript
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="coursito-generate") as executor:
+                notes_future = executor.submit(
+                    self._run_stage, progress_callback, timings, "notes", self.generate_notes_and_flashcards, transcript
+                )
+                questions_future = executor.submit(
+                    self._run_stage, progress_callback, timings, "questions", self.generate_question_bank, transcript
+                )
+                result = notes_future.result()
+                questions = questions_future.result()
             
             # Add transcript and questions to the result
             result["transcript"] = transcript
             result["questions"] = questions
             
-            # Clean up the temporary audio file
-            try:
-                os.remove(audio_path)
-                os.rmdir(os.path.dirname(audio_path))
-            except Exception as e:
-                logger.warning(f"Error cleaning up temporary files: {str(e)}")
+            self._cache_result(video_id, result)
+            
+            timings["total"] = round(time.time() - start_time, 3)
+            result["timings"] = timings
+            logger.info(f"Processed {clean_url} with stage timings: {timings}")
             
             return result
         
@@ -0,0 +1,240 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+from typing import Callable, Deque, List, Optional, Sequence, Tuple
+
+import openai
+
+from app.core.config import (
+    EMBEDDING_TPM_LIMIT,
+    EMBEDDING_RPM_LIMIT,
+    EMBEDDING_MAX_CONCURRENCY,
+    EMBEDDING_MAX_TOKENS_PER_REQUEST,
+)
+from app.core.openai_client import get_openai_client
+from app.core.retry import RetryPolicy, call_with_retry, openai_breaker, retry_after_seconds
+from app.utils.tokens import count_tokens_batch
+
+logger = logging.getLogger(__name__)
+
+# The embeddings endpoint accepts at most this many inputs per request
+MAX_INPUTS_PER_REQUEST = 2048
+
+# Called with (texts, embeddings) as each batch completes
+BatchCallback = Callable[[List[str], List[List[float]]], None]
+
+
+def pack_batches(
+    token_counts: Sequence[int],
+    max_tokens: int = EMBEDDING_MAX_TOKENS_PER_REQUEST,
+    max_inputs: int = MAX_INPUTS_PER_REQUEST,
+) -> List[List[int]]:
+    """
+    Group inputs into as few requests as possible without exceeding the per-request limits
+
+    Inputs keep their order; an input larger than max_tokens gets a request of its own.
+
+    Returns:
+        Lists of input positions, one list per request
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for position, tokens in enumerate(token_counts):
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(position)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class RateLimitBudget:
+    """
+    Sliding one-minute window of requests and tokens sent
+
+    acquire() blocks until a request of the given size fits under both the tokens-per-minute
+    and requests-per-minute limits. pause() holds everyone back after the server says to wait.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: int,
+        requests_per_minute: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self._clock = clock
+        self._sleep = sleep
+        self._sent: Deque[Tuple[float, int]] = deque()
+        self._tokens_in_window = 0
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int):
+        while True:
+            with self._lock:
+                now = self._clock()
+                while self._sent and now - self._sent[0][0] >= 60:
+                    self._tokens_in_window -= self._sent.popleft()[1]
+
+                if now >= self._resume_at:
+                    fits = (
+                        len(self._sent) < self.requests_per_minute
+                        and self._tokens_in_window + tokens <= self.tokens_per_minute
+                    )
+                    # A request larger than the whole budget goes through once the window is empty
+                    if fits or not self._sent:
+                        self._sent.append((now, tokens))
+                        self._tokens_in_window += tokens
+                        return
+                    wait = self._sent[0][0] + 60 - now
+                else:
+                    wait = self._resume_at - now
+            self._sleep(max(wait, 0.01))
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._resume_at = max(self._resume_at, self._clock() + seconds)
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit that adapts to rate limiting (additive increase, multiplicative decrease)
+
+    Every increase_after consecutive successes raise the limit by one, up to maximum;
+    a rate-limit response halves it, down to minimum.
+    """
+
+    def __init__(self, initial: int, maximum: int, minimum: int = 1, increase_after: int = 5):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.increase_after = increase_after
+        self.limit = max(minimum, min(initial, maximum))
+        self._active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.increase_after and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+    def on_rate_limited(self):
+        with self._condition:
+            self._successes = 0
+            new_limit = max(self.minimum, self.limit // 2)
+            if new_limit < self.limit:
+                logger.warning(f"Rate limited, reducing embedding concurrency from {self.limit} to {new_limit}")
+            self.limit = new_limit
+
+
+class EmbeddingBatcher:
+    """
+    Embeds large numbers of texts as fast as the account's rate limits allow
+
+    - Texts are packed into requests by token count, up to the per-request token and input limits
+    - A sliding-window budget keeps requests under the tokens- and requests-per-minute limits
+    - Concurrency grows while requests succeed and halves on every 429
+    - Only failed batches are retried; finished batches are reported through on_batch right away
+    """
+
+    def __init__(
+        self,
+        model: str,
+        tokens_per_minute: int = EMBEDDING_TPM_LIMIT,
+        requests_per_minute: int = EMBEDDING_RPM_LIMIT,
+        max_concurrency: int = EMBEDDING_MAX_CONCURRENCY,
+        max_tokens_per_request: int = EMBEDDING_MAX_TOKENS_PER_REQUEST,
+        policy: RetryPolicy = RetryPolicy(max_attempts=6, base_delay=1.0, budget_seconds=600),
+    ):
+        self.model = model
+        self.max_tokens_per_request = max_tokens_per_request
+        self.policy = policy
+        self.budget = RateLimitBudget(tokens_per_minute, requests_per_minute)
+        self.concurrency = AdaptiveConcurrency(initial=max(1, max_concurrency // 2), maximum=max_concurrency)
+
+    def embed(self, texts: Sequence[str], on_batch: Optional[BatchCallback] = None) -> List[List[float]]:
+        """
+        Embed texts
+
+        Args:
+            texts: Texts to embed
+            on_batch: Called with (texts, embeddings) as each batch completes, e.g. to cache them
+
+        Returns:
+            One embedding per text, in input order
+        """
+        token_counts = count_tokens_batch(texts)
+        batches = pack_batches(token_counts, self.max_tokens_per_request)
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+
+        error: Optional[BaseException] = None
+        with ThreadPoolExecutor(max_workers=self.concurrency.maximum, thread_name_prefix="embed") as executor:
+            positions_by_future = {
+                executor.submit(self._embed_batch, [texts[i] for i in positions], sum(token_counts[i] for i in positions)): positions
+                for positions in batches
+            }
+            # Collect batches as they finish, so a failure still keeps (and reports) everything done so far
+            for future in as_completed(positions_by_future):
+                positions = positions_by_future[future]
+                try:
+                    vectors = future.result()
+                except CancelledError:
+                    continue
+                except Exception as e:
+                    if error is None:
+                        error = e
+                        for other in positions_by_future:
+                            other.cancel()
+                    continue
+
+                for i, vector in zip(positions, vectors):
+                    embeddings[i] = vector
+                if on_batch is not None:
+                    on_batch([texts[i] for i in positions], vectors)
+
+        if error is not None:
+            raise error
+        return embeddings
+
+    def _embed_batch(self, batch: List[str], tokens: int) -> List[List[float]]:
+        def attempt():
+            self.budget.acquire(tokens)
+            with self.concurrency:
+                try:
+                    response = get_openai_client().embeddings.create(model=self.model, input=batch)
+                except openai.RateLimitError as e:
+                    self.concurrency.on_rate_limited()
+                    self.budget.pause(retry_after_seconds(e) or 1.0)
+                    raise
+            self.concurrency.on_success()
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+        return call_with_retry(
+            attempt,
+            policy=self.policy,
+            breaker=openai_breaker,
+            description=f"embedding batch of {len(batch)} texts ({tokens} tokens)",
+        )
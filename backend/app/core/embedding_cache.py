@@ -0,0 +1,163 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Any, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# A hit only refreshes an entry's last_used once it is this stale, so hot lookups stay read-only
+LAST_USED_RESOLUTION_SECONDS = 60.0
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of embeddings keyed by (model, SHA-256 of the text)
+
+    Vectors are stored as raw float32 bytes in a SQLite file, so the query path and the
+    indexing pipeline share it across processes and runs. Once more than max_entries are
+    stored, the least recently used are evicted. Hit, miss and eviction counters are kept
+    per process and reported by stats().
+    """
+
+    def __init__(self, path: str, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._counters = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash BLOB NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                ) WITHOUT ROWID
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(embeddings)")}
+            if "last_used" not in columns:
+                # Caches written before eviction existed
+                conn.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+                conn.execute("UPDATE embeddings SET last_used = created_at")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Short-lived connection per call, which keeps the cache safe to use from any thread"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Look up embeddings for texts
+
+        Returns:
+            One entry per text: the cached embedding, or None on a miss
+        """
+        if not texts:
+            return []
+
+        hashes = [text_hash(text) for text in texts]
+        found: Dict[bytes, List[float]] = {}
+        now = time.time()
+        with self._connect() as conn:
+            # Stay well below SQLite's limit on bound parameters
+            unique_hashes = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique_hashes), 500):
+                batch = unique_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                stale = []
+                for digest, vector, last_used in conn.execute(
+                    f"SELECT text_hash, vector, last_used FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *batch),
+                ):
+                    found[bytes(digest)] = np.frombuffer(vector, dtype=np.float32).tolist()
+                    if last_used < now - LAST_USED_RESOLUTION_SECONDS:
+                        stale.append((now, model, digest))
+                if stale:
+                    conn.executemany("UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?", stale)
+
+        results = [found.get(digest) for digest in hashes]
+        hits = sum(result is not None for result in results)
+        with self._lock:
+            self._counters["hits"] += hits
+            self._counters["misses"] += len(results) - hits
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """Store embeddings for texts"""
+        if not texts:
+            return
+
+        now = time.time()
+        rows = [
+            (model, text_hash(text), np.asarray(embedding, dtype=np.float32).tobytes(), now, now)
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            evicted = self._evict(conn)
+        with self._lock:
+            self._counters["writes"] += len(rows)
+            self._counters["evictions"] += evicted
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """Delete the least recently used entries beyond max_entries; returns how many were deleted"""
+        excess = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_entries
+        if excess <= 0:
+            return 0
+        conn.execute(
+            "DELETE FROM embeddings WHERE (model, text_hash) IN "
+            "(SELECT model, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        return excess
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": counters["hits"] / lookups if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide embedding cache, or None when EMBEDDING_CACHE_ENABLED is off"""
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    return EmbeddingCache(EMBEDDING_CACHE_PATH)
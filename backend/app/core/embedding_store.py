@@ -0,0 +1,204 @@
+import os
+import json
+import mmap
+import shutil
+import logging
+import argparse
+from collections import abc
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.bin"
+METADATA_FILE = "metadata.jsonl"
+OFFSETS_FILE = "offsets.npy"
+
+# Chunk fields kept in the metadata sidecar
+RECORD_FIELDS = ("id", "content", "book_title", "chunk_index", "total_chunks")
+
+# Fields returned as Chroma-style metadata
+METADATA_FIELDS = ("book_title", "chunk_index", "total_chunks")
+
+
+class EmbeddingStoreWriter:
+    """
+    Writes an embedding store directory one chunk (or batch) at a time
+
+    Layout:
+    - embeddings.bin: raw row-major matrix of L2-normalised embeddings (float32 or float16)
+    - metadata.jsonl: one JSON record per row (id, content, book title and chunk position)
+    - offsets.npy: byte offset of every record in metadata.jsonl, plus the end offset
+    - manifest.json: row count, dimensions and dtype; written last, so a store without it is incomplete
+
+    The store is built in a temporary directory and moved into place on close(), so readers
+    never see a half-written store.
+    """
+
+    def __init__(self, path: str, dimensions: int, dtype: str = "float32", model: Optional[str] = None):
+        self.path = path
+        self.dimensions = dimensions
+        self.dtype = np.dtype(dtype)
+        self.model = model
+        self.count = 0
+
+        self._tmp_path = f"{path}.tmp"
+        shutil.rmtree(self._tmp_path, ignore_errors=True)
+        os.makedirs(self._tmp_path)
+        self._embeddings = open(os.path.join(self._tmp_path, EMBEDDINGS_FILE), "wb")
+        self._metadata = open(os.path.join(self._tmp_path, METADATA_FILE), "wb")
+        self._offsets = [0]
+
+    def add_batch(self, chunks: Sequence[Dict[str, Any]]):
+        """Append chunks that carry an "embedding" alongside their content and metadata"""
+        if not chunks:
+            return
+
+        matrix = np.asarray([chunk["embedding"] for chunk in chunks], dtype=np.float32)
+        if matrix.shape[1] != self.dimensions:
+            raise ValueError(f"Expected {self.dimensions}-dimensional embeddings, got {matrix.shape[1]}")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._embeddings.write((matrix / norms).astype(self.dtype).tobytes())
+
+        for chunk in chunks:
+            record = {field: chunk.get(field) for field in RECORD_FIELDS}
+            self._metadata.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+            self._offsets.append(self._metadata.tell())
+        self.count += len(chunks)
+
+    def add(self, chunk: Dict[str, Any]):
+        self.add_batch([chunk])
+
+    def close(self):
+        """Finish the store and move it into place, replacing any previous store at path"""
+        self._embeddings.close()
+        self._metadata.close()
+        np.save(os.path.join(self._tmp_path, OFFSETS_FILE), np.asarray(self._offsets, dtype=np.uint64))
+        with open(os.path.join(self._tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump({"count": self.count, "dimensions": self.dimensions, "dtype": self.dtype.name, "model": self.model}, f)
+
+        old_path = f"{self.path}.old"
+        if os.path.exists(self.path):
+            os.replace(self.path, old_path)
+        os.replace(self._tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        logger.info(f"Wrote embedding store with {self.count} chunks to {self.path}")
+
+    def abort(self):
+        """Discard everything written so far"""
+        self._embeddings.close()
+        self._metadata.close()
+        shutil.rmtree(self._tmp_path, ignore_errors=True)
+
+    def __enter__(self) -> "EmbeddingStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class _RecordField(abc.Sequence):
+    """Read-only sequence view of one field (or a dictionary of several) of the store's records, parsed on access"""
+
+    def __init__(self, store: "EmbeddingStore", field: Union[str, Tuple[str, ...]]):
+        self._store = store
+        self._field = field
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        record = self._store.record(int(index))
+        if isinstance(self._field, tuple):
+            return {key: record.get(key) for key in self._field}
+        return record.get(self._field)
+
+
+class EmbeddingStore:
+    """
+    Read side of an embedding store, memory-mapped rather than loaded
+
+    The embedding matrix and the metadata sidecar are mapped read-only, so every worker
+    process that opens the same store shares one page-cached copy, and opening is instant
+    regardless of corpus size. Records are parsed only when a search returns them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+
+        count, dimensions = self.manifest["count"], self.manifest["dimensions"]
+        self.embeddings = np.memmap(
+            os.path.join(path, EMBEDDINGS_FILE), dtype=self.manifest["dtype"], mode="r", shape=(count, dimensions)
+        ) if count else np.empty((0, dimensions), dtype=self.manifest["dtype"])
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+
+        self._metadata_file = open(os.path.join(path, METADATA_FILE), "rb")
+        self._metadata = mmap.mmap(self._metadata_file.fileno(), 0, access=mmap.ACCESS_READ) if count else b""
+
+        self.ids = _RecordField(self, "id")
+        self.documents = _RecordField(self, "content")
+        self.metadatas = _RecordField(self, METADATA_FIELDS)
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    def record(self, index: int) -> Dict[str, Any]:
+        """Full metadata record of one row"""
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return json.loads(self._metadata[start:end])
+
+    def close(self):
+        if isinstance(self._metadata, mmap.mmap):
+            self._metadata.close()
+        self._metadata_file.close()
+
+
+def is_embedding_store(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def convert_json_to_store(json_path: str, store_path: str, dtype: str = "float32", batch_size: int = 1024) -> int:
+    """
+    Convert chunks_with_embeddings.json (a list of chunks, or a dictionary keyed by id) into an embedding store
+
+    Returns:
+        Number of chunks written
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    if isinstance(chunks, dict):
+        chunks = list(chunks.values())
+    chunks: List[Dict[str, Any]] = [chunk for chunk in chunks if chunk.get("embedding")]
+    if not chunks:
+        raise ValueError(f"No embedded chunks found in {json_path}")
+
+    with EmbeddingStoreWriter(store_path, dimensions=len(chunks[0]["embedding"]), dtype=dtype) as writer:
+        for start in range(0, len(chunks), batch_size):
+            writer.add_batch(chunks[start:start + batch_size])
+    return writer.count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert chunks_with_embeddings.json into a memory-mapped embedding store")
+    parser.add_argument("json_path", help="Path to chunks_with_embeddings.json")
+    parser.add_argument("store_path", help="Directory to write the store to")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32", help="Storage precision of the embeddings")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    count = convert_json_to_store(args.json_path, args.store_path, dtype=args.dtype)
+    print(f"Wrote {count} chunks to {args.store_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from typing import List, Optional, Sequence
+
+from app.core.openai_client import get_async_openai_client
+from app.core.retry import RetryPolicy, acall_with_retry, openai_breaker
+from app.core.embedding_batcher import EmbeddingBatcher
+from app.core.embedding_cache import EmbeddingCache, get_embedding_cache
+
+logger = logging.getLogger(__name__)
+
+# Model the book knowledge base is embedded with; queries must use the same one
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+
+EMBEDDING_RETRY_POLICY = RetryPolicy(max_attempts=5, base_delay=1.0, budget_seconds=300)
+
+# Sentinel for "use the process-wide embedding cache"
+_DEFAULT_CACHE = object()
+
+
+def _resolve_cache(cache) -> Optional[EmbeddingCache]:
+    return get_embedding_cache() if cache is _DEFAULT_CACHE else cache
+
+
+def embed_texts(
+    texts: Sequence[str],
+    model: str = DEFAULT_EMBEDDING_MODEL,
+    cache=_DEFAULT_CACHE,
+    batcher: Optional[EmbeddingBatcher] = None,
+) -> List[List[float]]:
+    """
+    Embed any number of texts within the account's rate limits
+
+    Texts already in the embedding cache are not sent to the API. The rest are packed into
+    token-sized batches by an EmbeddingBatcher, and every finished batch is cached right away,
+    so a run that fails part-way only has to embed the failed batches again.
+
+    Args:
+        texts: Texts to embed
+        model: OpenAI embedding model
+        cache: EmbeddingCache to use, None to bypass caching (defaults to the process-wide cache)
+        batcher: Batcher to send requests through (defaults to one with the configured limits)
+
+    Returns:
+        One embedding per text, in input order
+    """
+    cache = _resolve_cache(cache)
+    embeddings = cache.get_many(model, texts) if cache is not None else [None] * len(texts)
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if not missing:
+        return embeddings
+
+    batcher = batcher or EmbeddingBatcher(model)
+    on_batch = (lambda batch, vectors: cache.put_many(model, batch, vectors)) if cache is not None else None
+    vectors = batcher.embed([texts[i] for i in missing], on_batch=on_batch)
+    for i, vector in zip(missing, vectors):
+        embeddings[i] = vector
+    return embeddings
+
+
+async def aembed_texts(
+    texts: Sequence[str],
+    model: str = DEFAULT_EMBEDDING_MODEL,
+    cache=_DEFAULT_CACHE,
+    limiter: Optional[asyncio.Semaphore] = None,
+    policy: RetryPolicy = EMBEDDING_RETRY_POLICY,
+) -> List[List[float]]:
+    """
+    Async counterpart of embed_texts for small inputs such as a user query
+
+    Cache I/O runs in a worker thread; limiter, if given, is only held around the API call,
+    so cache hits never wait behind in-flight requests.
+    """
+    cache = _resolve_cache(cache)
+    embeddings = await asyncio.to_thread(cache.get_many, model, texts) if cache is not None else [None] * len(texts)
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if not missing:
+        return embeddings
+
+    batch = [texts[i] for i in missing]
+    if limiter is not None:
+        await limiter.acquire()
+    try:
+        response = await acall_with_retry(
+            get_async_openai_client().embeddings.create,
+            model=model,
+            input=batch,
+            policy=policy,
+            breaker=openai_breaker,
+            description=f"embedding {len(batch)} texts",
+        )
+    finally:
+        if limiter is not None:
+            limiter.release()
+
+    vectors = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    for i, vector in zip(missing, vectors):
+        embeddings[i] = vector
+    if cache is not None:
+        await asyncio.to_thread(cache.put_many, model, batch, vectors)
+    return embeddings
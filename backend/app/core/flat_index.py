@@ -0,0 +1,155 @@
+import json
+import logging
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.embedding_store import EmbeddingStore
+
+logger = logging.getLogger(__name__)
+
+# Rows converted to float32 at a time when scoring a float16 matrix, which BLAS cannot multiply directly
+FLOAT16_BLOCK_ROWS = 16384
+
+
+class FlatIndex:
+    """
+    Exact (brute-force) nearest-neighbour index over the book chunks
+
+    All embeddings live L2-normalised in one contiguous matrix, so cosine similarity for a
+    batch of queries is a single matrix product and top-k is an argpartition per query.
+    For tens of thousands of chunks this is faster than an ANN index and needs no database.
+
+    query() mirrors Chroma's collection.query(), so the index can stand in for a collection;
+    distances are cosine distances (1 - cosine similarity).
+    """
+
+    name = "flat"
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        documents: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+        ids: Optional[Sequence[str]] = None,
+        dtype: str = "float32",
+        normalized: bool = False,
+    ):
+        if len(embeddings) != len(documents) or len(documents) != len(metadatas):
+            raise ValueError("embeddings, documents and metadatas must have the same length")
+
+        if normalized and embeddings.dtype == np.dtype(dtype):
+            # Already in final form (e.g. a memory-mapped store), so use it without copying
+            self.matrix = embeddings
+        else:
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self.matrix = np.ascontiguousarray(matrix / norms, dtype=dtype)
+        self.documents = documents
+        self.metadatas = metadatas
+        self.ids = ids if ids is not None else [str(i) for i in range(len(self.documents))]
+
+    @classmethod
+    def from_chunks(cls, chunks: Sequence[Dict[str, Any]], dtype: str = "float32") -> "FlatIndex":
+        """Build the index from chunk dictionaries as written by genembed_chunked"""
+        chunks = [chunk for chunk in chunks if chunk.get("embedding")]
+        return cls(
+            embeddings=np.array([chunk["embedding"] for chunk in chunks], dtype=np.float32),
+            documents=[chunk["content"] for chunk in chunks],
+            metadatas=[
+                {
+                    "book_title": chunk.get("book_title", "Unknown Book"),
+                    "chunk_index": chunk.get("chunk_index"),
+                    "total_chunks": chunk.get("total_chunks"),
+                }
+                for chunk in chunks
+            ],
+            ids=[str(chunk.get("id", i)) for i, chunk in enumerate(chunks)],
+            dtype=dtype,
+        )
+
+    @classmethod
+    def from_json(cls, path: str, dtype: str = "float32") -> "FlatIndex":
+        """Load chunks_with_embeddings.json (a list of chunks, or a dictionary of them keyed by id)"""
+        with open(path, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        if isinstance(chunks, dict):
+            chunks = list(chunks.values())
+
+        index = cls.from_chunks(chunks, dtype=dtype)
+        logger.info(f"Loaded flat index with {len(index)} chunks from {path}")
+        return index
+
+    @classmethod
+    def from_store(cls, store: EmbeddingStore) -> "FlatIndex":
+        """Search a memory-mapped EmbeddingStore in place; nothing is copied into process memory"""
+        index = cls(
+            embeddings=store.embeddings,
+            documents=store.documents,
+            metadatas=store.metadatas,
+            ids=store.ids,
+            dtype=store.embeddings.dtype.name,
+            normalized=True,
+        )
+        logger.info(f"Opened flat index with {len(index)} chunks from embedding store {store.path}")
+        return index
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def scores(self, query_embeddings: np.ndarray) -> np.ndarray:
+        """Cosine similarity of each query (rows) against every chunk (columns)"""
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+
+        if self.matrix.dtype == np.float32:
+            return queries @ self.matrix.T
+
+        scores = np.empty((len(queries), len(self)), dtype=np.float32)
+        for start in range(0, len(self), FLOAT16_BLOCK_ROWS):
+            block = self.matrix[start:start + FLOAT16_BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        return scores
+
+    def search(self, query_embeddings: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the top_k most similar chunks for each query
+
+        Args:
+            query_embeddings: One embedding, or a (queries, dimensions) batch
+            top_k: Number of chunks per query
+
+        Returns:
+            (chunk indices, cosine similarities), each of shape (queries, top_k), best first
+        """
+        scores = self.scores(query_embeddings)
+        top_k = min(top_k, len(self))
+        if top_k == 0:
+            empty = np.empty((len(scores), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        candidates = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+    def query(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        n_results: int = 10,
+        include: Sequence[str] = ("documents", "metadatas", "distances"),
+    ) -> Dict[str, List[List[Any]]]:
+        """Chroma-compatible query: one list of ids, documents, metadatas and distances per query"""
+        indices, similarities = self.search(np.asarray(query_embeddings, dtype=np.float32), n_results)
+
+        results: Dict[str, List[List[Any]]] = {"ids": [[self.ids[i] for i in row] for row in indices]}
+        if "documents" in include:
+            results["documents"] = [[self.documents[i] for i in row] for row in indices]
+        if "metadatas" in include:
+            results["metadatas"] = [[self.metadatas[i] for i in row] for row in indices]
+        if "distances" in include:
+            results["distances"] = [[float(1 - s) for s in row] for row in similarities]
+        return results
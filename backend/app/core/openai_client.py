@@ -0,0 +1,117 @@
+import os
+import logging
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import httpx
+import openai
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of pooled HTTP connections to the OpenAI API, per client
+OPENAI_POOL_SIZE = int(os.environ.get("OPENAI_POOL_SIZE", "20"))
+
+# Idle keep-alive connections are closed after this many seconds
+OPENAI_KEEPALIVE_EXPIRY_SECONDS = float(os.environ.get("OPENAI_KEEPALIVE_EXPIRY_SECONDS", "60"))
+
+# Retries are handled by app.core.retry (backoff, Retry-After, budgets, circuit breaker),
+# so the SDK's own retry loop is disabled to avoid multiplying attempts
+OPENAI_SDK_MAX_RETRIES = 0
+
+# Request timeout; transcriptions of 24MB chunks can legitimately take minutes
+OPENAI_TIMEOUT_SECONDS = float(os.environ.get("OPENAI_TIMEOUT_SECONDS", "600"))
+
+# Possible locations of the .env file holding OPENAI_API_KEY
+ENV_PATHS = [
+    Path(__file__).parent.parent.parent / ".env",  # /backend/app/core -> /backend/.env
+    Path(__file__).parent.parent.parent.parent / ".env",  # /backend/app/core -> /.env
+]
+
+_lock = threading.Lock()
+_client: Optional[openai.OpenAI] = None
+_async_client: Optional[openai.AsyncOpenAI] = None
+
+
+@lru_cache(maxsize=1)
+def load_api_key() -> Optional[str]:
+    """
+    Find the OpenAI API key once per process
+
+    The environment is checked first, then the .env files in ENV_PATHS.
+
+    Returns:
+        The API key, or None if it could not be found
+    """
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if api_key:
+        return api_key
+
+    logger.info("OpenAI API key not found in environment variables, checking .env file")
+    for env_path in ENV_PATHS:
+        if env_path.exists():
+            logger.info(f"Found .env file at {env_path}")
+            load_dotenv(dotenv_path=env_path)
+            api_key = os.environ.get("OPENAI_API_KEY")
+            if api_key:
+                logger.info("Successfully loaded OpenAI API key from .env file")
+                return api_key
+
+    logger.warning("OpenAI API key not found in environment variables or .env file")
+    return None
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=OPENAI_POOL_SIZE,
+        max_keepalive_connections=OPENAI_POOL_SIZE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def get_openai_client() -> openai.OpenAI:
+    """
+    Get the process-wide synchronous OpenAI client
+
+    The client keeps a pool of keep-alive connections, so repeated calls reuse TLS sessions
+    instead of opening a new connection per request. It is safe to share between threads.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = openai.OpenAI(
+                    api_key=load_api_key(),
+                    timeout=OPENAI_TIMEOUT_SECONDS,
+                    max_retries=OPENAI_SDK_MAX_RETRIES,
+                    http_client=openai.DefaultHttpxClient(limits=_pool_limits()),
+                )
+    return _client
+
+
+def get_async_openai_client() -> openai.AsyncOpenAI:
+    """Get the process-wide asynchronous OpenAI client, pooled like get_openai_client()"""
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = openai.AsyncOpenAI(
+                    api_key=load_api_key(),
+                    timeout=OPENAI_TIMEOUT_SECONDS,
+                    max_retries=OPENAI_SDK_MAX_RETRIES,
+                    http_client=openai.DefaultAsyncHttpxClient(limits=_pool_limits()),
+                )
+    return _async_client
+
+
+def reset_openai_clients():
+    """Drop the shared clients (and cached API key) so the next call picks up new settings"""
+    global _client, _async_client
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _async_client = None
+        load_api_key.cache_clear()
@@ -0,0 +1,273 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often, and for how long, to retry a failing call"""
+    max_attempts: int = 3
+    base_delay: float = 1.0  # Delay before the first retry, doubled on every attempt
+    max_delay: float = 30.0  # Cap on a single backoff delay
+    budget_seconds: Optional[float] = 120.0  # Total time allowed across all attempts, None for no limit
+    jitter: bool = True  # Randomise delays so concurrent callers don't retry in lockstep
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that keeps failing
+
+    After failure_threshold consecutive upstream failures the circuit opens and calls fail
+    fast with CircuitOpenError. Once reset_timeout seconds have passed a single trial call
+    is let through (half-open); its success closes the circuit, its failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError unless a call may go through right now
+
+        Returns:
+            True if the call is the half-open trial, whose outcome must be recorded or released
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if time.monotonic() - self._opened_at >= self.reset_timeout and not self._trial_in_progress:
+                self._trial_in_progress = True
+                return True
+        raise CircuitOpenError(f"Circuit breaker '{self.name}' is open; upstream is failing, not calling it")
+
+    def release_trial(self):
+        """Free the trial slot of a call that ended without an outcome (e.g. it was cancelled)"""
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            trial_failed = self._trial_in_progress
+            self._trial_in_progress = False
+            if trial_failed or (self._opened_at is None and self._failures >= self.failure_threshold):
+                logger.warning(f"Circuit breaker '{self.name}' opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Client errors such as bad requests or authentication failures will not succeed on retry"""
+    if isinstance(error, (CircuitOpenError, FileNotFoundError)):
+        return False
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return True
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Errors that indicate the upstream itself is unhealthy, as opposed to a bad request or response"""
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Read the server's requested delay from Retry-After / retry-after-ms headers, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(policy: RetryPolicy, attempt: int, error: Optional[BaseException] = None) -> float:
+    """
+    Delay before retrying after the given (zero-based) attempt failed
+
+    A Retry-After header from the server takes precedence over exponential backoff.
+    """
+    server_delay = retry_after_seconds(error) if error is not None else None
+    if server_delay is not None:
+        return server_delay
+
+    delay = min(policy.max_delay, policy.base_delay * (2 ** attempt))
+    if policy.jitter:
+        # "Equal jitter": keep at least half the delay, randomise the rest
+        delay = delay / 2 + random.uniform(0, delay / 2)
+    return delay
+
+
+def _next_delay(policy: RetryPolicy, attempt: int, error: BaseException, started: float, description: str) -> Optional[float]:
+    """Log a failed attempt and return the delay before the next one, or None to give up"""
+    logger.error(f"Error {description} (attempt {attempt+1}/{policy.max_attempts}): {str(error)}")
+
+    if attempt + 1 >= policy.max_attempts or not is_retryable(error):
+        return None
+
+    delay = backoff_delay(policy, attempt, error)
+    if policy.budget_seconds is not None and time.monotonic() - started + delay > policy.budget_seconds:
+        logger.error(f"Retry budget of {policy.budget_seconds:.0f} seconds exhausted while {description}")
+        return None
+
+    logger.info(f"Retrying in {delay:.2f} seconds...")
+    return delay
+
+
+def call_with_retry(
+    func: Callable[..., T],
+    *args: Any,
+    policy: RetryPolicy = RetryPolicy(),
+    breaker: Optional[CircuitBreaker] = None,
+    description: str = "calling upstream",
+    **kwargs: Any,
+) -> T:
+    """
+    Call func, retrying failures with jittered exponential backoff
+
+    Blocks the calling thread while waiting, so only use it off the event loop
+    (worker threads, scripts); use acall_with_retry in async code.
+
+    Args:
+        func: Function to call
+        policy: Retry limits and backoff settings
+        breaker: Optional circuit breaker guarding the upstream
+        description: What the call does, for log messages
+
+    Returns:
+        The return value of func
+
+    Raises:
+        The last error once attempts or the time budget run out, or CircuitOpenError
+    """
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        trial = breaker.before_call() if breaker is not None else False
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if breaker is not None:
+                # Any response other than an outage shows the upstream is reachable
+                if is_upstream_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            delay = _next_delay(policy, attempt, e, started, description)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            # Cancelled or interrupted: no verdict on the upstream, but a half-open trial must not stay claimed
+            if trial:
+                breaker.release_trial()
+            raise
+
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+async def acall_with_retry(
+    func: Callable[..., Awaitable[T]],
+    *args: Any,
+    policy: RetryPolicy = RetryPolicy(),
+    breaker: Optional[CircuitBreaker] = None,
+    description: str = "calling upstream",
+    **kwargs: Any,
+) -> T:
+    """Async counterpart of call_with_retry; backoff waits with asyncio.sleep so the event loop keeps running"""
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        trial = breaker.before_call() if breaker is not None else False
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            if breaker is not None:
+                # Any response other than an outage shows the upstream is reachable
+                if is_upstream_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            delay = _next_delay(policy, attempt, e, started, description)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            # Cancelled or interrupted: no verdict on the upstream, but a half-open trial must not stay claimed
+            if trial:
+                breaker.release_trial()
+            raise
+
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+# Shared breaker for every call to the OpenAI API in this process
+openai_breaker = CircuitBreaker("openai")
@@ -0,0 +1,112 @@
+import json
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    In-memory cache that matches queries by embedding similarity instead of exact text
+
+    Embeddings are kept L2-normalised in one contiguous float32 matrix, so a lookup is a
+    single matrix-vector product. Entries carry a scope (for example the requested formats
+    and options) and only match queries with the same scope. Entries expire after
+    ttl_seconds; when the cache is full the least recently used entry is overwritten.
+    """
+
+    def __init__(self, dimensions: int, max_entries: int, threshold: float, ttl_seconds: float):
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+
+        self._vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self._scopes: List[Optional[str]] = [None] * max_entries
+        self._values: List[Optional[str]] = [None] * max_entries
+        self._created_at = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._counters = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    def _normalise(self, embedding: Sequence[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        if vector.shape != (self.dimensions,):
+            logger.warning(f"Ignoring embedding with shape {vector.shape}, expected ({self.dimensions},)")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def get(self, scope: str, embedding: Sequence[float]) -> Optional[Tuple[Any, float]]:
+        """
+        Find the cached value for the most similar query in the same scope
+
+        Args:
+            scope: Key that must match exactly, e.g. the requested formats and options
+            embedding: Embedding of the incoming query
+
+        Returns:
+            (value, cosine similarity) if a live entry passes the threshold, otherwise None
+        """
+        vector = self._normalise(embedding)
+        now = time.time()
+
+        with self._lock:
+            if vector is None:
+                self._counters["misses"] += 1
+                return None
+
+            live = np.array([s == scope for s in self._scopes]) & (now - self._created_at <= self.ttl_seconds)
+            if not live.any():
+                self._counters["misses"] += 1
+                return None
+
+            similarities = np.where(live, self._vectors @ vector, -1.0)
+            slot = int(np.argmax(similarities))
+            similarity = float(similarities[slot])
+            if similarity < self.threshold:
+                self._counters["misses"] += 1
+                return None
+
+            self._last_used[slot] = now
+            self._counters["hits"] += 1
+            value = self._values[slot]
+
+        return json.loads(value), similarity
+
+    def set(self, scope: str, embedding: Sequence[float], value: Any):
+        """Store a JSON-serialisable value for a query embedding, reusing the least recently used slot"""
+        vector = self._normalise(embedding)
+        if vector is None:
+            return
+
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            # Empty and expired slots have the oldest timestamps, so they are reused first
+            last_used = np.where(now - self._created_at > self.ttl_seconds, 0.0, self._last_used)
+            slot = int(np.argmin(last_used))
+            if self._values[slot] is not None and last_used[slot] > 0:
+                self._counters["evictions"] += 1
+
+            self._vectors[slot] = vector
+            self._scopes[slot] = scope
+            self._values[slot] = payload
+            self._created_at[slot] = now
+            self._last_used[slot] = now
+            self._counters["sets"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+                "entries": sum(value is not None for value in self._values),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+            }
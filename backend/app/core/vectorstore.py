@@ -0,0 +1,279 @@
+import os
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from app.core.config import (
+    COACHPILOT_SEARCH_WORKERS,
+    COACHPILOT_VECTOR_BACKEND,
+    COACHPILOT_FLAT_INDEX_DTYPE,
+    COACHPILOT_MAX_OPEN_VECTOR_STORES,
+)
+from app.core.flat_index import FlatIndex
+from app.core.embedding_store import EmbeddingStore, is_embedding_store
+
+logger = logging.getLogger(__name__)
+
+# Vector searches are blocking (Chroma/SQLite), so async callers run them on this bounded pool
+_search_executor = ThreadPoolExecutor(max_workers=COACHPILOT_SEARCH_WORKERS, thread_name_prefix="vector-search")
+
+# Collection written by KnowledgeBaseParsing/genembed_chunked.py
+BOOK_CHUNKS_COLLECTION = "book_chunks"
+
+# Keys of a Chroma query result that hold one list per query embedding
+PER_QUERY_RESULT_KEYS = ("ids", "documents", "metadatas", "distances", "embeddings")
+
+# Embeddings file written by KnowledgeBaseParsing/genembed_chunked.py, loaded by the flat backend
+CHUNKS_WITH_EMBEDDINGS_FILE = "chunks_with_embeddings.json"
+
+# Resolved database paths remembered by a registry; request paths are client supplied, so this is bounded
+MAX_RESOLVED_PATHS = 256
+
+
+def format_book_results(query: str, results: Dict[str, Any], position: int = 0) -> Dict[str, Any]:
+    """
+    Group one query's raw Chroma results by book, in the shape of rag_query(return_raw_results=True)
+
+    Args:
+        query: The query text
+        results: Chroma query results
+        position: Which query of a batched result to format
+
+    Returns:
+        {"query", "sources": {book_title: [{"content", "chunk_index", "total_chunks", "relevance"}]}, "raw_results"}
+    """
+    sources = defaultdict(list)
+    documents, metadatas, distances = (results[key][position] for key in ("documents", "metadatas", "distances"))
+    for document, meta, distance in zip(documents, metadatas, distances):
+        sources[meta.get("book_title", "Unknown Book")].append({
+            "content": document,
+            "chunk_index": meta.get("chunk_index"),
+            "total_chunks": meta.get("total_chunks"),
+            "relevance": 1 - distance,
+        })
+
+    raw_results = {
+        key: [value[position]] if key in PER_QUERY_RESULT_KEYS and value else value
+        for key, value in results.items()
+    }
+    return {"query": query, "sources": dict(sources), "raw_results": raw_results}
+
+
+class VectorStoreRegistry:
+    """
+    Process-wide cache of open book knowledge bases
+
+    Each database path is validated and opened once; the book chunk collection handle is
+    then reused by every search, so a query only pays for the nearest-neighbour search
+    itself instead of creating a client and listing collections each time.
+
+    The "chroma" backend opens Chroma databases; the "flat" backend loads the chunk
+    embeddings into an in-memory FlatIndex, which answers the same queries.
+
+    Database paths come from requests, so at most max_open databases stay open besides the
+    pinned ones opened by warm(). Beyond that the least recently searched handle is dropped,
+    not closed: a search that already holds it finishes normally, and the handle is released
+    once nothing references it.
+    """
+
+    def __init__(self, backend: str = "chroma", flat_dtype: str = "float32", max_open: int = COACHPILOT_MAX_OPEN_VECTOR_STORES):
+        if backend not in ("chroma", "flat"):
+            raise ValueError(f"Unknown vector store backend: {backend}")
+        self.backend = backend
+        self.flat_dtype = flat_dtype
+        self.max_open = max(1, max_open)
+        # Databases opened by warm(), never evicted
+        self._pinned: Dict[str, Any] = {}
+        # Both ordered from least to most recently used
+        self._collections: "OrderedDict[str, Any]" = OrderedDict()
+        self._resolved_paths: "OrderedDict[Tuple[str, Tuple[str, ...]], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+
+    def resolve_path(self, db_path: str, fallbacks: Sequence[str] = (), roots: Optional[Sequence[str]] = None) -> str:
+        """
+        Return db_path if it exists, otherwise the first existing fallback
+
+        Paths are returned canonical (symlinks and ".." resolved), so every spelling of a
+        database shares one handle. Successful lookups are remembered, so the filesystem is
+        only probed once per path.
+
+        Args:
+            db_path: Requested database path
+            fallbacks: Trusted paths tried, in order, when db_path cannot be used
+            roots: If given, db_path is only used when it lies inside one of these directories
+
+        Raises:
+            ValueError: If neither db_path nor any fallback exists
+        """
+        if roots is not None and not is_within(db_path, roots):
+            logger.warning(f"Vector database {db_path} is outside the knowledge base directories, not opening it")
+            if not fallbacks:
+                raise ValueError(f"No vector database found at {db_path} or any alternative locations")
+            # Resolved under the fallbacks' key, so untrusted paths are never remembered
+            return self.resolve_path(fallbacks[0], fallbacks[1:])
+
+        cache_key = (db_path, tuple(fallbacks))
+        with self._lock:
+            resolved = self._resolved_paths.get(cache_key)
+            if resolved is not None:
+                self._resolved_paths.move_to_end(cache_key)
+                return resolved
+
+        for candidate in (db_path, *fallbacks):
+            if os.path.exists(candidate):
+                if candidate != db_path:
+                    logger.warning(f"Vector database {db_path} not found, using {candidate} instead")
+                resolved = os.path.realpath(candidate)
+                with self._lock:
+                    self._resolved_paths[cache_key] = resolved
+                    while len(self._resolved_paths) > MAX_RESOLVED_PATHS:
+                        self._resolved_paths.popitem(last=False)
+                return resolved
+
+        raise ValueError(f"No vector database found at {db_path} or any alternative locations")
+
+    def get_collection(self, db_path: str):
+        """Get the book chunk collection of a database, opening it on first use"""
+        collection = self._lookup(db_path)
+        if collection is not None:
+            return collection
+
+        # Opening can be slow; searches of databases that are already open don't wait for it
+        with self._open_lock:
+            collection = self._lookup(db_path)
+            if collection is not None:
+                return collection
+
+            collection = self._open(db_path)
+            with self._lock:
+                self._collections[db_path] = collection
+                while len(self._collections) > self.max_open:
+                    evicted_path, _ = self._collections.popitem(last=False)
+                    logger.info(f"Dropped least recently used vector database {evicted_path}")
+        return collection
+
+    def _open(self, db_path: str):
+        if self.backend == "flat":
+            collection = open_flat_index(db_path, dtype=self.flat_dtype)
+        else:
+            collection = open_book_collection(db_path)
+        logger.info(f"Opened vector database {db_path} (collection '{collection.name}')")
+        return collection
+
+    def _lookup(self, db_path: str):
+        with self._lock:
+            collection = self._pinned.get(db_path)
+            if collection is None:
+                collection = self._collections.get(db_path)
+                if collection is not None:
+                    self._collections.move_to_end(db_path)
+            return collection
+
+    def warm(self, db_paths: Sequence[str]):
+        """Open and pin databases ahead of the first request; failures are logged, not raised"""
+        for db_path in db_paths:
+            try:
+                resolved = self.resolve_path(db_path)
+                with self._open_lock:
+                    with self._lock:
+                        collection = self._collections.pop(resolved, None)
+                    if collection is None and resolved not in self._pinned:
+                        collection = self._open(resolved)
+                    if collection is not None:
+                        with self._lock:
+                            self._pinned[resolved] = collection
+            except Exception as e:
+                logger.warning(f"Could not open vector database {db_path}: {str(e)}")
+
+    def clear(self):
+        """Forget every open database and resolved path"""
+        with self._lock:
+            self._pinned.clear()
+            self._collections.clear()
+            self._resolved_paths.clear()
+
+
+def is_within(path: str, roots: Sequence[str]) -> bool:
+    """Whether path, with symlinks and ".." resolved, lies inside one of the root directories"""
+    real_path = os.path.realpath(path)
+    for root in roots:
+        real_root = os.path.realpath(root)
+        if os.path.commonpath([real_path, real_root]) == real_root:
+            return True
+    return False
+
+
+def open_book_collection(db_path: str):
+    """Open the book chunk collection of a Chroma database, falling back to its first collection"""
+    import chromadb
+
+    client = chromadb.PersistentClient(path=db_path)
+    collection_names = [getattr(c, "name", c) for c in client.list_collections()]
+    if not collection_names:
+        raise ValueError(f"No collections found in database at {db_path}")
+
+    collection_name = BOOK_CHUNKS_COLLECTION
+    if collection_name not in collection_names:
+        collection_name = collection_names[0]
+        logger.warning(f"Could not find '{BOOK_CHUNKS_COLLECTION}' collection in {db_path}, using '{collection_name}' instead")
+    return client.get_collection(collection_name)
+
+
+def open_flat_index(path: str, dtype: str = "float32") -> FlatIndex:
+    """
+    Open a FlatIndex from a memory-mapped embedding store, an embeddings JSON file,
+    or a directory holding chunks_with_embeddings.json
+    """
+    if is_embedding_store(path):
+        return FlatIndex.from_store(EmbeddingStore(path))
+    if os.path.isdir(path):
+        path = os.path.join(path, CHUNKS_WITH_EMBEDDINGS_FILE)
+    return FlatIndex.from_json(path, dtype=dtype)
+
+
+def search_book_chunks(query: str, query_embedding: List[float], top_k: int, db_path: str) -> Dict[str, Any]:
+    """
+    Retrieve the book chunks closest to an already computed query embedding
+
+    Equivalent to rag_query(..., return_raw_results=True) minus the embedding call, so callers
+    that need the embedding for something else (such as the semantic cache) only pay for it once.
+    """
+    collection = vector_stores.get_collection(db_path)
+    results = collection.query(
+        query_embeddings=[query_embedding],
+        n_results=top_k,
+        include=["documents", "metadatas", "distances"],
+    )
+    return format_book_results(query, results)
+
+
+def search_book_chunks_batch(queries: List[str], query_embeddings: List[List[float]], top_k: int, db_path: str) -> List[Dict[str, Any]]:
+    """search_book_chunks for several queries at once; the flat backend answers them with one matrix product"""
+    collection = vector_stores.get_collection(db_path)
+    results = collection.query(
+        query_embeddings=query_embeddings,
+        n_results=top_k,
+        include=["documents", "metadatas", "distances"],
+    )
+    return [format_book_results(query, results, position) for position, query in enumerate(queries)]
+
+
+async def asearch_book_chunks(query: str, query_embedding: List[float], top_k: int, db_path: str) -> Dict[str, Any]:
+    """Run search_book_chunks on the bounded search pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _search_executor, search_book_chunks, query, query_embedding, top_k, db_path
+    )
+
+
+# Process-wide registry used by every search
+vector_stores = VectorStoreRegistry(COACHPILOT_VECTOR_BACKEND, flat_dtype=COACHPILOT_FLAT_INDEX_DTYPE)
+
+
+def shutdown_search_executor():
+    """Release the search threads"""
+    _search_executor.shutdown(wait=False, cancel_futures=True)
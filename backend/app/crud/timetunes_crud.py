@@ -1,11 +1,41 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy import func, desc, inspect, tuple_
 from typing import List, Optional, Dict
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
+import json
 import uuid
+import base64
 
 from ..models import timetunes_models as models
 from ..schemas import timetunes_schemas as schemas
+from .timetunes_rollups import PROJECT_ROLLUP_COLUMNS, project_rollup_select, refresh_daily_rollups, tag_rollup_select
+
+
+def _with_relations(query):
+    """Load each entry's project in the same query and all their tags in one more, for serialization"""
+    return query.options(joinedload(models.TimeEntry.project), selectinload(models.TimeEntry.tags))
+
+
+def get_tags_by_ids(db: Session, tag_ids: List[str]) -> List[models.Tag]:
+    """
+    Resolve tag IDs to tags, skipping unknown IDs
+
+    Tags this session (which lives for one request) has already loaded are taken from its
+    identity map; the rest, including tags expired by a commit, are fetched in a single query
+    rather than refreshed one by one.
+    """
+    tag_ids = list(dict.fromkeys(tag_ids))
+    tags = {}
+    for tag_id in tag_ids:
+        tag = db.identity_map.get(identity_key(models.Tag, tag_id))
+        if tag is not None and not inspect(tag).expired_attributes:
+            tags[tag_id] = tag
+    
+    missing = [tag_id for tag_id in tag_ids if tag_id not in tags]
+    if missing:
+        tags.update((tag.id, tag) for tag in db.query(models.Tag).filter(models.Tag.id.in_(missing)))
+    return [tags[tag_id] for tag_id in tag_ids if tag_id in tags]
 
 
 # Time Entries CRUD operations
@@ -24,15 +54,36 @@ def create_time_entry(db: Session, time_entry: schemas.TimeEntryCreate):
     
     # Add tags if provided
     if time_entry.tag_ids:
-        tags = db.query(models.Tag).filter(models.Tag.id.in_(time_entry.tag_ids)).all()
-        db_time_entry.tags = tags
+        db_time_entry.tags = get_tags_by_ids(db, time_entry.tag_ids)
     
     db.add(db_time_entry)
+    db.flush()
+    refresh_daily_rollups(db, [db_time_entry.start_time.date()])
     db.commit()
     db.refresh(db_time_entry)
     return db_time_entry
 
 
+def encode_cursor(time_entry: models.TimeEntry) -> str:
+    """Opaque pagination cursor pointing just past time_entry in the newest-first listing"""
+    key = json.dumps([time_entry.start_time.isoformat(), time_entry.id])
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """
+    Decode a cursor from encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        start_time, time_entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(start_time), str(time_entry_id)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
 def get_time_entries(
     db: Session, 
     skip: int = 0, 
@@ -41,9 +92,19 @@ def get_time_entries(
     end_date: Optional[datetime] = None,
     project_id: Optional[str] = None,
     tag_id: Optional[str] = None,
+    cursor: Optional[str] = None,
 ):
-    """Get all time entries with optional filtering"""
-    query = db.query(models.TimeEntry)
+    """
+    Get all time entries with optional filtering, newest first
+
+    Pages can be fetched by offset (skip) or, in constant time however deep the page, by
+    passing the cursor of the last entry of the previous page (see encode_cursor); skip is
+    ignored when a cursor is given.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    query = _with_relations(db.query(models.TimeEntry))
     
     # Apply filters
     if start_date:
@@ -58,20 +119,26 @@ def get_time_entries(
     if tag_id:
         query = query.join(models.TimeEntry.tags).filter(models.Tag.id == tag_id)
     
-    # Order by start time desc (newest first)
-    query = query.order_by(desc(models.TimeEntry.start_time))
+    # Order by start time desc (newest first), with the id breaking ties so pages are stable
+    query = query.order_by(desc(models.TimeEntry.start_time), desc(models.TimeEntry.id))
+    
+    if cursor:
+        # Keyset pagination: continue strictly after the (start_time, id) of the cursor
+        query = query.filter(tuple_(models.TimeEntry.start_time, models.TimeEntry.id) < decode_cursor(cursor))
+        return query.limit(limit).all()
     
     return query.offset(skip).limit(limit).all()
 
 
 def get_time_entry(db: Session, time_entry_id: str):
     """Get a specific time entry by ID"""
-    return db.query(models.TimeEntry).filter(models.TimeEntry.id == time_entry_id).first()
+    return _with_relations(db.query(models.TimeEntry)).filter(models.TimeEntry.id == time_entry_id).first()
 
 
 def update_time_entry(db: Session, time_entry_id: str, time_entry: schemas.TimeEntryUpdate):
     """Update a time entry"""
     db_time_entry = db.query(models.TimeEntry).filter(models.TimeEntry.id == time_entry_id).first()
+    previous_day = db_time_entry.start_time.date()
     
     # Update fields if provided
     update_data = time_entry.dict(exclude_unset=True)
@@ -85,9 +152,10 @@ def update_time_entry(db: Session, time_entry_id: str, time_entry: schemas.TimeE
     
     # Update tags if provided
     if tag_ids is not None:
-        tags = db.query(models.Tag).filter(models.Tag.id.in_(tag_ids)).all()
-        db_time_entry.tags = tags
+        db_time_entry.tags = get_tags_by_ids(db, tag_ids)
     
+    db.flush()
+    refresh_daily_rollups(db, [previous_day, db_time_entry.start_time.date()])
     db.commit()
     db.refresh(db_time_entry)
     return db_time_entry
@@ -97,6 +165,8 @@ def delete_time_entry(db: Session, time_entry_id: str):
     """Delete a time entry"""
     db_time_entry = db.query(models.TimeEntry).filter(models.TimeEntry.id == time_entry_id).first()
     db.delete(db_time_entry)
+    db.flush()
+    refresh_daily_rollups(db, [db_time_entry.start_time.date()])
     db.commit()
     return db_time_entry
 
@@ -145,10 +215,14 @@ def delete_project(db: Session, project_id: str):
     db_project = db.query(models.Project).filter(models.Project.id == project_id).first()
     
     # Set project_id to NULL for all time entries that use this project
+    days = set()
     for time_entry in db_project.time_entries:
         time_entry.project_id = None
+        days.add(time_entry.start_time.date())
     
     db.delete(db_project)
+    db.flush()
+    refresh_daily_rollups(db, days)
     db.commit()
     return db_project
 
@@ -193,12 +267,97 @@ def update_tag(db: Session, tag_id: str, tag: schemas.TagUpdate):
 def delete_tag(db: Session, tag_id: str):
     """Delete a tag"""
     db_tag = db.query(models.Tag).filter(models.Tag.id == tag_id).first()
+    days = {time_entry.start_time.date() for time_entry in db_tag.time_entries}
     db.delete(db_tag)
+    db.flush()
+    refresh_daily_rollups(db, days)
     db.commit()
     return db_tag
 
 
 # Analytics operations
+#
+# Whole days in the requested range are read from the daily rollup tables; the partial days at
+# either end are aggregated from time_entries with the same queries that maintain the rollups.
+# Either way the rows have one (day, project) or (day, project, tag) grain, so the work is
+# proportional to the number of days, not the number of entries.
+def _naive(value: datetime) -> datetime:
+    """
+    A timezone-aware bound as the naive wall time the start_time column holds
+
+    SQLite stores datetimes without their offset, so entries (and the time_entries filters
+    of get_time_entries) compare by wall time; converting to UTC would shift the bound.
+    """
+    return value.replace(tzinfo=None)
+
+
+def _split_range(start_date: datetime, end_date: datetime):
+    """
+    Split [start_date, end_date] into whole days and partial days
+
+    Returns:
+        (first_day, last_day) of the whole days (or None), and entry filters for each partial stretch
+    """
+    start_date, end_date = _naive(start_date), _naive(end_date)
+    first_day = start_date.date() if start_date.time() == time.min else start_date.date() + timedelta(days=1)
+    last_day = end_date.date() if end_date.time() == time.max else end_date.date() - timedelta(days=1)
+    if first_day > last_day:
+        return None, [[models.TimeEntry.start_time >= start_date, models.TimeEntry.start_time <= end_date]]
+    
+    partial = []
+    whole_start = datetime.combine(first_day, time.min)
+    whole_end = datetime.combine(last_day + timedelta(days=1), time.min)
+    if start_date < whole_start:
+        partial.append([models.TimeEntry.start_time >= start_date, models.TimeEntry.start_time < whole_start])
+    if end_date >= whole_end:
+        partial.append([models.TimeEntry.start_time >= whole_end, models.TimeEntry.start_time <= end_date])
+    return (first_day, last_day), partial
+
+
+def _project_day_rows(db: Session, start_date: datetime, end_date: datetime, project_id: Optional[str] = None):
+    """Rows of PROJECT_ROLLUP_COLUMNS covering the range"""
+    whole_days, partial = _split_range(start_date, end_date)
+    rows = []
+    
+    if whole_days:
+        rollup = models.DailyProjectRollup
+        query = db.query(*(getattr(rollup, column) for column in PROJECT_ROLLUP_COLUMNS)).filter(
+            rollup.day >= whole_days[0], rollup.day <= whole_days[1]
+        )
+        if project_id:
+            query = query.filter(rollup.project_key == project_id)
+        rows.extend(query.all())
+    
+    for filters in partial:
+        if project_id:
+            filters = [*filters, models.TimeEntry.project_id == project_id]
+        rows.extend(db.execute(project_rollup_select(filters)).all())
+    return rows
+
+
+def _tag_rows(db: Session, start_date: datetime, end_date: datetime):
+    """(tag_key, entry_count, total_duration) rows covering the range, possibly several per tag"""
+    whole_days, partial = _split_range(start_date, end_date)
+    rows = []
+    
+    if whole_days:
+        rollup = models.DailyTagRollup
+        rows.extend(db.query(
+            rollup.tag_key,
+            func.sum(rollup.entry_count),
+            func.sum(rollup.total_duration),
+        ).filter(
+            rollup.day >= whole_days[0], rollup.day <= whole_days[1]
+        ).group_by(rollup.tag_key).all())
+    
+    for filters in partial:
+        rows.extend(
+            (tag_key, entry_count, duration)
+            for _, _, tag_key, entry_count, duration in db.execute(tag_rollup_select(filters)).all()
+        )
+    return rows
+
+
 def get_time_summary(
     db: Session,
     start_date: datetime,
@@ -206,20 +365,10 @@ def get_time_summary(
     project_id: Optional[str] = None
 ):
     """Get time summary statistics"""
-    query = db.query(models.TimeEntry)
-    
-    # Apply filters
-    query = query.filter(models.TimeEntry.start_time >= start_date)
-    query = query.filter(models.TimeEntry.start_time <= end_date)
-    
-    if project_id:
-        query = query.filter(models.TimeEntry.project_id == project_id)
-    
-    # Get all time entries that match the criteria
-    entries = query.all()
+    rows = _project_day_rows(db, start_date, end_date, project_id)
     
     # Calculate total entries
-    total_entries = len(entries)
+    total_entries = sum(row.entry_count for row in rows)
     
     if total_entries == 0:
         return schemas.TimeSummary(
@@ -228,24 +377,19 @@ def get_time_summary(
         )
     
     # Calculate durations
-    durations = [entry.duration for entry in entries if entry.duration is not None]
-    total_duration = sum(durations)
-    avg_duration = total_duration / len(durations) if durations else 0
-    max_duration = max(durations) if durations else 0
-    min_duration = min(durations) if durations else 0
-    
-    # Get first and last entry dates
-    first_entry = min(entries, key=lambda x: x.start_time)
-    last_entry = max(entries, key=lambda x: x.start_time)
+    timed_entries = sum(row.timed_entry_count for row in rows)
+    total_duration = sum(row.total_duration for row in rows)
+    min_durations = [row.min_duration for row in rows if row.min_duration is not None]
+    max_durations = [row.max_duration for row in rows if row.max_duration is not None]
     
     return schemas.TimeSummary(
         total_entries=total_entries,
         total_duration_minutes=total_duration,
-        average_entry_minutes=avg_duration,
-        longest_entry_minutes=max_duration,
-        shortest_entry_minutes=min_duration,
-        first_entry_date=first_entry.start_time,
-        last_entry_date=last_entry.start_time
+        average_entry_minutes=total_duration / timed_entries if timed_entries else 0,
+        longest_entry_minutes=max(max_durations) if max_durations else 0,
+        shortest_entry_minutes=min(min_durations) if min_durations else 0,
+        first_entry_date=min(row.first_start_time for row in rows),
+        last_entry_date=max(row.last_start_time for row in rows)
     )
 
 
@@ -255,48 +399,36 @@ def get_time_by_project(
     end_date: datetime
 ):
     """Get time tracked grouped by project"""
-    # Get all time entries in the date range
-    entries = db.query(models.TimeEntry).filter(
-        models.TimeEntry.start_time >= start_date,
-        models.TimeEntry.start_time <= end_date,
-        models.TimeEntry.duration.isnot(None)  # Only include entries with a duration
-    ).all()
+    project_data = {}
+    for row in _project_day_rows(db, start_date, end_date):
+        if not row.timed_entry_count:
+            continue  # Only include entries with a duration
+        data = project_data.setdefault(row.project_key, {"total_entries": 0, "total_duration_minutes": 0.0})
+        data["total_entries"] += row.timed_entry_count
+        data["total_duration_minutes"] += row.total_duration
     
     # Calculate total time
-    total_time = sum([entry.duration for entry in entries if entry.duration is not None])
+    total_time = sum(data["total_duration_minutes"] for data in project_data.values())
     
     if total_time == 0:
         return []
     
-    # Group by project
-    project_data = {}
-    for entry in entries:
-        project_id = entry.project_id if entry.project_id else "unassigned"
-        if project_id not in project_data:
-            project_name = entry.project.name if entry.project else "Unassigned"
-            project_color = entry.project.color if entry.project else None
-            project_data[project_id] = {
-                "project_id": project_id,
-                "project_name": project_name,
-                "project_color": project_color,
-                "total_entries": 0,
-                "total_duration_minutes": 0.0
-            }
-        
-        project_data[project_id]["total_entries"] += 1
-        project_data[project_id]["total_duration_minutes"] += entry.duration or 0.0
+    projects = {
+        project.id: project
+        for project in db.query(models.Project).filter(models.Project.id.in_([key for key in project_data if key]))
+    }
     
     # Calculate percentages
     result = []
-    for project_id, data in project_data.items():
-        percentage = (data["total_duration_minutes"] / total_time) * 100
+    for project_key, data in project_data.items():
+        project = projects.get(project_key)
         result.append(schemas.ProjectTimeSummary(
-            project_id=project_id,
-            project_name=data["project_name"],
-            project_color=data["project_color"],
+            project_id=project_key or "unassigned",
+            project_name=project.name if project else "Unassigned",
+            project_color=project.color if project else None,
             total_entries=data["total_entries"],
             total_duration_minutes=data["total_duration_minutes"],
-            percentage_of_total=percentage
+            percentage_of_total=(data["total_duration_minutes"] / total_time) * 100
         ))
     
     # Sort by total duration (descending)
@@ -310,65 +442,38 @@ def get_time_by_tag(
     end_date: datetime
 ):
     """Get time tracked grouped by tag"""
-    # Get all time entries in the date range
-    entries = db.query(models.TimeEntry).filter(
-        models.TimeEntry.start_time >= start_date,
-        models.TimeEntry.start_time <= end_date,
-        models.TimeEntry.duration.isnot(None)  # Only include entries with a duration
-    ).all()
+    tag_data = {}
+    for tag_key, entry_count, duration in _tag_rows(db, start_date, end_date):
+        data = tag_data.setdefault(tag_key, {"total_entries": 0, "total_duration_minutes": 0.0})
+        data["total_entries"] += entry_count
+        data["total_duration_minutes"] += duration
     
-    # Calculate total time
-    total_time = sum([entry.duration for entry in entries if entry.duration is not None])
+    # Tag shares add up to each entry's full duration
+    total_time = sum(data["total_duration_minutes"] for data in tag_data.values())
     
     if total_time == 0:
         return []
     
-    # Group by tag
-    tag_data = {}
-    for entry in entries:
-        # Handle entries with multiple tags
-        if not entry.tags:
-            # Count as "untagged"
-            tag_id = "untagged"
-            if tag_id not in tag_data:
-                tag_data[tag_id] = {
-                    "tag_id": tag_id,
-                    "tag_name": "Untagged",
-                    "tag_color": None,
-                    "total_entries": 0,
-                    "total_duration_minutes": 0.0
-                }
-            
-            tag_data[tag_id]["total_entries"] += 1
-            tag_data[tag_id]["total_duration_minutes"] += entry.duration or 0.0
-        else:
-            # Distribute the time proportionally among the tags
-            time_per_tag = (entry.duration or 0.0) / len(entry.tags)
-            
-            for tag in entry.tags:
-                if tag.id not in tag_data:
-                    tag_data[tag.id] = {
-                        "tag_id": tag.id,
-                        "tag_name": tag.name,
-                        "tag_color": tag.color,
-                        "total_entries": 0,
-                        "total_duration_minutes": 0.0
-                    }
-                
-                tag_data[tag.id]["total_entries"] += 1
-                tag_data[tag.id]["total_duration_minutes"] += time_per_tag
+    tags = {tag.id: tag for tag in db.query(models.Tag).filter(models.Tag.id.in_([key for key in tag_data if key]))}
     
     # Calculate percentages
     result = []
-    for tag_id, data in tag_data.items():
-        percentage = (data["total_duration_minutes"] / total_time) * 100
+    for tag_key, data in tag_data.items():
+        if tag_key:
+            tag = tags.get(tag_key)
+            if tag is None:
+                continue
+            tag_id, tag_name, tag_color = tag.id, tag.name, tag.color
+        else:
+            # Count as "untagged"
+            tag_id, tag_name, tag_color = "untagged", "Untagged", None
         result.append(schemas.TagTimeSummary(
-            tag_id=data["tag_id"],
-            tag_name=data["tag_name"],
-            tag_color=data["tag_color"],
+            tag_id=tag_id,
+            tag_name=tag_name,
+            tag_color=tag_color,
             total_entries=data["total_entries"],
             total_duration_minutes=data["total_duration_minutes"],
-            percentage_of_total=percentage
+            percentage_of_total=(data["total_duration_minutes"] / total_time) * 100
         ))
     
     # Sort by total duration (descending)
@@ -383,53 +488,26 @@ def get_time_by_day(
     project_id: Optional[str] = None
 ):
     """Get time tracked grouped by day"""
-    # Get all time entries in the date range
-    query = db.query(models.TimeEntry).filter(
-        models.TimeEntry.start_time >= start_date,
-        models.TimeEntry.start_time <= end_date,
-        models.TimeEntry.duration.isnot(None)  # Only include entries with a duration
-    )
-    
-    if project_id:
-        query = query.filter(models.TimeEntry.project_id == project_id)
-    
-    entries = query.all()
-    
-    # Group by day
     day_data = {}
-    for entry in entries:
-        # Get the date part only (without time)
-        day = entry.start_time.date()
-        day_str = day.isoformat()
+    for row in _project_day_rows(db, start_date, end_date, project_id):
+        if not row.timed_entry_count:
+            continue  # Only include entries with a duration
         
-        if day_str not in day_data:
-            day_data[day_str] = {
-                "date": datetime.combine(day, datetime.min.time()),
+        if row.day not in day_data:
+            day_data[row.day] = {
+                "date": datetime.combine(row.day, datetime.min.time()),
                 "total_entries": 0,
                 "total_duration_minutes": 0.0,
                 "projects": {}
             }
         
-        day_data[day_str]["total_entries"] += 1
-        day_data[day_str]["total_duration_minutes"] += entry.duration or 0.0
+        data = day_data[row.day]
+        data["total_entries"] += row.timed_entry_count
+        data["total_duration_minutes"] += row.total_duration
         
         # Track time by project
-        project_id_entry = entry.project_id if entry.project_id else "unassigned"
-        if project_id_entry not in day_data[day_str]["projects"]:
-            day_data[day_str]["projects"][project_id_entry] = 0.0
-        
-        day_data[day_str]["projects"][project_id_entry] += entry.duration or 0.0
-    
-    # Convert to list of DailyTimeSummary
-    result = []
-    for day_str, data in day_data.items():
-        result.append(schemas.DailyTimeSummary(
-            date=data["date"],
-            total_entries=data["total_entries"],
-            total_duration_minutes=data["total_duration_minutes"],
-            projects=data["projects"]
-        ))
+        project_id_entry = row.project_key or "unassigned"
+        data["projects"][project_id_entry] = data["projects"].get(project_id_entry, 0.0) + row.total_duration
     
     # Sort by date (ascending)
-    result.sort(key=lambda x: x.date)
-    return result
\ No newline at end of file
+    return [schemas.DailyTimeSummary(**day_data[day]) for day in sorted(day_data)]
@@ -0,0 +1,137 @@
+import logging
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import Date, delete, func, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from ..models import timetunes_models as models
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROLLUP_COLUMNS = (
+    "day", "project_key", "entry_count", "timed_entry_count", "total_duration",
+    "min_duration", "max_duration", "first_start_time", "last_start_time",
+)
+TAG_ROLLUP_COLUMNS = ("day", "project_key", "tag_key", "entry_count", "total_duration")
+
+
+def _day():
+    return func.date(models.TimeEntry.start_time, type_=Date)
+
+
+def _project_key():
+    return func.coalesce(models.TimeEntry.project_id, "")
+
+
+def day_bounds(day: date):
+    """Filters selecting the time entries that start on day"""
+    start = datetime.combine(day, datetime.min.time())
+    return [models.TimeEntry.start_time >= start, models.TimeEntry.start_time < start + timedelta(days=1)]
+
+
+def project_rollup_select(filters):
+    """Aggregate the matching time entries into DailyProjectRollup rows (in PROJECT_ROLLUP_COLUMNS order)"""
+    day, project_key = _day(), _project_key()
+    columns = [
+        day,
+        project_key,
+        func.count(models.TimeEntry.id),
+        func.count(models.TimeEntry.duration),
+        func.coalesce(func.sum(models.TimeEntry.duration), 0.0),
+        func.min(models.TimeEntry.duration),
+        func.max(models.TimeEntry.duration),
+        func.min(models.TimeEntry.start_time),
+        func.max(models.TimeEntry.start_time),
+    ]
+    return select(
+        *(column.label(name) for column, name in zip(columns, PROJECT_ROLLUP_COLUMNS))
+    ).where(*filters).group_by(day, project_key)
+
+
+def tag_rollup_select(filters):
+    """Aggregate the matching time entries into DailyTagRollup rows (in TAG_ROLLUP_COLUMNS order)"""
+    day, project_key = _day(), _project_key()
+    filters = [*filters, models.TimeEntry.duration.isnot(None)]
+
+    # Number of tags on each entry, to distribute its time proportionally among them
+    tag_counts = select(
+        models.time_entry_tags.c.time_entry_id,
+        func.count().label("tag_count"),
+    ).join(
+        models.Tag, models.Tag.id == models.time_entry_tags.c.tag_id
+    ).group_by(models.time_entry_tags.c.time_entry_id).subquery()
+
+    tagged = select(
+        day,
+        project_key,
+        models.Tag.id,
+        func.count(models.TimeEntry.id),
+        func.sum(models.TimeEntry.duration / tag_counts.c.tag_count),
+    ).select_from(models.TimeEntry).join(
+        models.time_entry_tags, models.time_entry_tags.c.time_entry_id == models.TimeEntry.id
+    ).join(
+        models.Tag, models.Tag.id == models.time_entry_tags.c.tag_id
+    ).join(
+        tag_counts, tag_counts.c.time_entry_id == models.TimeEntry.id
+    ).where(*filters).group_by(day, project_key, models.Tag.id)
+
+    # Entries without tags are rolled up under the "" tag
+    untagged = select(
+        day,
+        project_key,
+        literal(""),
+        func.count(models.TimeEntry.id),
+        func.sum(models.TimeEntry.duration),
+    ).where(*filters, ~models.TimeEntry.tags.any()).group_by(day, project_key)
+
+    return union_all(tagged, untagged)
+
+
+def _insert_rollups(db: Session, filters):
+    db.execute(insert(models.DailyProjectRollup).from_select(PROJECT_ROLLUP_COLUMNS, project_rollup_select(filters)))
+    db.execute(insert(models.DailyTagRollup).from_select(TAG_ROLLUP_COLUMNS, tag_rollup_select(filters)))
+
+
+def refresh_daily_rollups(db: Session, days: Iterable[date]):
+    """
+    Recompute the rollup rows of the given days from their time entries
+
+    Called by the CRUD operations with the days a change touched, inside the same
+    transaction; the caller commits. Only the entries of those days are read.
+    """
+    for day in sorted(set(days)):
+        db.execute(delete(models.DailyProjectRollup).where(models.DailyProjectRollup.day == day))
+        db.execute(delete(models.DailyTagRollup).where(models.DailyTagRollup.day == day))
+        _insert_rollups(db, day_bounds(day))
+
+
+def rebuild_daily_rollups(db: Session):
+    """Recompute every rollup row from scratch, e.g. after a backfill or import; the caller commits"""
+    db.execute(delete(models.DailyProjectRollup))
+    db.execute(delete(models.DailyTagRollup))
+    _insert_rollups(db, [])
+
+
+def main():
+    from ..db.database import SessionLocal
+    from ..db.migrations import migrate
+
+    parser = argparse.ArgumentParser(description="Rebuild the TimeTunes daily rollup tables")
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    migrate()
+    db = SessionLocal()
+    try:
+        rebuild_daily_rollups(db)
+        db.commit()
+        days = db.query(func.count(models.DailyProjectRollup.day.distinct())).scalar()
+        logger.info(f"Rebuilt TimeTunes rollups for {days} days")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
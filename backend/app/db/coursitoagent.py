@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+from app.core.config import COURSITO_CACHE_PATH, COURSITO_CACHE_TTL_SECONDS, COURSITO_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+
+class CoursitoCache:
+    """
+    Persistent cache of processed lectures keyed by YouTube video id
+
+    Each entry holds the full processing result (transcript, notes, flashcards and questions)
+    as JSON in a SQLite file, so it survives restarts and is shared by every worker process.
+    Entries expire after ttl_seconds, and the least recently used entries are evicted once
+    the stored results exceed max_bytes.
+    """
+
+    def __init__(
+        self,
+        path: str = COURSITO_CACHE_PATH,
+        ttl_seconds: int = COURSITO_CACHE_TTL_SECONDS,
+        max_bytes: int = COURSITO_CACHE_MAX_BYTES,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS coursito_results (
+                    video_id TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_coursito_results_last_accessed ON coursito_results (last_accessed)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Short-lived connection per call, which keeps the cache safe to use from any worker thread"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the cached result for a video
+
+        Args:
+            video_id: Canonical YouTube video id
+
+        Returns:
+            The cached result, or None on a miss or if the entry has expired
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result, created_at FROM coursito_results WHERE video_id = ?", (video_id,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            result, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM coursito_results WHERE video_id = ?", (video_id,))
+                return None
+
+            conn.execute("UPDATE coursito_results SET last_accessed = ? WHERE video_id = ?", (now, video_id))
+
+        return json.loads(result)
+
+    def put(self, video_id: str, result: Dict[str, Any]):
+        """
+        Store the result for a video, then evict expired and least recently used entries
+
+        Args:
+            video_id: Canonical YouTube video id
+            result: Processing result to cache
+        """
+        payload = json.dumps(result)
+        size_bytes = len(payload.encode("utf-8"))
+        if size_bytes > self.max_bytes:
+            logger.warning(f"Result for video {video_id} is larger than the cache ({size_bytes} bytes), not caching")
+            return
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO coursito_results (video_id, result, size_bytes, created_at, last_accessed) VALUES (?, ?, ?, ?, ?)",
+                (video_id, payload, size_bytes, now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM coursito_results WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        total_bytes = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM coursito_results").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+
+        # Walk entries from least to most recently used until enough space is freed
+        evicted = []
+        for video_id, size_bytes in conn.execute(
+            "SELECT video_id, size_bytes FROM coursito_results ORDER BY last_accessed"
+        ).fetchall():
+            if total_bytes <= self.max_bytes:
+                break
+            evicted.append((video_id,))
+            total_bytes -= size_bytes
+
+        conn.executemany("DELETE FROM coursito_results WHERE video_id = ?", evicted)
+        logger.info(f"Evicted {len(evicted)} entries from the Coursito cache")
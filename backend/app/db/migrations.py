@@ -0,0 +1,64 @@
+import logging
+import argparse
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.db.database import Base, engine as default_engine
+from app.models import timetunes_models
+from app.crud.timetunes_rollups import rebuild_daily_rollups
+
+logger = logging.getLogger(__name__)
+
+# Derived tables filled from time_entries when a migration creates them
+ROLLUP_TABLES = [timetunes_models.DailyProjectRollup.__table__, timetunes_models.DailyTagRollup.__table__]
+
+# Indexes superseded by wider ones, by table
+OBSOLETE_INDEXES = {
+    "time_entries": ["ix_time_entries_start_time", "ix_time_entries_project_id_start_time"],
+}
+
+
+def migrate(engine: Engine = default_engine):
+    """
+    Bring a database up to the current schema
+
+    Missing tables are created with their indexes, indexes added to existing tables since
+    they were created are built, and superseded indexes are dropped. Rollup tables created by
+    the migration are filled from the existing time entries. Safe to run repeatedly; existing
+    data is left untouched.
+    """
+    created_rollups = [table.name for table in ROLLUP_TABLES if not inspect(engine).has_table(table.name)]
+    Base.metadata.create_all(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table_name, index_names in OBSOLETE_INDEXES.items():
+            existing = {index["name"] for index in inspector.get_indexes(table_name)}
+            for index_name in index_names:
+                if index_name in existing:
+                    logger.info(f"Dropping superseded index {index_name}")
+                    conn.execute(text(f"DROP INDEX {index_name}"))
+
+    if created_rollups:
+        logger.info(f"Filling new rollup tables {', '.join(created_rollups)}")
+        with Session(engine) as db:
+            rebuild_daily_rollups(db)
+            db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create missing tables and indexes in the application database")
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    migrate()
+    logger.info(f"Database schema is up to date ({default_engine.url})")
+
+
+if __name__ == "__main__":
+    main()
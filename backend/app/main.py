@@ -3,6 +3,8 @@ from fastapi.middleware.cors import CORSMiddleware
 import os
 
 from app.api.v1 import coachpilot, coursito
+from app.services.coursitoagent import job_manager
+from app.core.vectorstore import shutdown_search_executor, vector_stores
 
 app = FastAPI(
     title="Cogito API",
@@ -17,12 +19,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets browser clients read the TimeTunes pagination cursor
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include API routers
 app.include_router(coachpilot.router, prefix="/api/v1")
 app.include_router(coursito.router, prefix="/api/v1")
 
+@app.on_event("startup")
+def open_vector_stores():
+    """Open the default book database once so requests reuse its collection handle."""
+    vector_stores.warm([coachpilot.DEFAULT_DB_PATH])
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    """Release the Coursito job worker pool and the vector search threads."""
+    job_manager.shutdown()
+    shutdown_search_executor()
+
 @app.get("/")
 async def root():
     """Root endpoint to verify the API is running."""
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey, Index, Table
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -10,13 +10,21 @@ time_entry_tags = Table(
     "time_entry_tags",
     Base.metadata,
     Column("time_entry_id", String, ForeignKey("time_entries.id"), primary_key=True),
-    Column("tag_id", String, ForeignKey("tags.id"), primary_key=True)
+    Column("tag_id", String, ForeignKey("tags.id"), primary_key=True),
+    # The primary key serves lookups by entry; this serves filtering entries by tag
+    Index("ix_time_entry_tags_tag_id_time_entry_id", "tag_id", "time_entry_id"),
 )
 
 
 class TimeEntry(Base):
     """Time entry model for tracking time spent on projects"""
     __tablename__ = "time_entries"
+    __table_args__ = (
+        # Date ranges, and the newest-first (start_time, id) order used for keyset pagination
+        Index("ix_time_entries_start_time_id", "start_time", "id"),
+        # The same for listings and analytics filtered by project
+        Index("ix_time_entries_project_id_start_time_id", "project_id", "start_time", "id"),
+    )
 
     id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     description = Column(String, nullable=True)
@@ -68,4 +76,30 @@ class Tag(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Many-to-many relationship with time entries
-    time_entries = relationship("TimeEntry", secondary=time_entry_tags, back_populates="tags")
\ No newline at end of file
+    time_entries = relationship("TimeEntry", secondary=time_entry_tags, back_populates="tags")
+
+
+class DailyProjectRollup(Base):
+    """Per-day, per-project totals of time entries, kept current by the time entry CRUD operations"""
+    __tablename__ = "time_rollup_daily_projects"
+
+    day = Column(Date, primary_key=True)
+    project_key = Column(String, primary_key=True)  # Project ID, or "" for entries without a project
+    entry_count = Column(Integer, nullable=False)
+    timed_entry_count = Column(Integer, nullable=False)  # Entries with a duration
+    total_duration = Column(Float, nullable=False)  # In minutes
+    min_duration = Column(Float, nullable=True)
+    max_duration = Column(Float, nullable=True)
+    first_start_time = Column(DateTime, nullable=False)
+    last_start_time = Column(DateTime, nullable=False)
+
+
+class DailyTagRollup(Base):
+    """Per-day, per-project, per-tag totals of time entries with a duration"""
+    __tablename__ = "time_rollup_daily_tags"
+
+    day = Column(Date, primary_key=True)
+    project_key = Column(String, primary_key=True)  # Project ID, or "" for entries without a project
+    tag_key = Column(String, primary_key=True)  # Tag ID, or "" for untagged entries
+    entry_count = Column(Integer, nullable=False)
+    total_duration = Column(Float, nullable=False)  # Each entry's duration split evenly among its tags
@@ -0,0 +1,40 @@
+from pydantic import BaseModel, HttpUrl
+from typing import List, Optional, Dict, Any
+from datetime import datetime
+from enum import Enum
+
+
+class JobState(str, Enum):
+    """Lifecycle state shared by jobs and their individual stages"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+# Job schemas
+class JobSubmitRequest(BaseModel):
+    url: HttpUrl
+    callback_url: Optional[HttpUrl] = None  # POSTed the final job payload on completion
+
+
+class JobStage(BaseModel):
+    """Progress of a single pipeline stage (download, transcribe, ...)"""
+    name: str
+    status: JobState = JobState.QUEUED
+    progress: float = 0.0  # Fraction between 0 and 1
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class JobResponse(BaseModel):
+    id: str
+    url: str
+    status: JobState
+    stages: List[JobStage]
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    callback_url: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
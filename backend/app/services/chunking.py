@@ -0,0 +1,234 @@
+import os
+import re
+import glob
+import logging
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from app.utils.tokens import DEFAULT_ENCODING, count_tokens_batch
+
+logger = logging.getLogger(__name__)
+
+# Chunks target this many tokens and overlap the previous chunk by about this many
+DEFAULT_CHUNK_TOKENS = 512
+DEFAULT_OVERLAP_TOKENS = 64
+
+# A section shorter than this is merged with the one after it instead of becoming its own chunk
+MIN_CHUNK_TOKENS = 64
+
+_HEADING = re.compile(r"^#{1,6}\s")
+_LIST_ITEM = re.compile(r"^(?:[-*+]|\d+[.)])\s")
+
+# Whitespace after sentence-ending punctuation (optionally closed by a quote or bracket),
+# followed by something that starts a sentence
+_SENTENCE_BOUNDARY = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[\"'(\[*_]?[A-Z0-9])")
+
+# Separators placed before a unit, by what it starts
+_NEW_PARAGRAPH = "\n\n"
+_NEW_LINE = "\n"
+_NEW_SENTENCE = " "
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a paragraph into sentences"""
+    return [sentence for sentence in _SENTENCE_BOUNDARY.split(text) if sentence]
+
+
+class TokenChunker:
+    """
+    Streaming chunker that packs whole sentences into chunks of at most max_tokens tokens
+
+    Lines are fed one at a time, so a file of any size is chunked in a single pass while only
+    the chunk being built and an unfinished sentence are held in memory.
+
+    - A markdown heading starts a new chunk, so chunks do not straddle sections; a section
+      shorter than min_tokens is merged into the next one instead
+    - Chunks end on sentence boundaries; a sentence longer than max_tokens is split between words
+    - Consecutive chunks of a section share up to overlap_tokens tokens of whole trailing sentences
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_CHUNK_TOKENS,
+        overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+        min_tokens: int = MIN_CHUNK_TOKENS,
+        encoding_name: str = DEFAULT_ENCODING,
+    ):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min_tokens
+        self.encoding_name = encoding_name
+
+        # Trailing text of the current paragraph that may not be a complete sentence yet
+        self._pending = ""
+        self._separator = _NEW_PARAGRAPH
+        # (separator, text, tokens) of every sentence in the chunk being built
+        self._units: List[Tuple[str, str, int]] = []
+        self._tokens = 0
+        # Tokens added since the last chunk was emitted (excluding carried-over overlap)
+        self._new_tokens = 0
+
+    def feed(self, line: str) -> List[str]:
+        """
+        Add the next line of the document
+
+        Returns:
+            Chunks completed by this line
+        """
+        chunks: List[str] = []
+        stripped = line.strip()
+        if not stripped:
+            self._end_paragraph(chunks)
+            self._separator = _NEW_PARAGRAPH
+        elif _HEADING.match(stripped):
+            self._end_paragraph(chunks)
+            if self._new_tokens >= self.min_tokens:
+                self._emit(chunks, keep_overlap=False)
+            elif not self._new_tokens:
+                self._reset()  # Overlap never carries into a new section
+            self._separator = _NEW_PARAGRAPH
+            self._add_sentences(chunks, [stripped])
+            self._end_paragraph(chunks)
+        else:
+            if _LIST_ITEM.match(stripped):
+                self._end_paragraph(chunks)
+            text = f"{self._pending} {stripped}" if self._pending else stripped
+            sentences = split_sentences(text)
+            # The last sentence may continue on the next line
+            self._pending = sentences.pop()
+            self._add_sentences(chunks, sentences)
+        return chunks
+
+    def finish(self) -> List[str]:
+        """Flush the end of the document and return its remaining chunks"""
+        chunks: List[str] = []
+        self._end_paragraph(chunks)
+        if self._new_tokens:
+            self._emit(chunks, keep_overlap=False)
+        return chunks
+
+    def _end_paragraph(self, chunks: List[str]):
+        if self._pending:
+            self._add_sentences(chunks, [self._pending])
+            self._pending = ""
+        # Lines right after a paragraph (such as further list items) start on a new line
+        self._separator = _NEW_LINE
+
+    def _add_sentences(self, chunks: List[str], sentences: List[str]):
+        for sentence, tokens in zip(sentences, count_tokens_batch(sentences, self.encoding_name)):
+            if tokens > self.max_tokens:
+                for piece, piece_tokens in self._split_long_sentence(sentence):
+                    self._add(chunks, self._separator, piece, piece_tokens)
+                    self._separator = _NEW_SENTENCE
+            else:
+                self._add(chunks, self._separator, sentence, tokens)
+            self._separator = _NEW_SENTENCE
+
+    def _split_long_sentence(self, sentence: str) -> Iterator[Tuple[str, int]]:
+        words = sentence.split()
+        counts = count_tokens_batch([" " + word for word in words], self.encoding_name)
+        piece: List[str] = []
+        piece_tokens = 0
+        for word, tokens in zip(words, counts):
+            if piece and piece_tokens + tokens > self.max_tokens - self.overlap_tokens:
+                yield " ".join(piece), piece_tokens
+                piece, piece_tokens = [], 0
+            piece.append(word)
+            piece_tokens += tokens
+        if piece:
+            yield " ".join(piece), piece_tokens
+
+    def _add(self, chunks: List[str], separator: str, text: str, tokens: int):
+        if self._new_tokens and self._tokens + tokens > self.max_tokens:
+            self._emit(chunks, keep_overlap=True)
+            while self._units and self._tokens + tokens > self.max_tokens:
+                self._tokens -= self._units.pop(0)[2]
+        if not self._units:
+            separator = ""
+        self._units.append((separator, text, tokens))
+        self._tokens += tokens
+        self._new_tokens += tokens
+
+    def _emit(self, chunks: List[str], keep_overlap: bool):
+        chunks.append("".join(separator + text for separator, text, _ in self._units).strip())
+
+        carried: List[Tuple[str, str, int]] = []
+        if keep_overlap:
+            carried_tokens = 0
+            for unit in reversed(self._units[1:]):
+                if carried_tokens + unit[2] > self.overlap_tokens:
+                    break
+                carried.insert(0, unit)
+                carried_tokens += unit[2]
+        self._reset(carried)
+
+    def _reset(self, units: Optional[List[Tuple[str, str, int]]] = None):
+        self._units = units or []
+        self._tokens = sum(unit[2] for unit in self._units)
+        self._new_tokens = 0
+
+
+def iter_text_chunks(
+    lines: Iterable[str],
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+    min_tokens: int = MIN_CHUNK_TOKENS,
+) -> Iterator[str]:
+    """Chunk a document, given as lines (such as an open file), as the lines are read"""
+    chunker = TokenChunker(max_tokens, overlap_tokens, min_tokens)
+    for line in lines:
+        yield from chunker.feed(line)
+    yield from chunker.finish()
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+    min_tokens: int = MIN_CHUNK_TOKENS,
+) -> List[str]:
+    """Split text into sentence-aligned chunks of at most max_tokens tokens"""
+    return list(iter_text_chunks(text.splitlines(), max_tokens, overlap_tokens, min_tokens))
+
+
+def chunk_summary_file(
+    path: str,
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+) -> List[Dict[str, Any]]:
+    """Chunk one markdown book summary; the file name (without extension) is the book title"""
+    with open(path, "r", encoding="utf-8") as f:
+        chunks = list(iter_text_chunks(f, max_tokens, overlap_tokens))
+
+    book_title = os.path.splitext(os.path.basename(path))[0]
+    return [
+        {
+            "id": f"{book_title}_{i}",
+            "book_title": book_title,
+            "chunk_index": i,
+            "total_chunks": len(chunks),
+            "content": chunk,
+        }
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def iter_book_chunks(
+    directory: str,
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the chunks of every markdown summary in directory, one file at a time
+
+    Unlike chunking_util.process_book_summaries, nothing is collected: only the summary being
+    chunked is held in memory. A file that cannot be read is logged and skipped.
+    """
+    for path in sorted(glob.glob(os.path.join(directory, "*.md"))):
+        try:
+            chunks = chunk_summary_file(path, max_tokens, overlap_tokens)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error(f"Error chunking {path}: {str(e)}")
+            continue
+        yield from chunks
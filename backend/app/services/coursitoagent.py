@@ -0,0 +1,191 @@
+import os
+import json
+import uuid
+import logging
+import threading
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+from app.core.coursitoagent import CoursitoAgent, PIPELINE_STAGES
+from app.db.coursitoagent import CoursitoCache
+from app.schemas.coursitoagent import JobState
+
+logger = logging.getLogger(__name__)
+
+# Number of videos processed concurrently; each job is mostly network and subprocess bound
+DEFAULT_MAX_WORKERS = int(os.environ.get("COURSITO_MAX_WORKERS", "2"))
+
+# Finished jobs are kept this long so clients can still poll their result
+DEFAULT_JOB_TTL_SECONDS = int(os.environ.get("COURSITO_JOB_TTL_SECONDS", "3600"))
+
+CALLBACK_TIMEOUT_SECONDS = 10
+
+
+class CoursitoJobManager:
+    """
+    Runs CoursitoAgent pipelines on a bounded worker pool so API handlers return immediately:
+    - submit() queues a YouTube URL and returns the job record right away
+    - get() returns a snapshot of the job with per-stage progress
+    - an optional callback URL receives the final job payload when the job finishes
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        job_ttl_seconds: int = DEFAULT_JOB_TTL_SECONDS,
+        agent: Optional[CoursitoAgent] = None,
+    ):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="coursito-job")
+        self._job_ttl = timedelta(seconds=job_ttl_seconds)
+        self._agent = agent
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def agent(self) -> CoursitoAgent:
+        """Create the agent lazily so importing the module does not probe for API keys"""
+        if self._agent is None:
+            self._agent = CoursitoAgent(cache=CoursitoCache())
+        return self._agent
+
+    def submit(self, url: str, callback_url: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queue a YouTube URL for processing
+
+        Args:
+            url: YouTube URL
+            callback_url: Optional URL that receives the job payload once it completes or fails
+
+        Returns:
+            Snapshot of the newly created job
+        """
+        self._prune_finished_jobs()
+
+        job_id = str(uuid.uuid4())
+        job = {
+            "id": job_id,
+            "url": url,
+            "status": JobState.QUEUED,
+            "stages": [
+                {"name": stage, "status": JobState.QUEUED, "progress": 0.0, "started_at": None, "finished_at": None}
+                for stage in PIPELINE_STAGES
+            ],
+            "created_at": datetime.now(),
+            "started_at": None,
+            "finished_at": None,
+            "callback_url": callback_url,
+            "result": None,
+            "error": None,
+        }
+
+        with self._lock:
+            self._jobs[job_id] = job
+            self._futures[job_id] = self._executor.submit(self._run_job, job_id)
+            logger.info(f"Queued Coursito job {job_id} for URL: {url}")
+            return self._snapshot(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a snapshot of a job, or None if it is unknown or has expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def future(self, job_id: str) -> Future:
+        """Get the future resolving to the job's result dictionary"""
+        with self._lock:
+            return self._futures[job_id]
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting jobs and release the worker pool"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run_job(self, job_id: str) -> Dict[str, Any]:
+        """Worker entry point: run the pipeline and record its outcome on the job"""
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = JobState.RUNNING
+            job["started_at"] = datetime.now()
+            url = job["url"]
+
+        def on_progress(stage: str, status: str, progress: float):
+            self._update_stage(job_id, stage, JobState(status), progress)
+
+        try:
+            result = self.agent.process_youtube_url(url, progress_callback=on_progress)
+        except Exception as e:
+            logger.error(f"Coursito job {job_id} failed: {str(e)}")
+            self._finish_job(job_id, JobState.FAILED, error=str(e))
+            raise
+
+        self._finish_job(job_id, JobState.COMPLETED, result=result)
+        return result
+
+    def _update_stage(self, job_id: str, stage_name: str, status: JobState, progress: float):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            for stage in job["stages"]:
+                if stage["name"] != stage_name:
+                    continue
+                if status == JobState.RUNNING and stage["started_at"] is None:
+                    stage["started_at"] = datetime.now()
+                if status in (JobState.COMPLETED, JobState.FAILED):
+                    stage["finished_at"] = datetime.now()
+                stage["status"] = status
+                stage["progress"] = max(stage["progress"], progress)
+                break
+
+    def _finish_job(self, job_id: str, status: JobState, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = status
+            job["finished_at"] = datetime.now()
+            job["result"] = result
+            job["error"] = error
+            callback_url = job["callback_url"]
+            payload = self._snapshot(job)
+
+        if callback_url:
+            self._send_callback(callback_url, payload)
+
+    @staticmethod
+    def _send_callback(callback_url: str, payload: Dict[str, Any]):
+        """POST the finished job to its callback URL; failures are logged, not retried"""
+        try:
+            request = urllib.request.Request(
+                callback_url,
+                data=json.dumps(payload, default=str).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=CALLBACK_TIMEOUT_SECONDS):
+                pass
+            logger.info(f"Delivered completion callback for job {payload['id']}")
+        except Exception as e:
+            logger.warning(f"Error delivering completion callback to {callback_url}: {str(e)}")
+
+    def _prune_finished_jobs(self):
+        cutoff = datetime.now() - self._job_ttl
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job["finished_at"] is not None and job["finished_at"] < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+                del self._futures[job_id]
+
+    @staticmethod
+    def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy a job so callers never observe (or mutate) worker-side state"""
+        snapshot = dict(job)
+        snapshot["stages"] = [dict(stage) for stage in job["stages"]]
+        return snapshot
+
+
+# Process-wide job manager used by the Coursito routes
+job_manager = CoursitoJobManager()
@@ -0,0 +1,343 @@
+import os
+import json
+import hashlib
+import logging
+import argparse
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+
+from app.core.config import EMBEDDING_MAX_CONCURRENCY
+from app.core.embeddings import DEFAULT_EMBEDDING_MODEL, embed_texts
+from app.core.embedding_batcher import EmbeddingBatcher
+from app.core.embedding_store import EmbeddingStore, EmbeddingStoreWriter, is_embedding_store
+from app.core.vectorstore import BOOK_CHUNKS_COLLECTION
+from app.services.chunking import DEFAULT_CHUNK_TOKENS, DEFAULT_OVERLAP_TOKENS, iter_book_chunks
+from app.utils.pipeline import iter_in_thread, threaded_map
+
+logger = logging.getLogger(__name__)
+
+# Called as embed_fn(texts, model) and returns one embedding per text
+EmbedFunction = Callable[[Sequence[str], str], List[List[float]]]
+
+MANIFEST_VERSION = 1
+
+# Chunks per pipeline batch; each batch is embedded (in several parallel requests) and then written
+INDEX_BATCH_SIZE = 512
+
+# Batches embedded at once; the shared batcher still caps the requests in flight
+INDEX_EMBED_WORKERS = EMBEDDING_MAX_CONCURRENCY
+
+# Batches each pipeline stage may run ahead of the next
+INDEX_QUEUE_SIZE = 2
+
+
+def chunk_id(chunk: Dict[str, Any]) -> str:
+    """Stable id of a chunk: its own id if chunking assigned one, otherwise book title and position"""
+    return str(chunk.get("id") or f"{chunk.get('book_title', 'Unknown Book')}_{chunk.get('chunk_index')}")
+
+
+def chunk_hash(chunk: Dict[str, Any]) -> str:
+    """Content hash of a chunk; any change to its book, position or text changes the hash"""
+    key = f"{chunk.get('book_title', '')}\x00{chunk.get('chunk_index', '')}\x00{chunk['content']}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def load_chunks(path: str) -> List[Dict[str, Any]]:
+    """Load chunks.json written by chunking_util (a list of chunks, or a dictionary keyed by id)"""
+    with open(path, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    return list(chunks.values()) if isinstance(chunks, dict) else chunks
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """Read the index manifest, or return an empty one if nothing has been indexed yet"""
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "model": None, "chunks": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path: str, manifest: Dict[str, Any]):
+    """Write the manifest atomically, so an interrupted run leaves the previous one intact"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class KnowledgeBaseIndexer:
+    """
+    Incrementally indexes book chunks into an embedding store and/or a Chroma collection
+
+    A manifest records the content hash of every indexed chunk. On each run only new or
+    changed chunks are embedded; unchanged chunks keep their existing embeddings, and chunks
+    that no longer exist (for example from a deleted book summary) are removed. Changing the
+    embedding model re-embeds everything.
+
+    Chunks stream through three stages connected by bounded queues: planning (reading,
+    chunking and diffing against the manifest), embedding, and writing. Several batches are
+    embedded at once and written in order as soon as they are done, so memory stays flat
+    however large the library grows. Batches upserted into Chroma are journalled next to the
+    manifest, and embeddings land in the embedding cache, so an interrupted run picks up
+    where it stopped.
+    """
+
+    def __init__(
+        self,
+        manifest_path: str,
+        store_path: Optional[str] = None,
+        chroma_path: Optional[str] = None,
+        model: str = DEFAULT_EMBEDDING_MODEL,
+        embed_fn: Optional[EmbedFunction] = None,
+        store_dtype: str = "float32",
+        batch_size: int = INDEX_BATCH_SIZE,
+        queue_size: int = INDEX_QUEUE_SIZE,
+        embed_workers: int = INDEX_EMBED_WORKERS,
+    ):
+        if store_path is None and chroma_path is None:
+            raise ValueError("Nothing to index into: pass a store_path and/or a chroma_path")
+        self.manifest_path = manifest_path
+        self.journal_path = f"{manifest_path}.journal"
+        self.store_path = store_path
+        self.chroma_path = chroma_path
+        self.model = model
+        self.embed_fn = embed_fn or self._embed_with_batcher
+        self.store_dtype = store_dtype
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.embed_workers = embed_workers
+        self._batcher: Optional[EmbeddingBatcher] = None
+
+    def run(self, chunks: Iterable[Dict[str, Any]], full: bool = False) -> Dict[str, int]:
+        """
+        Bring the indexes in line with chunks
+
+        Args:
+            chunks: Every chunk of the current corpus, e.g. a generator from iter_book_chunks
+            full: Re-embed every chunk regardless of the manifest
+
+        Returns:
+            Counts of added, changed, unchanged and removed chunks
+        """
+        manifest = load_manifest(self.manifest_path)
+        if manifest["chunks"] and manifest.get("model") != self.model:
+            logger.info(f"Embedding model changed from {manifest.get('model')} to {self.model}, re-embedding everything")
+            full = True
+        indexed = {} if full else {**manifest["chunks"], **self._read_journal()}
+        if full and os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+        existing_store = EmbeddingStore(self.store_path) if self.store_path and is_embedding_store(self.store_path) else None
+        store_rows = {}
+        if existing_store is not None and not full:
+            store_rows = {existing_store.ids[row]: row for row in range(len(existing_store))}
+
+        # Only ids, hashes and titles of the corpus are held; chunk text and vectors stream through
+        current: Dict[str, Dict[str, Any]] = {}
+        stats = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        collection = self._open_collection() if self.chroma_path is not None else None
+        writer: Optional[EmbeddingStoreWriter] = None
+
+        planned = iter_in_thread(
+            self._plan_batches(chunks, indexed, store_rows, current, stats), maxsize=self.queue_size, name="index-plan"
+        )
+        embedded = threaded_map(
+            self._embed_batch, planned, maxsize=self.queue_size, name="index-embed", workers=self.embed_workers
+        )
+        try:
+            with open(self.journal_path, "a", encoding="utf-8") as journal:
+                for batch, vectors in embedded:
+                    if collection is not None:
+                        self._upsert_batch(collection, batch, vectors, journal)
+                    if self.store_path is not None:
+                        writer = self._write_store_batch(writer, batch, vectors, existing_store, store_rows)
+                    logger.info(f"Indexed {len(current)} chunks so far")
+
+            removed = [cid for cid in {**manifest["chunks"], **indexed} if cid not in current]
+            stats["removed"] = len(removed)
+            if collection is not None and removed:
+                collection.delete(ids=removed)
+            if writer is None and existing_store is not None:
+                # Every chunk is gone; an empty store replaces the old one so deleted books stop being served
+                writer = EmbeddingStoreWriter(
+                    self.store_path, existing_store.manifest["dimensions"], dtype=self.store_dtype, model=self.model
+                )
+            if writer is not None:
+                writer.close()
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+        finally:
+            embedded.close()
+            if existing_store is not None:
+                existing_store.close()
+
+        logger.info(
+            f"Indexed {len(current)} chunks: {stats['added']} new, {stats['changed']} changed, "
+            f"{stats['unchanged']} unchanged, {stats['removed']} removed"
+        )
+        save_manifest(self.manifest_path, {"version": MANIFEST_VERSION, "model": self.model, "chunks": current})
+        os.remove(self.journal_path)
+        return stats
+
+    def _plan_batches(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        indexed: Dict[str, Dict[str, Any]],
+        store_rows: Dict[str, int],
+        current: Dict[str, Dict[str, Any]],
+        stats: Dict[str, int],
+    ) -> Iterator[List[Tuple[str, Dict[str, Any], bool]]]:
+        """Yield batches of (id, chunk, needs embedding) and record every chunk in current"""
+        batch = []
+        for chunk in chunks:
+            cid = chunk_id(chunk)
+            if cid in current:
+                logger.warning(f"Skipping duplicate chunk id {cid}")
+                continue
+            digest = chunk_hash(chunk)
+            current[cid] = {"hash": digest, "book_title": chunk.get("book_title")}
+
+            previous = indexed.get(cid)
+            missing_from_store = self.store_path is not None and cid not in store_rows
+            if previous is None:
+                stats["added"] += 1
+                needs_embedding = True
+            elif previous["hash"] != digest or missing_from_store:
+                stats["changed"] += 1
+                needs_embedding = True
+            else:
+                stats["unchanged"] += 1
+                needs_embedding = False
+
+            batch.append((cid, chunk, needs_embedding))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _embed_batch(self, batch):
+        """Embed the chunks of a batch that need it; returns the batch and its vectors by id"""
+        to_embed = [(cid, chunk) for cid, chunk, needs_embedding in batch if needs_embedding]
+        vectors = {}
+        if to_embed:
+            embeddings = self.embed_fn([chunk["content"] for _, chunk in to_embed], self.model)
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            vectors = {cid: matrix[i] for i, (cid, _) in enumerate(to_embed)}
+        return batch, vectors
+
+    def _embed_with_batcher(self, texts: Sequence[str], model: str) -> List[List[float]]:
+        # One batcher per indexer, so rate-limit and concurrency state carries across batches
+        if self._batcher is None:
+            self._batcher = EmbeddingBatcher(model)
+        return embed_texts(texts, model, batcher=self._batcher)
+
+    def _read_journal(self) -> Dict[str, Dict[str, Any]]:
+        """Chunks upserted by an interrupted run with the same model"""
+        if not os.path.exists(self.journal_path):
+            return {}
+        entries = {}
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Torn final line
+                if entry.get("model") == self.model:
+                    entries[entry["id"]] = {"hash": entry["hash"], "book_title": entry.get("book_title")}
+        if entries:
+            logger.info(f"Resuming an interrupted run: {len(entries)} chunks were already upserted")
+        return entries
+
+    def _open_collection(self):
+        import chromadb
+
+        client = chromadb.PersistentClient(path=self.chroma_path)
+        return client.get_or_create_collection(name=BOOK_CHUNKS_COLLECTION)
+
+    def _upsert_batch(self, collection, batch, vectors: Dict[str, np.ndarray], journal: TextIO):
+        upserts = [(cid, chunk) for cid, chunk, _ in batch if cid in vectors]
+        if not upserts:
+            return
+        collection.upsert(
+            ids=[cid for cid, _ in upserts],
+            embeddings=[vectors[cid].tolist() for cid, _ in upserts],
+            documents=[chunk["content"] for _, chunk in upserts],
+            metadatas=[
+                {
+                    "book_title": chunk.get("book_title", "Unknown Book"),
+                    "chunk_index": chunk.get("chunk_index"),
+                    "total_chunks": chunk.get("total_chunks"),
+                }
+                for _, chunk in upserts
+            ],
+        )
+        for cid, chunk in upserts:
+            journal.write(json.dumps({
+                "id": cid, "hash": chunk_hash(chunk), "book_title": chunk.get("book_title"), "model": self.model,
+            }) + "\n")
+        journal.flush()
+
+    def _write_store_batch(
+        self,
+        writer: Optional[EmbeddingStoreWriter],
+        batch,
+        vectors: Dict[str, np.ndarray],
+        existing_store: Optional[EmbeddingStore],
+        store_rows: Dict[str, int],
+    ) -> EmbeddingStoreWriter:
+        """Append a batch to the new store, copying unchanged rows from the previous one"""
+        rows = []
+        for cid, chunk, _ in batch:
+            if cid in vectors:
+                embedding = vectors[cid]
+            else:
+                embedding = np.asarray(existing_store.embeddings[store_rows[cid]], dtype=np.float32)
+            rows.append({**chunk, "id": cid, "embedding": embedding})
+
+        if writer is None:
+            writer = EmbeddingStoreWriter(self.store_path, len(rows[0]["embedding"]), dtype=self.store_dtype, model=self.model)
+        writer.add_batch(rows)
+        return writer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally embed and index book chunks")
+    parser.add_argument("source", help="Directory of markdown book summaries to chunk, or a chunks.json file")
+    parser.add_argument("--manifest", help="Index manifest (default: index_manifest.json in the source's directory)")
+    parser.add_argument("--store", help="Embedding store directory to maintain")
+    parser.add_argument("--chroma", help="Chroma database directory to maintain")
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL, help="Embedding model")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32", help="Storage precision of the embedding store")
+    parser.add_argument("--full", action="store_true", help="Re-embed every chunk")
+    parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS, help="Maximum tokens per chunk when chunking summaries")
+    parser.add_argument("--overlap-tokens", type=int, default=DEFAULT_OVERLAP_TOKENS, help="Tokens of overlap between chunks")
+    parser.add_argument("--batch-size", type=int, default=INDEX_BATCH_SIZE, help="Chunks embedded and written per batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    source = os.path.abspath(args.source)
+    if os.path.isdir(source):
+        chunks = iter_book_chunks(source, args.chunk_tokens, args.overlap_tokens)
+        manifest_dir = source
+    else:
+        chunks = load_chunks(source)
+        manifest_dir = os.path.dirname(source)
+    manifest_path = args.manifest or os.path.join(manifest_dir, "index_manifest.json")
+    indexer = KnowledgeBaseIndexer(
+        manifest_path,
+        store_path=args.store,
+        chroma_path=args.chroma,
+        model=args.model,
+        store_dtype=args.dtype,
+        batch_size=args.batch_size,
+    )
+    stats = indexer.run(chunks, full=args.full)
+    print(f"Indexed chunks: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+import os
+import re
+import logging
+from urllib.parse import urlparse, parse_qs
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Size of each read from the source file; also bounds the splitter's memory use
+READ_BLOCK_SIZE = 64 * 1024
+
+# Bitrates in kbps indexed by [mpeg1][layer][bitrate_index]; index 0 is "free format" (unsupported)
+_BITRATES = {
+    True: {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    },
+    False: {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    },
+}
+
+# Sample rates in Hz indexed by version bits (0: MPEG 2.5, 2: MPEG 2, 3: MPEG 1)
+_SAMPLE_RATES = {
+    0: [11025, 12000, 8000],
+    2: [22050, 24000, 16000],
+    3: [44100, 48000, 32000],
+}
+
+
+def mp3_frame_length(header: bytes) -> Optional[int]:
+    """
+    Compute the length of an MPEG audio frame from its 4-byte header
+
+    Args:
+        header: The first 4 bytes of a candidate frame
+
+    Returns:
+        Frame length in bytes, or None if the bytes are not a valid frame header
+    """
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+
+    version_bits = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)  # 1, 2 or 3; 4 means reserved
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+
+    if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    is_mpeg1 = version_bits == 3
+    bitrate = _BITRATES[is_mpeg1][layer][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][sample_rate_index]
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4
+    if layer == 3 and not is_mpeg1:
+        return 72 * bitrate // sample_rate + padding
+    return 144 * bitrate // sample_rate + padding
+
+
+def _is_vbr_info_frame(frame: bytes) -> bool:
+    """Xing/Info frames describe the whole file; copied into a chunk they would misreport its length"""
+    return b"Xing" in frame[:64] or b"Info" in frame[:64]
+
+
+def _id3v2_tag_size(header: bytes) -> int:
+    """Size of a leading ID3v2 tag (including its 10-byte header), or 0 if there is none"""
+    if len(header) < 10 or header[:3] != b"ID3":
+        return 0
+    size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def iter_mp3_frames(source: BinaryIO) -> Iterator[bytes]:
+    """
+    Yield the MPEG audio frames of a stream one at a time
+
+    Only a few kilobytes are buffered at any moment, so the stream can be arbitrarily long
+    (or still being written by another process, when reading from a pipe). Bytes that are not
+    part of a frame - ID3 tags, junk between frames - are skipped.
+
+    Args:
+        source: Binary stream positioned at the start of the MP3 data
+    """
+    buffer = bytearray()
+    eof = False
+    first_frame = True
+
+    def fill(size: int) -> bool:
+        nonlocal eof
+        while len(buffer) < size and not eof:
+            block = source.read(READ_BLOCK_SIZE)
+            if not block:
+                eof = True
+            else:
+                buffer.extend(block)
+        return len(buffer) >= size
+
+    # Skip a leading ID3v2 tag, which may be larger than a read block
+    fill(10)
+    tag_size = _id3v2_tag_size(bytes(buffer[:10]))
+    while tag_size > 0 and fill(1):
+        skipped = min(tag_size, len(buffer))
+        del buffer[:skipped]
+        tag_size -= skipped
+
+    while fill(4):
+        frame_length = mp3_frame_length(bytes(buffer[:4]))
+        if frame_length is None:
+            # Resynchronise on the next candidate frame header
+            next_sync = buffer.find(b"\xff", 1)
+            del buffer[:next_sync if next_sync != -1 else len(buffer)]
+            continue
+
+        if not fill(frame_length):
+            # Truncated final frame
+            break
+
+        frame = bytes(buffer[:frame_length])
+        del buffer[:frame_length]
+
+        if first_frame:
+            first_frame = False
+            if _is_vbr_info_frame(frame):
+                continue
+
+        yield frame
+
+
+def iter_mp3_chunks(
+    source: Union[str, BinaryIO],
+    output_dir: str,
+    max_chunk_bytes: int,
+    prefix: str = "audio_chunk",
+) -> Iterator[str]:
+    """
+    Split an MP3 into frame-aligned chunk files without decoding or re-encoding it
+
+    Chunks are written and yielded one at a time, so the first chunk can be consumed while
+    the rest of the input is still being cut, and peak memory does not depend on the input length.
+
+    Args:
+        source: Path to an MP3 file, or a binary stream of MP3 data
+        output_dir: Directory to write the chunk files to
+        max_chunk_bytes: Maximum size of each chunk file in bytes
+        prefix: Chunk file name prefix; files are named <prefix>_<n>.mp3 starting at 1
+
+    Yields:
+        Paths to the completed chunk files, in playback order
+    """
+    stream = open(source, "rb") if isinstance(source, str) else source
+    chunk_file = None
+    chunk_path = None
+    chunk_size = 0
+    chunk_count = 0
+
+    try:
+        for frame in iter_mp3_frames(stream):
+            if chunk_file is not None and chunk_size + len(frame) > max_chunk_bytes:
+                chunk_file.close()
+                chunk_file = None
+                logger.info(f"Created chunk {chunk_count}, size: {chunk_size / (1024 * 1024):.2f} MB")
+                yield chunk_path
+
+            if chunk_file is None:
+                chunk_count += 1
+                chunk_path = os.path.join(output_dir, f"{prefix}_{chunk_count}.mp3")
+                chunk_file = open(chunk_path, "wb")
+                chunk_size = 0
+
+            chunk_file.write(frame)
+            chunk_size += len(frame)
+
+        if chunk_file is not None:
+            chunk_file.close()
+            chunk_file = None
+            logger.info(f"Created chunk {chunk_count}, size: {chunk_size / (1024 * 1024):.2f} MB")
+            yield chunk_path
+    finally:
+        if chunk_file is not None:
+            chunk_file.close()
+        if stream is not source:
+            stream.close()
+
+
+# YouTube video ids are 11 characters from the URL-safe base64 alphabet
+_VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+_YOUTUBE_HOSTS = {"youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com", "youtube-nocookie.com", "www.youtube-nocookie.com"}
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """
+    Extract the canonical video id from the many shapes of YouTube URL
+
+    Handles watch URLs (with any extra query parameters such as list, index or t),
+    youtu.be short links, and /embed/, /shorts/, /live/ and /v/ paths.
+
+    Args:
+        url: YouTube URL
+
+    Returns:
+        The 11-character video id, or None if the URL does not identify a single video
+    """
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or "").lower()
+    path_parts = [part for part in parsed.path.split("/") if part]
+
+    candidate = None
+    if host == "youtu.be" and path_parts:
+        candidate = path_parts[0]
+    elif host in _YOUTUBE_HOSTS:
+        if parsed.path == "/watch":
+            candidate = parse_qs(parsed.query).get("v", [None])[0]
+        elif len(path_parts) >= 2 and path_parts[0] in ("embed", "shorts", "live", "v"):
+            candidate = path_parts[1]
+
+    if candidate and _VIDEO_ID_PATTERN.match(candidate):
+        return candidate
+    return None
+
+
+def canonical_video_url(video_id: str) -> str:
+    """Build the canonical watch URL for a video id"""
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+# Sentence ends followed by whitespace; used to cut transcripts without splitting sentences
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_transcript(transcript: str, max_chars: int) -> List[str]:
+    """
+    Split a transcript into segments of at most max_chars, cutting between sentences
+
+    A single sentence longer than max_chars (transcripts are not always punctuated) is cut
+    on whitespace instead.
+
+    Args:
+        transcript: Full transcript text
+        max_chars: Maximum length of each segment
+
+    Returns:
+        Segments in transcript order
+    """
+    segments = []
+    current = ""
+
+    for sentence in _SENTENCE_BOUNDARY.split(transcript.strip()):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                segments.append(current)
+                current = ""
+            segments.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            segments.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+
+    if current:
+        segments.append(current)
+    return segments
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and strip punctuation and extra whitespace, for duplicate detection"""
+    return " ".join(re.sub(r"[^\w\s]", " ", str(text).lower()).split())
+
+
+def merge_notes_and_flashcards(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-segment notes and flashcards into a single result in the usual shape
+
+    Note sections sharing a title are combined (keeping distinct content only), and
+    flashcards asking the same question are kept once.
+
+    Args:
+        results: Per-segment results, in transcript order
+
+    Returns:
+        Dictionary with "notes" and "flashcards" lists
+    """
+    notes: List[Dict[str, Any]] = []
+    notes_by_title: Dict[str, Dict[str, Any]] = {}
+    flashcards: List[Dict[str, Any]] = []
+    seen_questions = set()
+
+    for result in results:
+        for note in result.get("notes", []):
+            key = normalize_text(note.get("title", ""))
+            existing = notes_by_title.get(key)
+            if existing is None:
+                note = dict(note)
+                notes_by_title[key] = note
+                notes.append(note)
+            elif normalize_text(note.get("content", "")) not in normalize_text(existing.get("content", "")):
+                existing["content"] = f"{existing.get('content', '')}\n\n{note.get('content', '')}".strip()
+
+        for card in result.get("flashcards", []):
+            key = normalize_text(card.get("question", ""))
+            if key not in seen_questions:
+                seen_questions.add(key)
+                flashcards.append(card)
+
+    return {"notes": notes, "flashcards": flashcards}
+
+
+def merge_question_banks(question_banks: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Concatenate per-segment question banks in order, dropping repeated questions
+
+    Every segment numbers its questions from 1, so questions that carry an "id" are
+    renumbered in merged order.
+    """
+    questions = []
+    seen_questions = set()
+    for bank in question_banks:
+        for question in bank:
+            key = normalize_text(question.get("question", ""))
+            if key not in seen_questions:
+                seen_questions.add(key)
+                questions.append(question)
+    return [
+        {**question, "id": number} if "id" in question else question
+        for number, question in enumerate(questions, start=1)
+    ]
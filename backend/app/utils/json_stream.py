@@ -0,0 +1,79 @@
+import json
+from typing import Any, List, Tuple
+
+
+class IncrementalObjectParser:
+    """
+    Parses a JSON object that arrives in pieces, such as streamed LLM output
+
+    feed() returns each top-level member as soon as its value is complete, so a caller
+    can act on {"summary": ...} long before the rest of the object has been generated.
+    Only the text of the member currently being generated is kept in memory.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.done = False
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Add the next piece of the document
+
+        Args:
+            text: Next chunk of JSON text
+
+        Returns:
+            (key, value) pairs for the top-level members completed by this chunk, in document order
+
+        Raises:
+            ValueError: If the document is not a JSON object or a member is malformed
+        """
+        members = []
+        self._text += text
+        i = self._pos
+        while i < len(self._text) and not self.done:
+            char = self._text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    self._text = self._text[i + 1:]
+                    i = -1
+                elif not char.isspace():
+                    raise ValueError(f"Expected a JSON object, got {char!r}")
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    members.extend(self._parse_member(self._text[:i]))
+                    self.done = True
+            elif char == "," and self._depth == 1:
+                members.extend(self._parse_member(self._text[:i]))
+                self._text = self._text[i + 1:]
+                i = -1
+            i += 1
+
+        self._pos = i
+        return members
+
+    @staticmethod
+    def _parse_member(text: str) -> List[Tuple[str, Any]]:
+        if not text.strip():
+            return []
+        try:
+            return list(json.loads("{" + text + "}").items())
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Malformed JSON member: {str(e)}") from e
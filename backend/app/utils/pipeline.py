@@ -0,0 +1,107 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+U = TypeVar("U")
+
+# How often a blocked stage checks whether its consumer has gone away
+_POLL_SECONDS = 0.1
+
+_END = object()
+
+
+class _StageError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def iter_in_thread(iterable: Iterable[T], maxsize: int = 2, name: str = "pipeline-stage") -> Iterator[T]:
+    """
+    Consume iterable in a background thread, handing items over through a bounded queue
+
+    The thread runs at most maxsize items ahead of the consumer, so chaining stages keeps
+    every stage busy while memory stays bounded by the queue sizes. An exception raised by
+    the stage is re-raised to the consumer; if the consumer stops early, the stage stops too.
+    """
+    items: "queue.Queue" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_END)
+        except BaseException as e:
+            put(_StageError(e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _END:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def threaded_map(
+    func: Callable[[T], U], iterable: Iterable[T], maxsize: int = 2, name: str = "pipeline-stage", workers: int = 1
+) -> Iterator[U]:
+    """
+    Apply func to each item in background threads, running at most maxsize results ahead
+
+    With several workers, up to that many items are processed at once; results are still
+    yielded in input order.
+    """
+    def apply():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                yield func(item)
+        finally:
+            # Stops an upstream stage when this one is abandoned
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def apply_concurrently():
+        iterator = iter(iterable)
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        pending: "deque[Future]" = deque()
+        try:
+            for item in iterator:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    return iter_in_thread(apply() if workers <= 1 else apply_concurrently(), maxsize=maxsize, name=name)
@@ -0,0 +1,60 @@
+import logging
+from functools import lru_cache
+from typing import List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Encoding used by text-embedding-3-* and gpt-4 family models
+DEFAULT_ENCODING = "cl100k_base"
+
+# Below this many texts, tiktoken's threaded batch encoder costs more than it saves
+BATCH_ENCODE_MIN_TEXTS = 64
+
+
+@lru_cache(maxsize=8)
+def get_encoding(name: str = DEFAULT_ENCODING):
+    """
+    Load a tiktoken encoding once per process
+
+    Returns:
+        The encoding, or None if tiktoken is not installed (counts then fall back to an estimate)
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("tiktoken is not installed, estimating token counts from text length")
+        return None
+
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning(f"Could not load tiktoken encoding {name}, estimating token counts: {str(e)}")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about four bytes of UTF-8 per token for English text"""
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    """Count the tokens of text with tiktoken, or estimate them if it is unavailable"""
+    encoding = get_encoding(encoding_name)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens_batch(texts: Sequence[str], encoding_name: str = DEFAULT_ENCODING) -> List[int]:
+    """
+    Count the tokens of many texts
+
+    Special-token markers are counted as plain text, which lets tiktoken skip its special-token
+    scan; large inputs are encoded on tiktoken's worker threads.
+    """
+    encoding = get_encoding(encoding_name)
+    if encoding is None:
+        return [estimate_tokens(text) for text in texts]
+    if len(texts) >= BATCH_ENCODE_MIN_TEXTS:
+        return [len(tokens) for tokens in encoding.encode_ordinary_batch(list(texts))]
+    return [len(encoding.encode_ordinary(text)) for text in texts]
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import sqlite3
+
+import pytest
+
+from app.core.cache import MemoryResponseCache, SQLiteResponseCache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    def make(max_entries=3, max_bytes=10_000, ttl_seconds=60):
+        if request.param == "memory":
+            return MemoryResponseCache(max_entries, max_bytes, ttl_seconds)
+        return SQLiteResponseCache(str(tmp_path / "cache.db"), max_entries, max_bytes, ttl_seconds)
+    return make
+
+
+def test_evicts_least_recently_used(make_cache):
+    cache = make_cache(max_entries=2)
+    cache.set("a", {"value": 1})
+    cache.set("b", {"value": 2})
+    assert cache.get("a") == {"value": 1}  # "b" is now the least recently used
+
+    cache.set("c", {"value": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"value": 1}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (2, 1, 1, 2)
+
+
+def test_enforces_byte_cap_and_ttl(make_cache):
+    cache = make_cache(max_entries=100, max_bytes=60)
+    cache.set("big", {"text": "x" * 100})
+    assert cache.stats()["entries"] == 0
+
+    cache.set("a", {"text": "a" * 20})
+    cache.set("b", {"text": "b" * 20})
+    assert cache.stats()["size_bytes"] <= 60
+
+    cache.ttl_seconds = -1  # Everything is now expired
+    assert cache.get("b") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_returned_values_are_copies(make_cache):
+    cache = make_cache()
+    cache.set("a", {"execution_time": 1.0})
+    cache.get("a")["execution_time"] = 0.0
+    assert cache.get("a") == {"execution_time": 1.0}
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    worker_one = SQLiteResponseCache(path, 10, 10_000, 60, namespace="coachpilot")
+    worker_two = SQLiteResponseCache(path, 10, 10_000, 60, namespace="coachpilot")
+
+    worker_one.set("query", {"summary": "done"})
+
+    assert worker_two.get("query") == {"summary": "done"}
+    worker_two.flush()
+    assert worker_one.stats()["hits"] == 1
+
+
+def test_sqlite_lookups_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteResponseCache(path, 10, 10_000, 60, flush_seconds=3600, flush_max_pending=5)
+    cache.set("a", {"value": 1})
+
+    def stored_hits():
+        with sqlite3.connect(path) as conn:
+            row = conn.execute("SELECT value FROM cache_stats WHERE name = 'hits'").fetchone()
+        return row[0] if row else 0
+
+    for _ in range(4):
+        assert cache.get("a") == {"value": 1}
+    assert stored_hits() == 0
+
+    cache.get("a")  # The fifth lookup writes all of them in one transaction
+    assert stored_hits() == 5
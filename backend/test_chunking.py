@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import pytest
+
+from app.services.chunking import TokenChunker, chunk_text, split_sentences
+from app.utils.tokens import BATCH_ENCODE_MIN_TEXTS, count_tokens, count_tokens_batch, get_encoding
+
+needs_tokenizer = pytest.mark.skipif(get_encoding() is None, reason="tiktoken with the cl100k_base encoding is not available")
+
+
+def test_splits_sentences_after_closing_punctuation():
+    text = 'He said "no." Then he left! Did it work? Version 2.5 shipped.'
+    assert split_sentences(text) == ['He said "no."', "Then he left!", "Did it work?", "Version 2.5 shipped."]
+
+
+@needs_tokenizer
+def test_counts_come_from_the_tokenizer():
+    # The byte estimate would give 3
+    assert count_tokens("hello world") == 2
+
+    texts = [f"Sentence {i} of the batch <|endoftext|>." for i in range(BATCH_ENCODE_MIN_TEXTS)]
+    expected = [len(get_encoding().encode_ordinary(text)) for text in texts]
+    assert count_tokens_batch(texts) == expected
+    assert count_tokens_batch(texts[:3]) == expected[:3]
+    assert [count_tokens(text) for text in texts[:3]] == expected[:3]
+
+
+@needs_tokenizer
+def test_chunks_respect_token_budget_sentences_and_headings():
+    body = " ".join(f"Habit number {i} compounds over time." for i in range(30))
+    document = f"# Atomic Habits\n\n{body}\n\n# Deep Work\n\nFocus without distraction creates value.\n\n" * 2
+
+    chunks = chunk_text(document, max_tokens=60, overlap_tokens=12, min_tokens=5)
+
+    assert all(count_tokens(chunk) <= 60 for chunk in chunks)
+    # Every chunk ends on a sentence boundary, and no chunk straddles two sections
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert all(chunk.count("# ") <= 1 for chunk in chunks)
+    assert sum(chunk.startswith("# Deep Work") for chunk in chunks) == 2
+
+    # Consecutive chunks within a section overlap by whole sentences
+    first, second = chunks[0], chunks[1]
+    assert second.split(". ")[0] + "." in first
+
+
+def test_streams_chunks_before_the_document_ends():
+    chunker = TokenChunker(max_tokens=30, overlap_tokens=5, min_tokens=5)
+    emitted = []
+    for i in range(20):
+        emitted.extend(chunker.feed(f"Line {i} says something worth keeping."))
+    assert emitted
+    emitted.extend(chunker.finish())
+    assert "Line 19" in emitted[-1]
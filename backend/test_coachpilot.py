@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.api.v1 import coachpilot
+from app.core import embeddings
+from app.core.cache import MemoryResponseCache
+from app.core.openai_client import reset_openai_clients
+
+
+CHAT_CONTENT = {
+    "kanban": {"title": "Board", "content": {"columns": []}},
+    "summary": "Plan your week",
+    "checklist": {"title": "Weekly plan", "content": {"items": [{"id": "1", "text": "Block focus time"}]}},
+    "book_insights": {"Deep Work": ["Schedule deep work"]},
+}
+
+
+class StubOpenAIServer(ThreadingHTTPServer):
+    """Local stand-in for the OpenAI embeddings and chat completion endpoints"""
+
+    request_queue_size = 64  # Room for every concurrent test request in the listen backlog
+
+    def __init__(self, delay=0.2):
+        super().__init__(("127.0.0.1", 0), StubOpenAIHandler)
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        if body.get("stream"):
+            self.send_stream(body)
+            return
+
+        if self.path.endswith("/embeddings"):
+            payload = {
+                "object": "list",
+                "data": [{"object": "embedding", "index": 0, "embedding": [0.1] * 1536}],
+                "model": body["model"],
+                "usage": {"prompt_tokens": 1, "total_tokens": 1},
+            }
+        else:
+            content = CHAT_CONTENT
+            payload = {
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": json.dumps(content)},
+                }],
+            }
+
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_stream(self, body):
+        """Send the chat completion as a server-sent event stream, a few characters per chunk"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        text = json.dumps(CHAT_CONTENT)
+        for i in range(0, len(text), 7):
+            chunk = {
+                "id": "chatcmpl-1",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": body["model"],
+                "choices": [{"index": 0, "delta": {"content": text[i:i + 7]}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_openai(monkeypatch, tmp_path):
+    server = StubOpenAIServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    reset_openai_clients()
+
+    async def fake_search(query, query_embedding, top_k, db_path):
+        await asyncio.sleep(0.05)
+        return {"query": query, "sources": {"Deep Work": [{"content": "Focus.", "relevance": 0.9}]}, "raw_results": {}}
+
+    monkeypatch.setattr(coachpilot, "asearch_book_chunks", fake_search)
+    monkeypatch.setattr(coachpilot, "VECTOR_DB_ROOTS", (str(tmp_path),))
+    monkeypatch.setattr(coachpilot, "query_cache", MemoryResponseCache(100, 1_000_000, 60))
+    monkeypatch.setattr(coachpilot, "semantic_cache", None)
+    monkeypatch.setattr(embeddings, "get_embedding_cache", lambda: None)
+
+    yield server
+
+    reset_openai_clients()
+    server.shutdown()
+    server.server_close()
+
+
+def test_concurrent_requests_do_not_block_each_other(stub_openai, tmp_path):
+    requests = [
+        coachpilot.CoachRequest(query=f"question {i}", formats=["checklist"], db_path=str(tmp_path))
+        for i in range(8)
+    ]
+
+    async def run():
+        start = time.time()
+        responses = await asyncio.gather(*(coachpilot.generate_coach_content(r) for r in requests))
+        return responses, time.time() - start
+
+    responses, elapsed = asyncio.run(run())
+
+    assert [r.sections[0].title for r in responses] == ["Weekly plan"] * 8
+    assert stub_openai.max_in_flight > 1
+    # Eight requests, each with two 0.2s OpenAI calls, would take 3.2s if they ran one after another
+    assert elapsed < 8 * 2 * 0.2 / 2
+
+
+def test_stream_delivers_summary_then_sections_then_insights(stub_openai, tmp_path):
+    request = coachpilot.CoachRequest(query="plan my week", formats=["checklist", "kanban"], db_path=str(tmp_path))
+
+    async def collect():
+        return [event async for event in coachpilot.generate_coach_events(request)]
+
+    events = []
+    for raw in asyncio.run(collect()):
+        name, data = raw.strip().split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+
+    # The stub writes kanban before the summary; it is held back so the summary still comes first
+    assert [name for name, _ in events] == ["summary", "section", "section", "book_insights", "done"]
+    assert [data["format"] for name, data in events if name == "section"] == ["kanban", "checklist"]
+    assert events[3][1]["sources"][0]["key_insights"] == ["Schedule deep work"]
+    assert [s["format"] for s in events[-1][1]["sections"]] == ["checklist", "kanban"]
+
+
+def test_stream_releases_llm_slot_while_the_client_is_slow(stub_openai, tmp_path, monkeypatch):
+    def make_request(query):
+        return coachpilot.CoachRequest(query=query, formats=["checklist"], db_path=str(tmp_path))
+
+    async def run():
+        monkeypatch.setattr(coachpilot, "llm_semaphore", asyncio.Semaphore(1))
+        slow = coachpilot.generate_coach_events(make_request("slow reader"))
+        first = await slow.__anext__()
+        # The stub has sent the whole completion by now; the slow client has read one event
+        await asyncio.sleep(0.5)
+        other = [event async for event in coachpilot.generate_coach_events(make_request("other"))]
+        rest = [event async for event in slow]
+        return first, other, rest
+
+    first, other, rest = asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+    assert first.startswith("event: summary")
+    assert other[-1].startswith("event: done")
+    assert rest[-1].startswith("event: done")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import io
+
+from app.utils.coursitoagent import iter_mp3_chunks, mp3_frame_length
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, no padding: 417-byte frames
+FRAME_HEADER = b"\xff\xfb\x90\x00"
+FRAME_LENGTH = 417
+
+
+def make_frame(marker: int) -> bytes:
+    return FRAME_HEADER + bytes([marker % 256]) * (FRAME_LENGTH - 4)
+
+
+def make_mp3(num_frames: int) -> bytes:
+    id3_tag = b"ID3\x04\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+    xing_frame = FRAME_HEADER + b"\x00" * 32 + b"Xing" + b"\x00" * (FRAME_LENGTH - 40)
+    frames = b"".join(make_frame(i) for i in range(num_frames))
+    id3v1_tag = b"TAG" + b"\x00" * 125
+    return id3_tag + xing_frame + frames + id3v1_tag
+
+
+def test_mp3_frame_length():
+    assert mp3_frame_length(FRAME_HEADER) == FRAME_LENGTH
+    assert mp3_frame_length(b"\xff\xfb\x92\x00") == FRAME_LENGTH + 1  # Padding bit set
+    assert mp3_frame_length(b"TAG\x00") is None
+
+
+def test_iter_mp3_chunks_cuts_on_frame_boundaries(tmp_path):
+    data = make_mp3(num_frames=100)
+    max_chunk_bytes = 10 * FRAME_LENGTH + 100
+
+    chunks = list(iter_mp3_chunks(io.BytesIO(data), str(tmp_path), max_chunk_bytes))
+
+    assert [path.rsplit("_", 1)[-1] for path in chunks] == [f"{i}.mp3" for i in range(1, 11)]
+    contents = [open(path, "rb").read() for path in chunks]
+    assert all(len(content) == 10 * FRAME_LENGTH for content in contents)
+    # Tags and the Xing header are dropped; every audio frame is kept byte for byte, in order
+    assert b"".join(contents) == b"".join(make_frame(i) for i in range(100))
+
+
+def test_iter_mp3_chunks_yields_before_reading_the_whole_input(tmp_path):
+    source = io.BytesIO(make_mp3(num_frames=1000))
+
+    first_chunk = next(iter_mp3_chunks(source, str(tmp_path), 5 * FRAME_LENGTH))
+
+    assert open(first_chunk, "rb").read() == b"".join(make_frame(i) for i in range(5))
+    assert source.tell() < len(source.getvalue())
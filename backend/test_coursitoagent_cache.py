@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+from types import SimpleNamespace
+
+import pytest
+
+from app.db import coursitoagent as cache_module
+from app.db.coursitoagent import CoursitoCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def result(text):
+    return {"transcript": text, "notes": [], "flashcards": [], "questions": []}
+
+
+def test_entries_expire_after_their_ttl(tmp_path, clock):
+    cache = CoursitoCache(str(tmp_path / "coursito.db"), ttl_seconds=60, max_bytes=10_000)
+    cache.put("abcdefghijk", result("lecture"))
+
+    clock[0] += 59
+    assert cache.get("abcdefghijk") == result("lecture")
+
+    clock[0] += 2
+    assert cache.get("abcdefghijk") is None
+    # The expired entry was removed, not just hidden
+    clock[0] -= 2
+    assert cache.get("abcdefghijk") is None
+
+
+def test_least_recently_used_entries_are_evicted_over_max_bytes(tmp_path, clock):
+    entry_bytes = len(cache_module.json.dumps(result("x" * 100)))
+    cache = CoursitoCache(str(tmp_path / "coursito.db"), ttl_seconds=3600, max_bytes=3 * entry_bytes)
+
+    for video_id in ("a" * 11, "b" * 11, "c" * 11):
+        cache.put(video_id, result("x" * 100))
+        clock[0] += 1
+    cache.get("a" * 11)  # "b" is now the least recently used
+    clock[0] += 1
+
+    cache.put("d" * 11, result("x" * 100))
+
+    assert cache.get("b" * 11) is None
+    assert all(cache.get(video_id * 11) is not None for video_id in "acd")
+
+    # A result larger than the whole cache is not stored and evicts nothing
+    cache.put("e" * 11, result("x" * 4 * entry_bytes))
+    assert cache.get("e" * 11) is None
+    assert all(cache.get(video_id * 11) is not None for video_id in "acd")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.schemas.coursitoagent import JobState
+from app.services.coursitoagent import CoursitoJobManager
+
+
+class StubAgent:
+    """Reports every stage, then returns a result (or raises) once released"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.release = threading.Event()
+        self.transcribing = threading.Event()
+
+    def process_youtube_url(self, url, progress_callback=None):
+        progress_callback("download", "completed", 1.0)
+        progress_callback("transcribe", "running", 0.5)
+        self.transcribing.set()
+        self.release.wait(timeout=5)
+        if self.error:
+            progress_callback("transcribe", "failed", 0.5)
+            raise self.error
+        progress_callback("transcribe", "completed", 1.0)
+        return {"transcript": f"transcript of {url}"}
+
+
+class CallbackReceiver(ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), CallbackHandler)
+        self.payloads = []
+        self.received = threading.Event()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/done"
+
+
+class CallbackHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.server.payloads.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+        self.send_response(204)
+        self.end_headers()
+        self.server.received.set()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def receiver():
+    server = CallbackReceiver()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def stages(job):
+    return {stage["name"]: (stage["status"], stage["progress"]) for stage in job["stages"]}
+
+
+def test_job_reports_progress_and_delivers_its_callback(receiver):
+    agent = StubAgent()
+    manager = CoursitoJobManager(max_workers=1, agent=agent)
+
+    job = manager.submit("https://youtu.be/abcdefghijk", callback_url=receiver.url)
+    assert job["status"] in (JobState.QUEUED, JobState.RUNNING)
+
+    assert agent.transcribing.wait(timeout=5)
+    running = manager.get(job["id"])
+    assert running["status"] == JobState.RUNNING
+    assert stages(running)["download"] == (JobState.COMPLETED, 1.0)
+    assert stages(running)["transcribe"] == (JobState.RUNNING, 0.5)
+    # Snapshots are copies
+    running["stages"][0]["status"] = JobState.FAILED
+    assert manager.get(job["id"])["stages"][0]["status"] == JobState.COMPLETED
+
+    agent.release.set()
+    assert manager.future(job["id"]).result(timeout=5) == {"transcript": "transcript of https://youtu.be/abcdefghijk"}
+    finished = manager.get(job["id"])
+    assert finished["status"] == JobState.COMPLETED
+    assert finished["result"]["transcript"].startswith("transcript of")
+
+    assert receiver.received.wait(timeout=5)
+    assert receiver.payloads[0]["id"] == job["id"]
+    assert receiver.payloads[0]["status"] == JobState.COMPLETED.value
+    manager.shutdown()
+
+
+def test_failed_job_records_the_error(receiver):
+    agent = StubAgent(error=RuntimeError("Failed to download audio"))
+    agent.release.set()
+    manager = CoursitoJobManager(max_workers=1, agent=agent)
+
+    job = manager.submit("https://youtu.be/abcdefghijk", callback_url=receiver.url)
+    with pytest.raises(RuntimeError):
+        manager.future(job["id"]).result(timeout=5)
+
+    failed = manager.get(job["id"])
+    assert (failed["status"], failed["error"]) == (JobState.FAILED, "Failed to download audio")
+    assert stages(failed)["transcribe"] == (JobState.FAILED, 0.5)
+    assert failed["finished_at"] is not None
+    assert receiver.received.wait(timeout=5)
+    assert receiver.payloads[0]["error"] == "Failed to download audio"
+    manager.shutdown()
+
+
+def test_finished_jobs_are_pruned_after_their_ttl():
+    agent = StubAgent()
+    agent.release.set()
+
+    kept = CoursitoJobManager(max_workers=1, job_ttl_seconds=3600, agent=agent)
+    first = kept.submit("https://youtu.be/abcdefghijk")
+    kept.future(first["id"]).result(timeout=5)
+    kept.submit("https://youtu.be/bcdefghijkl")
+    assert kept.get(first["id"]) is not None
+
+    pruned = CoursitoJobManager(max_workers=1, job_ttl_seconds=0, agent=agent)
+    first = pruned.submit("https://youtu.be/abcdefghijk")
+    pruned.future(first["id"]).result(timeout=5)
+    second = pruned.submit("https://youtu.be/bcdefghijkl")
+    assert pruned.get(first["id"]) is None
+    with pytest.raises(KeyError):
+        pruned.future(first["id"])
+    assert pruned.get(second["id"]) is not None
+
+    assert pruned.get("unknown") is None
+    kept.shutdown(wait=True)
+    pruned.shutdown(wait=True)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+import io
+import time
+import threading
+
+import pytest
+
+from app.core import coursitoagent
+from app.core.coursitoagent import CoursitoAgent
+from test_coursitoagent_audio import FRAME_LENGTH, make_mp3
+
+# Chunks of ten frames
+CHUNK_MB = 10 * FRAME_LENGTH / (1024 * 1024)
+
+
+class FakeProcess:
+    """Stands in for the yt-dlp and ffmpeg processes of stream_audio_chunks"""
+
+    def __init__(self, command, stdout=None, stdin=None, stderr=None):
+        self.program = command[0]
+        spec = self.specs[self.program]
+        if isinstance(spec, Exception):
+            raise spec
+        self.returncode, output, errors = spec
+        self.stdout = io.BytesIO(output)
+        stderr.write(errors)
+        self.killed = False
+        self.waited = False
+        self.started.append(self)
+
+    def kill(self):
+        self.killed = True
+
+    def wait(self):
+        self.waited = True
+        return -9 if self.killed else self.returncode
+
+
+@pytest.fixture
+def fake_processes(monkeypatch):
+    class Processes(FakeProcess):
+        started = []
+        specs = {
+            "yt-dlp": (0, b"", b""),
+            "ffmpeg": (0, make_mp3(num_frames=35), b""),
+        }
+
+    monkeypatch.setattr(coursitoagent.subprocess, "Popen", Processes)
+    return Processes
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    return CoursitoAgent(streaming_download=True)
+
+
+def test_stream_audio_chunks_cuts_the_converted_stream(agent, fake_processes, tmp_path):
+    chunks = list(agent.stream_audio_chunks("https://youtu.be/abcdefghijk", str(tmp_path), max_size_mb=CHUNK_MB))
+
+    assert [path.rsplit("_", 1)[-1] for path in chunks] == ["1.mp3", "2.mp3", "3.mp3", "4.mp3"]
+    assert [p.program for p in fake_processes.started] == ["yt-dlp", "ffmpeg"]
+    assert all(p.waited and not p.killed for p in fake_processes.started)
+
+
+def test_stream_audio_chunks_reports_download_errors(agent, fake_processes, tmp_path):
+    fake_processes.specs["yt-dlp"] = (1, b"", b"ERROR: Video unavailable")
+
+    with pytest.raises(RuntimeError, match="Video unavailable"):
+        list(agent.stream_audio_chunks("https://youtu.be/abcdefghijk", str(tmp_path), max_size_mb=CHUNK_MB))
+
+
+def test_stream_audio_chunks_kills_the_processes_on_error(agent, fake_processes, tmp_path):
+    chunks = agent.stream_audio_chunks("https://youtu.be/abcdefghijk", str(tmp_path), max_size_mb=CHUNK_MB)
+    next(chunks)
+    with pytest.raises(ValueError):
+        chunks.throw(ValueError("transcription failed"))
+    assert all(p.killed and p.waited for p in fake_processes.started)
+
+    # ffmpeg cannot be started; yt-dlp is already running
+    fake_processes.started.clear()
+    fake_processes.specs["ffmpeg"] = FileNotFoundError("ffmpeg")
+    with pytest.raises(FileNotFoundError):
+        list(agent.stream_audio_chunks("https://youtu.be/abcdefghijk", str(tmp_path), max_size_mb=CHUNK_MB))
+    assert [(p.program, p.killed, p.waited) for p in fake_processes.started] == [("yt-dlp", True, True)]
+
+
+def test_streaming_pipeline_overlaps_stages_and_reports_timings(agent, fake_processes, monkeypatch):
+    real_stream = agent.stream_audio_chunks
+    monkeypatch.setattr(agent, "stream_audio_chunks", lambda url, output_dir: real_stream(url, output_dir, CHUNK_MB))
+    # The duration probe must not hold up the download: it only answers once transcription has started
+    transcribing, probed = threading.Event(), threading.Event()
+
+    def estimate_chunk_count(url):
+        assert transcribing.wait(timeout=5)
+        probed.set()
+        return 8
+
+    def transcribe(path):
+        transcribing.set()
+        assert probed.wait(timeout=5)
+        time.sleep(0.01)  # Lets the probe's future resolve
+        return path.rsplit("_", 1)[-1][:-len(".mp3")]
+
+    monkeypatch.setattr(agent, "estimate_chunk_count", estimate_chunk_count)
+    monkeypatch.setattr(agent, "_transcribe_single_file", transcribe)
+
+    # Notes and questions each wait for the other, so they only finish if they run at the same time
+    both_running = threading.Barrier(2, timeout=5)
+
+    def generate(result):
+        def stage(transcript):
+            both_running.wait()
+            time.sleep(0.05)
+            return result(transcript)
+        return stage
+
+    monkeypatch.setattr(agent, "generate_notes_and_flashcards", generate(lambda t: {"notes": [t], "flashcards": []}))
+    monkeypatch.setattr(agent, "generate_question_bank", generate(lambda t: [{"question": t}]))
+
+    updates = []
+    result = agent.process_youtube_url(
+        "https://www.youtube.com/watch?v=abcdefghijk&list=PL1",
+        progress_callback=lambda stage, status, progress: updates.append((stage, status, progress)),
+    )
+
+    assert result["transcript"] == "1 2 3 4"
+    assert result["notes"] == ["1 2 3 4"] and result["questions"] == [{"question": "1 2 3 4"}]
+    assert set(result["timings"]) == {"download", "transcribe", "notes", "questions", "total"}
+    assert result["timings"]["notes"] >= 0.05 and result["timings"]["questions"] >= 0.05
+
+    # Progress is measured against the estimate until the real number of chunks is known
+    progress = [progress for stage, status, progress in updates if (stage, status) == ("transcribe", "running")]
+    assert progress[0] == 0.0 and min(progress[1:]) == 1 / 8
+    assert ("transcribe", "completed", 1.0) in updates
+
+
+def test_estimate_chunk_count_uses_the_reported_duration(agent, monkeypatch):
+    def run(command, **kwargs):
+        assert command[-1] == "https://youtu.be/abcdefghijk"
+        return coursitoagent.subprocess.CompletedProcess(command, 0, stdout="1800\n", stderr="")
+
+    monkeypatch.setattr(coursitoagent.subprocess, "run", run)
+    # Half an hour at about 245 kbps is about 55 MB
+    assert agent.estimate_chunk_count("https://youtu.be/abcdefghijk") == 3
+
+    def missing(command, **kwargs):
+        raise FileNotFoundError(command[0])
+
+    monkeypatch.setattr(coursitoagent.subprocess, "run", missing)
+    assert agent.estimate_chunk_count("https://youtu.be/abcdefghijk") is None
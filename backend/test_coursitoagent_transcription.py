@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import re
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.coursitoagent import CoursitoAgent
+from app.core.openai_client import reset_openai_clients
+
+
+class StubTranscriptionServer(ThreadingHTTPServer):
+    """Local stand-in for the OpenAI transcription endpoint"""
+
+    def __init__(self, delay=0.2, fail_once=()):
+        super().__init__(("127.0.0.1", 0), StubTranscriptionHandler)
+        self.delay = delay
+        self.fail_once = set(fail_once)  # Chunk numbers whose first request fails
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+
+class StubTranscriptionHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        chunk_number = int(re.search(rb'filename="audio_chunk_(\d+)\.mp3"', body).group(1))
+
+        server = self.server
+        with server.lock:
+            server.requests.append(chunk_number)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            should_fail = chunk_number in server.fail_once
+            server.fail_once.discard(chunk_number)
+
+        time.sleep(server.delay)
+
+        with server.lock:
+            server.in_flight -= 1
+
+        if should_fail:
+            payload, status, content_type = b'{"error": {"message": "overloaded"}}', 503, "application/json"
+        else:
+            payload, status, content_type = f"text of chunk {chunk_number}".encode(), 200, "text/plain"
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if should_fail:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    servers = []
+
+    def start(**kwargs):
+        server = StubTranscriptionServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+        reset_openai_clients()
+        return server
+
+    yield start
+
+    reset_openai_clients()
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def chunk_files(tmp_path):
+    paths = []
+    for i in range(1, 7):
+        path = tmp_path / f"audio_chunk_{i}.mp3"
+        path.write_bytes(b"\xff\xfb" + bytes(64))
+        paths.append(str(path))
+    return paths
+
+
+def test_transcribe_chunks_runs_concurrently_and_preserves_order(stub_server, chunk_files):
+    server = stub_server(delay=0.2)
+    agent = CoursitoAgent(transcribe_concurrency=3)
+
+    start = time.time()
+    transcripts = agent.transcribe_chunks(chunk_files)
+    elapsed = time.time() - start
+
+    assert transcripts == [f"text of chunk {i}" for i in range(1, 7)]
+    assert server.max_in_flight == 3
+    # Six 0.2s requests, three at a time, should take about two round-trips rather than six
+    assert elapsed < 6 * 0.2
+
+
+def test_transcribe_chunks_retries_only_the_failed_chunk(stub_server, chunk_files):
+    server = stub_server(delay=0.0, fail_once={4})
+    agent = CoursitoAgent(transcribe_concurrency=2)
+    progress = []
+
+    transcripts = agent.transcribe_chunks(chunk_files, lambda stage, status, value: progress.append(value))
+
+    assert transcripts == [f"text of chunk {i}" for i in range(1, 7)]
+    assert sorted(server.requests) == [1, 2, 3, 4, 4, 5, 6]
+    assert progress[-1] == 1.0
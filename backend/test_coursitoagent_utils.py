@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import pytest
+
+from app.utils.coursitoagent import (
+    canonical_video_url,
+    extract_video_id,
+    merge_notes_and_flashcards,
+    merge_question_banks,
+    split_transcript,
+)
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=PHe0bXAIuk0",
+    "https://www.youtube.com/watch?list=PL123&v=PHe0bXAIuk0&index=2&t=90s",
+    "https://m.youtube.com/watch?v=PHe0bXAIuk0&feature=share",
+    "  https://youtu.be/PHe0bXAIuk0?t=42  ",
+    "https://www.youtube.com/shorts/PHe0bXAIuk0",
+    "https://www.youtube-nocookie.com/embed/PHe0bXAIuk0?start=10",
+    "https://youtube.com/live/PHe0bXAIuk0",
+])
+def test_extract_video_id(url):
+    assert extract_video_id(url) == "PHe0bXAIuk0"
+    assert canonical_video_url(extract_video_id(url)) == "https://www.youtube.com/watch?v=PHe0bXAIuk0"
+
+
+@pytest.mark.parametrize("url", [
+    "",
+    "not a url",
+    "https://www.youtube.com/",
+    "https://www.youtube.com/watch?list=PL123",
+    "https://www.youtube.com/watch?v=short",
+    "https://www.youtube.com/playlist?list=PL123",
+    "https://youtu.be/",
+    "https://vimeo.com/watch?v=PHe0bXAIuk0",
+    "https://www.youtube.com.evil.example/watch?v=PHe0bXAIuk0",
+])
+def test_extract_video_id_rejects_other_urls(url):
+    assert extract_video_id(url) is None
+
+
+def test_split_transcript_cuts_between_sentences():
+    transcript = "First point. Second point here! Is this third? Fourth."
+    segments = split_transcript(transcript, max_chars=30)
+
+    assert segments == ["First point.", "Second point here!", "Is this third? Fourth."]
+    assert all(len(segment) <= 30 for segment in segments)
+    # A segment that exactly fills max_chars is kept whole
+    assert split_transcript("Twelve char. Twelve char.", max_chars=25) == ["Twelve char. Twelve char."]
+    assert split_transcript("Twelve char. Twelve char.", max_chars=24) == ["Twelve char.", "Twelve char."]
+
+
+def test_split_transcript_cuts_unpunctuated_text_on_whitespace():
+    transcript = "Intro. " + " ".join(["word"] * 20)
+    segments = split_transcript(transcript, max_chars=22)
+
+    assert segments[0] == "Intro."
+    assert all(len(segment) <= 22 for segment in segments)
+    assert " ".join(segments) == transcript
+    assert split_transcript("x" * 25, max_chars=10) == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_merge_notes_dedupes_by_normalized_text():
+    merged = merge_notes_and_flashcards([
+        {
+            "notes": [{"title": "Supply and Demand", "content": "Prices rise when demand grows."}],
+            "flashcards": [{"question": "What is GDP?", "answer": "Output"}],
+        },
+        {
+            "notes": [
+                {"title": "SUPPLY and demand!", "content": "prices rise when demand grows"},
+                {"title": "Supply and demand", "content": "Shortages raise prices."},
+                {"title": "Inflation", "content": "Money loses value."},
+            ],
+            "flashcards": [{"question": "what is  GDP", "answer": "Output again"}, {"question": "What is CPI?", "answer": "Prices"}],
+        },
+    ])
+
+    assert merged["notes"] == [
+        {"title": "Supply and Demand", "content": "Prices rise when demand grows.\n\nShortages raise prices."},
+        {"title": "Inflation", "content": "Money loses value."},
+    ]
+    assert [card["answer"] for card in merged["flashcards"]] == ["Output", "Prices"]
+
+
+def test_merge_question_banks_dedupes_and_renumbers():
+    banks = [
+        [{"id": 1, "question": "What is debt?"}, {"id": 2, "question": "What is credit?"}],
+        [{"id": 1, "question": "WHAT is credit"}, {"id": 2, "question": "What is a cycle?"}],
+        [{"question": "Why do cycles end?"}],
+    ]
+
+    merged = merge_question_banks(banks)
+
+    assert [(q.get("id"), q["question"]) for q in merged] == [
+        (1, "What is debt?"), (2, "What is credit?"), (3, "What is a cycle?"), (None, "Why do cycles end?"),
+    ]
+    assert banks[1][1]["id"] == 2  # The segment results are left untouched
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import threading
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.core import embedding_batcher
+from app.core.embedding_batcher import EmbeddingBatcher, RateLimitBudget, pack_batches
+from app.core.retry import RetryPolicy
+from app.utils.tokens import get_encoding
+
+
+def test_pack_batches_respects_token_and_input_limits():
+    assert pack_batches([40, 40, 40, 90, 10], max_tokens=100, max_inputs=10) == [[0, 1], [2], [3, 4]]
+    assert pack_batches([1] * 5, max_tokens=100, max_inputs=2) == [[0, 1], [2, 3], [4]]
+    assert pack_batches([500, 1], max_tokens=100) == [[0], [1]]
+
+
+def test_budget_waits_for_the_window_to_free_up():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    budget = RateLimitBudget(tokens_per_minute=100, requests_per_minute=10, clock=lambda: now[0], sleep=sleep)
+    budget.acquire(60)
+    now[0] = 5.0
+    budget.acquire(60)  # Would exceed 100 tokens per minute until the first request leaves the window
+
+    assert sleeps == [55.0]
+
+
+class FlakyEmbeddingsAPI:
+    """Fails the first request containing "b" with a 429"""
+
+    def __init__(self):
+        self.inputs = []
+        self.rate_limited = False
+        self.lock = threading.Lock()
+
+    def create(self, model, input):
+        with self.lock:
+            self.inputs.append(list(input))
+            if "b" in input and not self.rate_limited:
+                self.rate_limited = True
+                request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+                response = httpx.Response(429, headers={"retry-after": "0"}, request=request)
+                raise openai.RateLimitError("Rate limit reached", response=response, body=None)
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=[float(ord(t[0]))]) for i, t in enumerate(input)])
+
+
+def test_rate_limited_batch_is_retried_alone_with_lower_concurrency(monkeypatch):
+    api = FlakyEmbeddingsAPI()
+    monkeypatch.setattr(embedding_batcher, "get_openai_client", lambda: SimpleNamespace(embeddings=api))
+    batcher = EmbeddingBatcher(
+        "m", max_concurrency=4, max_tokens_per_request=1, policy=RetryPolicy(base_delay=0.0, jitter=False)
+    )
+    reported = []
+
+    embeddings = batcher.embed(["a", "b", "c", "d"], on_batch=lambda texts, vectors: reported.extend(texts))
+
+    assert embeddings == [[97.0], [98.0], [99.0], [100.0]]
+    assert sorted(reported) == ["a", "b", "c", "d"]
+    assert sorted(map(tuple, api.inputs)) == [("a",), ("b",), ("b",), ("c",), ("d",)]
+    assert batcher.concurrency.limit == 1
+
+
+class RecordingEmbeddingsAPI:
+    def __init__(self):
+        self.inputs = []
+        self.lock = threading.Lock()
+
+    def create(self, model, input):
+        with self.lock:
+            self.inputs.append(list(input))
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=[0.0]) for i, _ in enumerate(input)])
+
+
+@pytest.mark.skipif(get_encoding() is None, reason="tiktoken with the cl100k_base encoding is not available")
+def test_requests_are_packed_by_tokenizer_counts(monkeypatch):
+    api = RecordingEmbeddingsAPI()
+    monkeypatch.setattr(embedding_batcher, "get_openai_client", lambda: SimpleNamespace(embeddings=api))
+    batcher = EmbeddingBatcher("m", max_concurrency=1, max_tokens_per_request=4)
+
+    # "hello world" is 2 tokens; the bytes/4 estimate (3) would send each text on its own
+    batcher.embed(["hello world"] * 6)
+
+    assert [len(batch) for batch in api.inputs] == [2, 2, 2]
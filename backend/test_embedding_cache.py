@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import sqlite3
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.core import embeddings, embedding_batcher, embedding_cache
+from app.core.embedding_cache import EmbeddingCache, text_hash
+
+
+class FakeEmbeddingsAPI:
+    def __init__(self):
+        self.inputs = []
+
+    def create(self, model, input):
+        self.inputs.append(list(input))
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=[float(len(text)), 0.5]) for i, text in enumerate(input)
+        ])
+
+
+def test_embed_texts_only_sends_uncached_texts(tmp_path, monkeypatch):
+    api = FakeEmbeddingsAPI()
+    monkeypatch.setattr(embedding_batcher, "get_openai_client", lambda: SimpleNamespace(embeddings=api))
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"))
+
+    first = embeddings.embed_texts(["focus", "rest"], model="m", cache=cache)
+    second = embeddings.embed_texts(["rest", "say no", "focus"], model="m", cache=cache)
+
+    assert first == [[5.0, 0.5], [4.0, 0.5]]
+    assert second == [[4.0, 0.5], [6.0, 0.5], [5.0, 0.5]]
+    assert api.inputs == [["focus", "rest"], ["say no"]]
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 3, 3)
+
+
+def test_cache_is_keyed_by_model_and_persists(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    EmbeddingCache(path).put_many("small", ["focus"], [[0.25, 0.75]])
+
+    reopened = EmbeddingCache(path)
+    assert reopened.get_many("small", ["focus"]) == [[0.25, 0.75]]
+    assert reopened.get_many("large", ["focus"]) == [None]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(embedding_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), max_entries=2)
+
+    cache.put_many("m", ["focus"], [[1.0]])
+    clock.now = 100
+    cache.put_many("m", ["rest"], [[2.0]])
+    clock.now = 200
+    assert cache.get_many("m", ["focus"]) == [[1.0]]  # "rest" is now the least recently used
+    clock.now = 300
+    cache.put_many("m", ["say no"], [[3.0]])
+
+    assert cache.get_many("m", ["focus", "rest", "say no"]) == [[1.0], None, [3.0]]
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"], stats["max_entries"]) == (2, 1, 2)
+
+
+def test_caches_written_before_eviction_are_upgraded(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE embeddings (model TEXT NOT NULL, text_hash BLOB NOT NULL, vector BLOB NOT NULL, "
+        "created_at REAL NOT NULL, PRIMARY KEY (model, text_hash)) WITHOUT ROWID"
+    )
+    conn.execute("INSERT INTO embeddings VALUES (?, ?, ?, ?)", ("m", text_hash("focus"), np.float32([0.5]).tobytes(), 1.0))
+    conn.commit()
+    conn.close()
+
+    cache = EmbeddingCache(path, max_entries=1)
+    assert cache.stats()["entries"] == 1
+    # The old entry counts as last used when it was created
+    cache.put_many("m", ["rest"], [[2.0]])
+    assert cache.get_many("m", ["focus", "rest"]) == [None, [2.0]]
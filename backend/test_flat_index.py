@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+import json
+
+import numpy as np
+import pytest
+
+from app.core import vectorstore
+from app.core.embedding_store import EmbeddingStore, convert_json_to_store
+from app.core.flat_index import FlatIndex
+from app.core.vectorstore import VectorStoreRegistry
+
+
+@pytest.fixture
+def chunks():
+    rng = np.random.default_rng(0)
+    return [
+        {
+            "id": f"book{i % 3}_{i}",
+            "content": f"chunk {i}",
+            "book_title": f"Book {i % 3}",
+            "chunk_index": i,
+            "total_chunks": 200,
+            "embedding": rng.normal(size=32).tolist(),
+        }
+        for i in range(200)
+    ]
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_search_matches_brute_force(chunks, dtype):
+    index = FlatIndex.from_chunks(chunks, dtype=dtype)
+    queries = np.random.default_rng(1).normal(size=(4, 32))
+
+    indices, similarities = index.search(queries, top_k=5)
+
+    matrix = np.array([c["embedding"] for c in chunks])
+    expected = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ (matrix / np.linalg.norm(matrix, axis=1, keepdims=True)).T
+    assert indices.shape == (4, 5)
+    assert (indices == np.argsort(-expected, axis=1)[:, :5]).all()
+    assert np.allclose(similarities, np.sort(expected, axis=1)[:, ::-1][:, :5], atol=1e-2 if dtype == "float16" else 1e-5)
+
+
+def test_flat_backend_returns_rag_query_shape(chunks, tmp_path, monkeypatch):
+    path = tmp_path / "chunks_with_embeddings.json"
+    path.write_text(json.dumps({chunk["id"]: chunk for chunk in chunks}))
+    monkeypatch.setattr(vectorstore, "vector_stores", VectorStoreRegistry("flat"))
+
+    results = vectorstore.search_book_chunks_batch(
+        ["first", "second"], [chunks[7]["embedding"], chunks[8]["embedding"]], top_k=3, db_path=str(tmp_path)
+    )
+
+    assert [r["query"] for r in results] == ["first", "second"]
+    best = results[0]["sources"]["Book 1"][0]
+    assert best["content"] == "chunk 7"
+    assert best["relevance"] == pytest.approx(1.0)
+    assert sum(len(c) for c in results[1]["sources"].values()) == 3
+    assert len(results[1]["raw_results"]["documents"]) == 1
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_memory_mapped_store_matches_json_index(chunks, tmp_path, dtype):
+    json_path = tmp_path / "chunks_with_embeddings.json"
+    json_path.write_text(json.dumps(chunks))
+    store_path = tmp_path / "embedding_store"
+
+    assert convert_json_to_store(str(json_path), str(store_path), dtype=dtype) == len(chunks)
+
+    store = EmbeddingStore(str(store_path))
+    assert isinstance(store.embeddings, np.memmap)
+    assert store.record(42)["content"] == "chunk 42"
+
+    queries = [chunks[5]["embedding"], chunks[150]["embedding"]]
+    from_store = FlatIndex.from_store(store).query(queries, n_results=4)
+    from_json = FlatIndex.from_json(str(json_path)).query(queries, n_results=4)
+
+    assert from_store["ids"] == from_json["ids"]
+    assert from_store["metadatas"] == from_json["metadatas"]
+    assert from_store["documents"][0][0] == "chunk 5"
+    store.close()
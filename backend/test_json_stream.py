@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+import json
+
+import pytest
+
+from app.utils.json_stream import IncrementalObjectParser
+
+
+def test_yields_members_as_soon_as_they_complete():
+    document = json.dumps({
+        "summary": "Say \"no\", {often}",
+        "checklist": {"items": [{"id": "1", "text": "a, b"}]},
+        "book_insights": {"Book": ["x]"]},
+    })
+    parser = IncrementalObjectParser()
+
+    seen = []
+    for i in range(0, len(document), 3):
+        for key, value in parser.feed(document[i:i + 3]):
+            seen.append((key, i))
+
+    assert [key for key, _ in seen] == ["summary", "checklist", "book_insights"]
+    # The summary is available well before the whole document has been fed
+    assert seen[0][1] < len(document) // 3
+    assert parser.done
+
+
+def test_rejects_non_objects():
+    with pytest.raises(ValueError):
+        IncrementalObjectParser().feed('["summary"]')
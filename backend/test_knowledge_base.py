@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+import threading
+
+import numpy as np
+import pytest
+
+from app.core.embedding_store import EmbeddingStore
+from app.services.chunking import iter_book_chunks
+from app.services.knowledge_base import KnowledgeBaseIndexer
+
+
+def make_chunks(book_title, texts):
+    return [
+        {"book_title": book_title, "chunk_index": i, "total_chunks": len(texts), "content": text}
+        for i, text in enumerate(texts)
+    ]
+
+
+def fake_embed(calls):
+    def embed(texts, model):
+        calls.append(list(texts))
+        return [[float(len(text)), float(sum(map(ord, text)) % 97), 1.0] for text in texts]
+    return embed
+
+
+def test_only_new_and_changed_chunks_are_embedded(tmp_path):
+    calls = []
+    indexer = KnowledgeBaseIndexer(
+        str(tmp_path / "manifest.json"), store_path=str(tmp_path / "store"), embed_fn=fake_embed(calls)
+    )
+    deep_work = make_chunks("Deep Work", ["focus", "schedule", "rest"])
+    essentialism = make_chunks("Essentialism", ["say no", "trade-offs"])
+
+    assert indexer.run(deep_work + essentialism) == {"added": 5, "changed": 0, "unchanged": 0, "removed": 0}
+
+    # Edit one Deep Work chunk, delete Essentialism and add a new book
+    deep_work[1]["content"] = "schedule every minute"
+    atomic_habits = make_chunks("Atomic Habits", ["1% better"])
+    stats = indexer.run(deep_work + atomic_habits)
+
+    assert stats == {"added": 1, "changed": 1, "unchanged": 2, "removed": 2}
+    assert calls[1] == ["schedule every minute", "1% better"]
+
+    store = EmbeddingStore(str(tmp_path / "store"))
+    assert list(store.documents) == ["focus", "schedule every minute", "rest", "1% better"]
+    expected = np.array(fake_embed([])(["rest"], None)[0])
+    assert np.allclose(store.embeddings[2], expected / np.linalg.norm(expected))
+    store.close()
+
+    assert indexer.run(deep_work + atomic_habits)["unchanged"] == 4
+    assert len(calls) == 2
+
+
+def test_removing_the_last_book_empties_the_store(tmp_path):
+    indexer = KnowledgeBaseIndexer(str(tmp_path / "manifest.json"), store_path=str(tmp_path / "store"), embed_fn=fake_embed([]))
+    indexer.run(make_chunks("Deep Work", ["focus", "rest"]))
+
+    assert indexer.run([]) == {"added": 0, "changed": 0, "unchanged": 0, "removed": 2}
+    store = EmbeddingStore(str(tmp_path / "store"))
+    assert len(store) == 0 and list(store.documents) == []
+    store.close()
+
+
+def test_batches_are_embedded_concurrently_and_written_in_order(tmp_path):
+    # Every embedding call waits for a second one, so the run only finishes if two are in flight at once
+    both_embedding = threading.Barrier(2, timeout=5)
+    embed = fake_embed([])
+
+    def paired_embed(texts, model):
+        both_embedding.wait()
+        return embed(texts, model)
+
+    indexer = KnowledgeBaseIndexer(
+        str(tmp_path / "manifest.json"), store_path=str(tmp_path / "store"), embed_fn=paired_embed,
+        batch_size=2, embed_workers=2,
+    )
+    texts = [f"point {i}" for i in range(8)]
+    assert indexer.run(make_chunks("Deep Work", texts))["added"] == 8
+
+    store = EmbeddingStore(str(tmp_path / "store"))
+    assert list(store.documents) == texts
+    store.close()
+
+
+class FakeCollection:
+    def __init__(self):
+        self.rows = {}
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.rows.update(zip(ids, documents))
+
+    def delete(self, ids):
+        for cid in ids:
+            self.rows.pop(cid, None)
+
+
+def test_interrupted_run_resumes_from_upserted_batches(tmp_path, monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(KnowledgeBaseIndexer, "_open_collection", lambda self: collection)
+    calls = []
+    embed = fake_embed(calls)
+
+    def flaky_embed(texts, model):
+        if len(calls) == 2:
+            raise RuntimeError("connection reset")
+        return embed(texts, model)
+
+    summaries = tmp_path / "summaries"
+    summaries.mkdir()
+    for title in ["Deep Work", "Essentialism", "Atomic Habits"]:
+        (summaries / f"{title}.md").write_text(" ".join(f"{title} point {i}." for i in range(40)))
+
+    def make_indexer(embed_fn):
+        return KnowledgeBaseIndexer(
+            str(tmp_path / "manifest.json"), chroma_path=str(tmp_path / "chroma"), embed_fn=embed_fn, batch_size=2,
+            embed_workers=1,
+        )
+
+    def chunks():
+        return iter_book_chunks(str(summaries), max_tokens=60, overlap_tokens=10)
+
+    total = len(list(chunks()))
+    assert total > 4
+
+    with pytest.raises(RuntimeError):
+        make_indexer(flaky_embed).run(chunks())
+    assert len(collection.rows) == 4
+
+    # The second run only embeds what the first one did not get to
+    calls.clear()
+    stats = make_indexer(embed).run(chunks())
+    assert stats == {"added": total - 4, "changed": 0, "unchanged": 4, "removed": 0}
+    assert sum(len(batch) for batch in calls) == total - 4
+    assert len(collection.rows) == total
+    assert not (tmp_path / "manifest.json.journal").exists()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.core import retry
+from app.core.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retry, retry_after_seconds
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def status_error(status_code, headers=None):
+    response = httpx.Response(status_code, headers=headers or {}, request=REQUEST)
+    return openai.APIStatusError(f"status {status_code}", response=response, body=None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock; sleeping advances it instead of blocking"""
+    fake = SimpleNamespace(now=0.0, sleeps=[])
+
+    def sleep(seconds):
+        fake.sleeps.append(seconds)
+        fake.now += seconds
+
+    monkeypatch.setattr(retry, "time", SimpleNamespace(monotonic=lambda: fake.now, sleep=sleep))
+    return fake
+
+
+def failing(*errors, result="ok"):
+    """A callable raising each error in turn, then returning result"""
+    calls = []
+
+    def func():
+        calls.append(len(calls))
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    func.calls = calls
+    return func
+
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 10
+    assert breaker.state == "half-open"
+    breaker.before_call()  # The single trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # A failed trial re-opens the circuit for another reset_timeout
+    breaker.record_failure()
+    clock.now += 9
+    assert breaker.state == "open"
+    clock.now += 1
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_upstream_outages_trip_the_breaker_but_client_errors_do_not(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10)
+    policy = RetryPolicy(max_attempts=1)
+
+    for _ in range(3):
+        with pytest.raises(openai.APIStatusError):
+            call_with_retry(failing(status_error(400)), policy=policy, breaker=breaker)
+    assert breaker.state == "closed"
+
+    for _ in range(2):
+        with pytest.raises(openai.APIStatusError):
+            call_with_retry(failing(status_error(503)), policy=policy, breaker=breaker)
+    func = failing()
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(func, policy=policy, breaker=breaker)
+    assert func.calls == []
+
+
+def test_retries_with_backoff_until_success(clock):
+    func = failing(status_error(500), openai.APIConnectionError(request=REQUEST))
+
+    assert call_with_retry(func, policy=RetryPolicy(max_attempts=3, base_delay=1.0, jitter=False)) == "ok"
+    assert clock.sleeps == [1.0, 2.0]
+
+
+def test_client_errors_are_not_retried(clock):
+    for status_code in (400, 401, 404, 422):
+        func = failing(status_error(status_code))
+        with pytest.raises(openai.APIStatusError):
+            call_with_retry(func, policy=RetryPolicy(max_attempts=5))
+        assert len(func.calls) == 1
+    assert clock.sleeps == []
+
+
+def test_gives_up_when_the_time_budget_runs_out(clock):
+    func = failing(*[status_error(503)] * 10)
+    policy = RetryPolicy(max_attempts=10, base_delay=4.0, jitter=False, budget_seconds=10.0)
+
+    with pytest.raises(openai.APIStatusError):
+        call_with_retry(func, policy=policy)
+
+    # Waiting 8 more seconds after the first 4 would pass the 10 second budget
+    assert clock.sleeps == [4.0]
+    assert len(func.calls) == 2
+
+
+def test_retry_after_takes_precedence_over_backoff(clock):
+    func = failing(status_error(429, {"retry-after": "7"}), status_error(429, {"retry-after-ms": "1500"}))
+
+    assert call_with_retry(func, policy=RetryPolicy(max_attempts=3, base_delay=1.0, jitter=False)) == "ok"
+    assert clock.sleeps == [7.0, 1.5]
+
+
+def test_retry_after_accepts_an_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    delay = retry_after_seconds(status_error(503, {"retry-after": format_datetime(retry_at, usegmt=True)}))
+    assert 28.0 < delay <= 30.0
+
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(minutes=5), usegmt=True)
+    assert retry_after_seconds(status_error(503, {"retry-after": past})) == 0.0
+    assert retry_after_seconds(status_error(503, {"retry-after": "soon"})) is None
+    assert retry_after_seconds(status_error(503)) is None
+
+
+def test_cancelled_trial_call_releases_the_half_open_slot(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+
+    async def hang():
+        await asyncio.sleep(3600)
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(retry.acall_with_retry(hang, breaker=breaker))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+
+    # The next call is let through as the new trial instead of being rejected forever
+    assert breaker.state == "half-open"
+    assert call_with_retry(failing(), breaker=breaker) == "ok"
+    assert breaker.state == "closed"
+
+    # An interrupted synchronous trial is released the same way
+    breaker.record_failure()
+    clock.now += 10
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        call_with_retry(interrupted, breaker=breaker)
+    breaker.before_call()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+import numpy as np
+
+from app.core.semantic_cache import SemanticCache
+
+
+def unit(*components):
+    vector = np.zeros(4, dtype=np.float32)
+    vector[:len(components)] = components
+    return vector
+
+
+def test_matches_similar_queries_within_the_same_scope():
+    cache = SemanticCache(dimensions=4, max_entries=4, threshold=0.9, ttl_seconds=60)
+    cache.set("checklist", unit(1.0, 0.1), {"summary": "manage your time"})
+
+    value, similarity = cache.get("checklist", unit(1.0, 0.2))
+    assert value == {"summary": "manage your time"}
+    assert similarity > 0.9
+
+    assert cache.get("kanban", unit(1.0, 0.2)) is None  # Different formats or options
+    assert cache.get("checklist", unit(0.0, 1.0)) is None  # Unrelated query
+    assert cache.stats()["hits"] == 1
+
+
+def test_overwrites_least_recently_used_entry_when_full():
+    cache = SemanticCache(dimensions=4, max_entries=2, threshold=0.99, ttl_seconds=60)
+    cache.set("s", unit(1.0), "a")
+    cache.set("s", unit(0.0, 1.0), "b")
+    cache.get("s", unit(1.0))  # "b" is now the least recently used
+
+    cache.set("s", unit(0.0, 0.0, 1.0), "c")
+
+    assert cache.get("s", unit(1.0))[0] == "a"
+    assert cache.get("s", unit(0.0, 1.0)) is None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+import os
+import time
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert, inspect
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import timetunes as timetunes_api
+from app.db.database import Base, get_db
+from app.db.migrations import migrate
+from app.models import timetunes_models as models
+from app.crud import timetunes_crud as crud
+from app.crud.timetunes_rollups import rebuild_daily_rollups
+from app.schemas import timetunes_schemas as schemas
+
+START = datetime(2025, 1, 1)
+END = datetime(2025, 12, 31, 23, 59)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def seeded(db):
+    writing = models.Project(id="p1", name="Writing", color="#f00")
+    focus, admin = models.Tag(id="t1", name="focus"), models.Tag(id="t2", name="admin")
+    db.add_all([writing, focus, admin])
+    db.add_all([
+        models.TimeEntry(id="e1", start_time=datetime(2025, 3, 1, 9), duration=60.0, project=writing, tags=[focus]),
+        models.TimeEntry(id="e2", start_time=datetime(2025, 3, 1, 14), duration=30.0, project=writing, tags=[focus, admin]),
+        models.TimeEntry(id="e3", start_time=datetime(2025, 3, 2, 8), duration=120.0),
+        models.TimeEntry(id="e4", start_time=datetime(2025, 3, 3, 8), is_running=True),
+        # Outside the range
+        models.TimeEntry(id="e5", start_time=datetime(2024, 12, 31, 8), duration=500.0, project=writing),
+    ])
+    db.flush()
+    rebuild_daily_rollups(db)
+    db.commit()
+    return db
+
+
+def test_summary_aggregates_in_sql(seeded):
+    summary = crud.get_time_summary(seeded, START, END)
+    assert summary.total_entries == 4
+    assert summary.total_duration_minutes == 210.0
+    assert summary.average_entry_minutes == 70.0
+    assert (summary.shortest_entry_minutes, summary.longest_entry_minutes) == (30.0, 120.0)
+    assert summary.first_entry_date == datetime(2025, 3, 1, 9)
+    assert summary.last_entry_date == datetime(2025, 3, 3, 8)
+
+    assert crud.get_time_summary(seeded, START, END, project_id="p1").total_duration_minutes == 90.0
+    assert crud.get_time_summary(seeded, datetime(2030, 1, 1), datetime(2030, 2, 1)).total_entries == 0
+
+
+def test_grouped_by_project_tag_and_day(seeded):
+    projects = crud.get_time_by_project(seeded, START, END)
+    assert [(p.project_id, p.project_name, p.total_entries, p.total_duration_minutes) for p in projects] == [
+        ("unassigned", "Unassigned", 1, 120.0),
+        ("p1", "Writing", 2, 90.0),
+    ]
+    assert sum(p.percentage_of_total for p in projects) == pytest.approx(100.0)
+
+    # e2 is split evenly between its two tags
+    tags = {t.tag_id: (t.total_entries, t.total_duration_minutes) for t in crud.get_time_by_tag(seeded, START, END)}
+    assert tags == {"t1": (2, 75.0), "t2": (1, 15.0), "untagged": (1, 120.0)}
+
+    days = crud.get_time_by_day(seeded, START, END)
+    assert [(d.date, d.total_entries, d.total_duration_minutes, d.projects) for d in days] == [
+        (datetime(2025, 3, 1), 2, 90.0, {"p1": 90.0}),
+        (datetime(2025, 3, 2), 1, 120.0, {"unassigned": 120.0}),
+    ]
+
+
+def test_timezone_aware_bounds(seeded):
+    utc_start, utc_end = START.replace(tzinfo=timezone.utc), END.replace(tzinfo=timezone.utc)
+    assert crud.get_time_summary(seeded, utc_start, datetime.now()).total_entries == 4
+    assert crud.get_time_summary(seeded, utc_start, utc_end).total_duration_minutes == 210.0
+
+    # Entries keep their wall time and drop the offset, so aware bounds select by wall time too
+    plus5 = timezone(timedelta(hours=5))
+    for hour in (10, 20):
+        crud.create_time_entry(seeded, schemas.TimeEntryCreate(start_time=datetime(2025, 3, 5, hour, tzinfo=plus5), duration=10.0))
+    for end in (datetime(2025, 3, 5, 23, 59, 59, tzinfo=plus5), datetime.combine(datetime(2025, 3, 5), datetime.max.time(), plus5)):
+        start = datetime(2025, 3, 5, tzinfo=plus5)
+        listed = crud.get_time_entries(seeded, start_date=start, end_date=end)
+        summary = crud.get_time_summary(seeded, start, end)
+        assert len(listed) == summary.total_entries == 2
+        assert [(d.date.day, d.total_duration_minutes) for d in crud.get_time_by_day(seeded, start, end)] == [(5, 20.0)]
+
+
+def rollup_rows(db):
+    return (
+        sorted(tuple(row) for row in db.query(models.DailyProjectRollup.__table__).all()),
+        sorted(tuple(row) for row in db.query(models.DailyTagRollup.__table__).all()),
+    )
+
+
+def test_rollups_follow_entry_changes(seeded):
+    entry = crud.create_time_entry(seeded, schemas.TimeEntryCreate(
+        start_time=datetime(2025, 3, 2, 18), duration=15.0, project_id="p1", tag_ids=["t2"]
+    ))
+    crud.update_time_entry(seeded, "e1", schemas.TimeEntryUpdate(start_time=datetime(2025, 3, 4, 9), tag_ids=[]))
+    crud.delete_time_entry(seeded, "e3")
+    crud.delete_tag(seeded, "t1")
+
+    maintained = rollup_rows(seeded)
+    rebuild_daily_rollups(seeded)
+    assert rollup_rows(seeded) == maintained
+
+    # Whole days come from the rollup, the partial last day from time_entries
+    days = crud.get_time_by_day(seeded, START, datetime(2025, 3, 4, 12))
+    assert [(d.date.day, d.total_duration_minutes) for d in days] == [(1, 30.0), (2, 15.0), (4, 60.0)]
+    tags = {t.tag_id: t.total_duration_minutes for t in crud.get_time_by_tag(seeded, START, END)}
+    assert tags == {"t2": 45.0, "untagged": 60.0}
+    assert crud.get_time_summary(seeded, START, END, project_id="p1").total_entries == 3
+    assert entry.id in {e.id for e in crud.get_time_entries(seeded)}
+
+
+def api_client(db):
+    app = FastAPI()
+    app.include_router(timetunes_api.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+def test_cursor_pages_walk_every_entry_once(db):
+    # Several entries share a start time, so the id has to break ties
+    for i in range(25):
+        db.add(models.TimeEntry(id=f"e{i:02d}", start_time=datetime(2025, 5, 1 + i // 3, 9), duration=10.0))
+    db.commit()
+    client = api_client(db)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/timetunes/time-entries/", params=params)
+        assert response.status_code == 200
+        seen.extend(entry["id"] for entry in response.json())
+        cursor = response.headers.get(timetunes_api.NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    offset_pages = [client.get("/timetunes/time-entries/", params={"skip": skip, "limit": 10}).json() for skip in (0, 10, 20)]
+    assert seen == [entry["id"] for page in offset_pages for entry in page]
+    assert len(set(seen)) == 25
+
+    assert client.get("/timetunes/time-entries/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+# Entries seeded by the query plan benchmark; set TIMETUNES_BENCHMARK_ENTRIES=1000000 for the full run
+BENCHMARK_ENTRIES = int(os.getenv("TIMETUNES_BENCHMARK_ENTRIES", "20000"))
+
+
+def seed_entries(db, count):
+    rng = random.Random(7)
+    projects = [{"id": f"p{i}", "name": f"Project {i}"} for i in range(50)]
+    tags = [{"id": f"t{i}", "name": f"Tag {i}"} for i in range(20)]
+    db.execute(insert(models.Project), projects)
+    db.execute(insert(models.Tag), tags)
+    origin = datetime(2023, 1, 1)
+    for start in range(0, count, 50000):
+        entries, links = [], []
+        for i in range(start, min(start + 50000, count)):
+            entries.append({
+                "id": f"e{i}",
+                "start_time": origin + timedelta(minutes=rng.randrange(3 * 365 * 24 * 60)),
+                "duration": float(rng.randrange(5, 240)),
+                "project_id": rng.choice(projects)["id"] if rng.random() < 0.9 else None,
+            })
+            links.extend({"time_entry_id": f"e{i}", "tag_id": tag["id"]} for tag in rng.sample(tags, rng.randrange(3)))
+        db.execute(insert(models.TimeEntry), entries)
+        db.execute(insert(models.time_entry_tags), links)
+    db.commit()
+
+
+def query_plans(db, operation):
+    """Run operation and return the SQLite query plan of every SELECT it issued, with its duration"""
+    statements = []
+    engine = db.get_bind()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    started = time.perf_counter()
+    try:
+        operation()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    elapsed = time.perf_counter() - started
+
+    plans = [
+        " | ".join(row[-1] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+        for statement, parameters in statements
+    ]
+    return plans, elapsed
+
+
+def test_entry_pages_load_relations_in_bounded_queries(db):
+    seed_entries(db, 200)
+    db.expire_all()
+    client = api_client(db)
+
+    def selects_for(request):
+        plans, _ = query_plans(db, request)
+        return len(plans)
+
+    small = selects_for(lambda: client.get("/timetunes/time-entries/", params={"limit": 5}).json())
+    db.expire_all()
+    large = selects_for(lambda: client.get("/timetunes/time-entries/", params={"limit": 100}).json())
+    # One query for the entries and their projects, one for all of their tags
+    assert small == large == 2
+
+    # Tags the session has loaded are reused; the rest are resolved in one query, not one per tag
+    tags = crud.get_tags(db, limit=3)
+    tag_ids = [tag.id for tag in tags]
+    created = []
+
+    def create():
+        created.append(crud.create_time_entry(
+            db, schemas.TimeEntryCreate(start_time=datetime(2025, 1, 1), duration=5.0, tag_ids=tag_ids)
+        ))
+
+    loaded, _ = query_plans(db, create)
+    expired, _ = query_plans(db, create)
+    assert sum("SEARCH tags" in plan for plan in loaded) == 0
+    assert sum("SEARCH tags" in plan for plan in expired) == 1
+    assert sorted(tag.id for tag in crud.get_time_entry(db, created[1].id).tags) == sorted(tag_ids)
+
+
+def test_migration_adds_indexes_to_an_existing_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE time_entries (id VARCHAR PRIMARY KEY, start_time DATETIME NOT NULL, duration FLOAT, project_id VARCHAR)")
+        conn.exec_driver_sql("CREATE INDEX ix_time_entries_start_time ON time_entries (start_time)")
+
+    migrate(engine)
+    migrate(engine)
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("time_entries")}
+    assert {"ix_time_entries_start_time_id", "ix_time_entries_project_id_start_time_id"} <= indexes
+    assert "ix_time_entries_start_time" not in indexes
+    assert "ix_time_entry_tags_tag_id_time_entry_id" in {
+        index["name"] for index in inspect(engine).get_indexes("time_entry_tags")
+    }
+
+
+def test_migration_fills_rollups_from_existing_entries(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    rollups = {models.DailyProjectRollup.__table__, models.DailyTagRollup.__table__}
+    Base.metadata.create_all(engine, tables=[table for table in Base.metadata.sorted_tables if table not in rollups])
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        models.TimeEntry(id="e1", start_time=datetime(2025, 3, 1, 9), duration=60.0),
+        models.TimeEntry(id="e2", start_time=datetime(2025, 3, 2, 9), duration=30.0),
+    ])
+    db.commit()
+
+    migrate(engine)
+    assert crud.get_time_summary(db, START, END).total_duration_minutes == 90.0
+
+    # A later run leaves the maintained rollups alone
+    crud.delete_time_entry(db, "e2")
+    migrate(engine)
+    assert crud.get_time_summary(db, START, END).total_duration_minutes == 60.0
+    db.close()
+
+
+def test_listing_and_analytics_queries_use_indexes(db):
+    seed_entries(db, BENCHMARK_ENTRIES)
+    month = (datetime(2024, 6, 1), datetime(2024, 6, 30, 12))
+
+    cases = {
+        "list by range": (lambda: crud.get_time_entries(db, start_date=month[0], end_date=month[1]),
+                          "USING INDEX ix_time_entries_start_time_id"),
+        "list by project": (lambda: crud.get_time_entries(db, project_id="p3"),
+                            "USING INDEX ix_time_entries_project_id_start_time_id"),
+        "list by tag": (lambda: crud.get_time_entries(db, tag_id="t5"),
+                        "USING COVERING INDEX ix_time_entry_tags_tag_id_time_entry_id"),
+        "list after cursor": (lambda: crud.get_time_entries(db, cursor=crud.encode_cursor(crud.get_time_entry(db, "e10"))),
+                              "USING INDEX ix_time_entries_start_time_id"),
+        "summary by project": (lambda: crud.get_time_summary(db, *month, project_id="p3"),
+                               "USING INDEX ix_time_entries_project_id_start_time_id"),
+        "by day": (lambda: crud.get_time_by_day(db, *month), "USING INDEX ix_time_entries_start_time_id"),
+    }
+    for name, (operation, expected) in cases.items():
+        plans, elapsed = query_plans(db, operation)
+        context = f"{name} ({elapsed * 1000:.1f} ms over {BENCHMARK_ENTRIES} entries): {plans}"
+        assert any(expected in plan for plan in plans), context
+        assert not any("SCAN time_entries" in plan for plan in plans), context
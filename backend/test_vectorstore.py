@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import pytest
+
+from app.core import vectorstore
+from app.core.vectorstore import VectorStoreRegistry
+
+
+class FakeCollection:
+    name = "book_chunks"
+
+    def query(self, query_embeddings, n_results, include):
+        return {
+            "documents": [["Focus deeply.", "Say no."]],
+            "metadatas": [[
+                {"book_title": "Deep Work", "chunk_index": 3, "total_chunks": 10},
+                {"book_title": "Essentialism", "chunk_index": 1, "total_chunks": 8},
+            ]],
+            "distances": [[0.2, 0.4]],
+        }
+
+
+def test_registry_opens_each_database_once(monkeypatch, tmp_path):
+    opened = []
+    monkeypatch.setattr(vectorstore, "open_book_collection", lambda path: opened.append(path) or FakeCollection())
+    registry = VectorStoreRegistry()
+    monkeypatch.setattr(vectorstore, "vector_stores", registry)
+
+    for _ in range(3):
+        results = vectorstore.search_book_chunks("focus", [0.1, 0.2], top_k=2, db_path=str(tmp_path))
+
+    assert opened == [str(tmp_path)]
+    assert results["sources"]["Deep Work"] == [{"content": "Focus deeply.", "chunk_index": 3, "total_chunks": 10, "relevance": 0.8}]
+
+
+def test_resolve_path_falls_back_and_remembers(tmp_path):
+    registry = VectorStoreRegistry()
+    fallback = tmp_path / "fast_embed_db"
+    fallback.mkdir()
+
+    assert registry.resolve_path(str(tmp_path / "missing"), [str(fallback)]) == str(fallback)
+    fallback.rmdir()
+    assert registry.resolve_path(str(tmp_path / "missing"), [str(fallback)]) == str(fallback)
+
+    with pytest.raises(ValueError):
+        registry.resolve_path(str(tmp_path / "other"), [str(fallback)])
+
+
+def test_registry_drops_least_recently_used_databases_but_keeps_pinned_ones(monkeypatch, tmp_path):
+    class ClosableCollection(FakeCollection):
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(vectorstore, "open_book_collection", lambda path: ClosableCollection())
+    monkeypatch.setattr(vectorstore, "MAX_RESOLVED_PATHS", 2)
+    registry = VectorStoreRegistry(max_open=2)
+    (tmp_path / "default").mkdir()
+    registry.warm([str(tmp_path / "default")])
+    default = registry.get_collection(str(tmp_path / "default"))
+
+    first, second = registry.get_collection("kb-1"), registry.get_collection("kb-2")
+    assert registry.get_collection("kb-1") is first  # "kb-2" is now the least recently used
+    registry.get_collection("kb-3")
+
+    # A search still holding the dropped handle can finish with it
+    assert registry.get_collection("kb-2") is not second
+    assert not second.closed and second.query([[0.1]], 2, [])["documents"]
+    assert registry.get_collection(str(tmp_path / "default")) is default
+
+    for name in ("a", "b", "c"):
+        (tmp_path / name).mkdir()
+        registry.resolve_path(str(tmp_path / name))
+    assert len(registry._resolved_paths) == 2
+
+    # Paths outside the allowed roots resolve to the fallback and are not remembered
+    (tmp_path / "kb").mkdir()
+    outside = str(tmp_path / "a")
+    assert registry.resolve_path(str(tmp_path / "kb" / ".." / "a"), [str(tmp_path / "default")], roots=[str(tmp_path / "kb")]) == str(tmp_path / "default")
+    assert all(key[0] != outside for key in registry._resolved_paths)
+    with pytest.raises(ValueError):
+        registry.resolve_path(outside, roots=[str(tmp_path / "kb")])